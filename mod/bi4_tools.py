@@ -0,0 +1,487 @@
+#!/usr/bin/env python3.7
+# -*- coding: utf-8 -*-
+
+""" DualSPHysics binary (.bi4/.ibi4) files related tools.
+
+Reads the JBinaryData files written by DualSPHysics and GenCase without the
+external tools. A file is a 64 byte header (its title, i.e. "#FileJBD
+JPartDataBi4") followed by a tree of items. Each item has named values, named
+typed arrays and child items. Items, value blocks and arrays start with their
+size, so only the item tree is parsed when a file is opened: arrays are mapped
+with numpy.memmap and only decoded, without copies, when they are requested.
+
+"""
+
+import re
+import sys
+import struct
+import subprocess
+import tempfile
+
+from glob import glob
+from os import path
+
+import numpy as np
+
+BI4_HEADER_SIZE = 64
+BI4_TITLE_SIZE = 60
+BI4_TITLE_PREFIX = "#FileJBD"
+BI4_ITEM_MARKER = "\nITEM\n"
+BI4_VALUES_MARKER = "\nVALUES"
+BI4_ARRAY_MARKER = "\nARRAY"
+
+# JBinaryData type codes: (numpy type, components)
+BI4_TYPES = {
+    2: (np.int32, 1),  # bool
+    3: (np.int8, 1),  # char
+    4: (np.uint8, 1),  # uchar
+    5: (np.int16, 1),  # short
+    6: (np.uint16, 1),  # ushort
+    7: (np.int32, 1),  # int
+    8: (np.uint32, 1),  # uint
+    9: (np.int64, 1),  # llong
+    10: (np.uint64, 1),  # ullong
+    11: (np.float32, 1),  # float
+    12: (np.float64, 1),  # double
+    20: (np.int32, 3),  # int3
+    21: (np.uint32, 3),  # uint3
+    22: (np.float32, 3),  # float3
+    23: (np.float64, 3)  # double3
+}
+BI4_TEXT_TYPE = 1
+
+# Names of the particle arrays on the part files, by the name used to request them
+PARTICLE_ARRAYS = {
+    "idp": ("Idp",),
+    "pos": ("Pos", "Posd"),
+    "vel": ("Vel",),
+    "rhop": ("Rhop",)
+}
+
+PART_FILE_REGEX = re.compile(r"Part_(\d+)\.bi4$")
+PART_HEAD_FILE_NAME = "Part_Head.ibi4"
+
+# Small case used to check the reader on a file written by GenCase: a block of fluid in a tank open at the top.
+# GenCase writes its particles to <case>.bi4, with the same layout as the Part_XXXX.bi4 files of a simulation.
+CHECK_CASE_NAME = "Check"
+CHECK_CASE_DEF = """<?xml version="1.0" encoding="UTF-8" ?>
+<case>
+    <casedef>
+        <constantsdef>
+            <gravity x="0" y="0" z="-9.81" />
+            <rhop0 value="1000" />
+            <hswl value="0" auto="true" />
+            <gamma value="7" />
+            <speedsystem value="0" auto="true" />
+            <coefsound value="20" />
+            <speedsound value="0" auto="true" />
+            <coefh value="1.2" />
+            <cflnumber value="0.2" />
+        </constantsdef>
+        <mkconfig boundcount="240" fluidcount="10" />
+        <geometry>
+            <definition dp="0.05">
+                <pointmin x="-0.5" y="-0.5" z="-0.5" />
+                <pointmax x="1.5" y="1.5" z="1.5" />
+            </definition>
+            <commands>
+                <mainlist>
+                    <setshapemode>actual | bound</setshapemode>
+                    <setdrawmode mode="full" />
+                    <setmkfluid mk="0" />
+                    <drawbox>
+                        <boxfill>solid</boxfill>
+                        <point x="0.1" y="0.1" z="0.1" />
+                        <size x="0.5" y="0.5" z="0.5" />
+                    </drawbox>
+                    <setmkbound mk="0" />
+                    <setdrawmode mode="face" />
+                    <drawbox>
+                        <boxfill>all ^top</boxfill>
+                        <point x="0" y="0" z="0" />
+                        <size x="1" y="1" z="1" />
+                    </drawbox>
+                </mainlist>
+            </commands>
+        </geometry>
+    </casedef>
+    <execution>
+        <parameters>
+            <parameter key="TimeMax" value="0.1" />
+            <parameter key="TimeOut" value="0.05" />
+        </parameters>
+    </execution>
+</case>
+"""
+
+
+class Bi4Error(Exception):
+    """ Raised when a file does not have the expected JBinaryData layout. """
+
+
+class Bi4TruncatedError(Bi4Error):
+    """ Raised when a file ends before its contents, as when it is still being written. """
+
+
+class Bi4Array():
+    """ An array of a binary file, decoded the first time it is requested. """
+
+    def __init__(self, name: str, type_code: int, count: int, offset: int):
+        self.name: str = name
+        self.type_code: int = type_code
+        self.count: int = count
+        self.offset: int = offset
+
+    def get_size(self) -> int:
+        """ Returns the size in bytes of the data of the array. """
+        dtype, components = BI4_TYPES[self.type_code]
+        return self.count * components * np.dtype(dtype).itemsize
+
+    def read(self, data: np.memmap) -> np.ndarray:
+        """ Returns a read only view of the array over the mapped file: (count,) or (count, 3) for 3 component types. """
+        dtype, components = BI4_TYPES[self.type_code]
+        values = data[self.offset:self.offset + self.get_size()].view(np.dtype(dtype).newbyteorder("<"))
+        return values.reshape(self.count, 3) if components == 3 else values
+
+
+class Bi4Item():
+    """ An item of a binary file, with its values {name: value}, arrays {name: Bi4Array} and child items. """
+
+    def __init__(self, name: str):
+        self.name: str = name
+        self.values: dict = dict()
+        self.arrays: dict = dict()
+        self.items: list = list()
+
+    def find_value(self, name: str, default=None):
+        """ Returns the first value with the given name on the item or its descendants. """
+        if name in self.values:
+            return self.values[name]
+        for item in self.items:
+            value = item.find_value(name, None)
+            if value is not None:
+                return value
+        return default
+
+    def find_array(self, name: str) -> Bi4Array:
+        """ Returns the first array with the given name on the item or its descendants, or None if there is no such array. """
+        if name in self.arrays:
+            return self.arrays[name]
+        for item in self.items:
+            array = item.find_array(name)
+            if array is not None:
+                return array
+        return None
+
+    def find_items(self, predicate) -> list:
+        """ Returns the descendant items, at any depth, for which predicate(item) is true. """
+        found: list = list()
+        for item in self.items:
+            if predicate(item):
+                found.append(item)
+            found.extend(item.find_items(predicate))
+        return found
+
+
+class Bi4Parser():
+    """ Parses the item tree of a mapped JBinaryData file, skipping the data of the arrays. """
+
+    def __init__(self, data: np.memmap, file_path: str):
+        self.data: np.memmap = data
+        self.file_path: str = file_path
+        self.offset: int = BI4_HEADER_SIZE
+
+    def fail(self, reason: str, error_type=Bi4Error):
+        """ Raises an error describing where the file could not be parsed. """
+        raise error_type("{} at byte {} of {}".format(reason, self.offset, self.file_path))
+
+    def take(self, size: int) -> bytes:
+        """ Returns the next bytes of the file and advances past them. """
+        if self.offset + size > len(self.data):
+            self.fail("Unexpected end of file", Bi4TruncatedError)
+        chunk = self.data[self.offset:self.offset + size].tobytes()
+        self.offset += size
+        return chunk
+
+    def read_struct(self, fmt: str):
+        """ Reads a little endian value with the given struct format. """
+        return struct.unpack("<" + fmt, self.take(struct.calcsize(fmt)))[0]
+
+    def read_str(self) -> str:
+        """ Reads a string stored as its length followed by its characters. """
+        return self.take(self.read_struct("I")).decode("utf-8", errors="replace")
+
+    def read_marker(self, expected: str, block_end: int) -> None:
+        """ Reads the marker starting a block, checking that it is the expected one and that the block fits on the file. """
+        if block_end > len(self.data):
+            self.fail("Block exceeds the file size", Bi4TruncatedError)
+        if self.read_str() != expected:
+            self.fail("Marker {} expected".format(expected.strip()))
+
+    def check_block_end(self, block_end: int, block: str) -> None:
+        """ Checks that a block was read up to the size it declares. """
+        if self.offset != block_end:
+            self.fail("Size of the {} does not match its contents".format(block))
+
+    def read_value(self):
+        """ Reads a scalar value stored as its name, type and data. Returns (name, value). """
+        name = self.read_str()
+        type_code = self.read_struct("i")
+        if type_code == BI4_TEXT_TYPE:
+            return name, self.read_str()
+        if type_code not in BI4_TYPES:
+            self.fail("Unknown type {} for value {}".format(type_code, name))
+        dtype, components = BI4_TYPES[type_code]
+        values = np.frombuffer(self.take(components * np.dtype(dtype).itemsize), dtype=np.dtype(dtype).newbyteorder("<"))
+        if type_code == 2:
+            return name, bool(values[0])
+        return name, values[0].item() if components == 1 else tuple(values.tolist())
+
+    def read_values(self, item: "Bi4Item", size: int) -> None:
+        """ Reads the block with the values of an item. """
+        block_end = self.offset + size
+        self.read_marker(BI4_VALUES_MARKER, block_end)
+        for _ in range(self.read_struct("I")):
+            name, value = self.read_value()
+            item.values[name] = value
+        self.check_block_end(block_end, "values of item {}".format(item.name))
+
+    def read_array(self) -> Bi4Array:
+        """ Reads the description of an array and skips its data. Text arrays are skipped and None is returned. """
+        head_end = self.read_struct("I") + self.offset
+        self.read_marker(BI4_ARRAY_MARKER, head_end)
+        name = self.read_str()
+        self.read_struct("i")  # Hidden on text outputs
+        type_code = self.read_struct("i")
+        count = self.read_struct("I")
+        data_size = self.read_struct("I")
+        self.check_block_end(head_end, "head of array {}".format(name))
+        if self.offset + data_size > len(self.data):
+            self.fail("Array {} exceeds the file size".format(name), Bi4TruncatedError)
+        if type_code == BI4_TEXT_TYPE:
+            self.offset += data_size
+            return None
+        if type_code not in BI4_TYPES:
+            self.fail("Unknown type {} for array {}".format(type_code, name))
+        array = Bi4Array(name, type_code, count, self.offset)
+        if array.get_size() != data_size:
+            self.fail("Array {} has {} bytes for {} values".format(name, data_size, count))
+        self.offset += data_size
+        return array
+
+    def read_item(self) -> Bi4Item:
+        """ Reads an item with its values, the descriptions of its arrays and its child items. """
+        head_end = self.read_struct("I") + self.offset
+        self.read_marker(BI4_ITEM_MARKER, head_end)
+        item = Bi4Item(self.read_str())
+        self.read_struct("i")  # Hide all
+        self.read_struct("i")  # Hide values
+        self.read_str()  # Float format for text outputs
+        self.read_str()  # Double format for text outputs
+        array_count = self.read_struct("I")
+        item_count = self.read_struct("I")
+        values_size = self.read_struct("I")
+        self.check_block_end(head_end, "head of item {}".format(item.name))
+        if values_size:
+            self.read_values(item, values_size)
+        for _ in range(array_count):
+            array = self.read_array()
+            if array is not None:
+                item.arrays[array.name] = array
+        for _ in range(item_count):
+            item.items.append(self.read_item())
+        return item
+
+
+class Bi4File():
+    """ A JBinaryData file mapped on memory. Its arrays are decoded lazily, as views over the mapped file. """
+
+    def __init__(self, file_path: str):
+        self.file_path: str = file_path
+        if path.getsize(file_path) < BI4_HEADER_SIZE:
+            raise Bi4TruncatedError("{} is too small to be a binary DualSPHysics file".format(file_path))
+        self.data: np.memmap = np.memmap(file_path, dtype=np.uint8, mode="r")
+        self.title: str = self.data[:BI4_TITLE_SIZE].tobytes().split(b"\x00")[0].decode("ascii", errors="replace").strip()
+        if not self.title.startswith(BI4_TITLE_PREFIX):
+            raise Bi4Error("{} is not a binary DualSPHysics file".format(file_path))
+        self.root: Bi4Item = Bi4Parser(self.data, file_path).read_item()
+        self.decoded: dict = dict()  # {array name: np.ndarray}
+
+    def get_value(self, name: str, default=None):
+        """ Returns the value with the given name, looking for it on the whole item tree. """
+        return self.root.find_value(name, default)
+
+    def get_array_names(self) -> list:
+        """ Returns the names of all the arrays of the file. """
+        names: list = list(self.root.arrays.keys())
+        for item in self.root.find_items(lambda _: True):
+            names.extend(item.arrays.keys())
+        return names
+
+    def get_array(self, name: str) -> np.ndarray:
+        """ Returns the array with the given name, decoding it the first time it is requested. """
+        if name not in self.decoded:
+            array = self.root.find_array(name)
+            if array is None:
+                raise KeyError("There is no array {} on {}".format(name, self.file_path))
+            self.decoded[name] = array.read(self.data)
+        return self.decoded[name]
+
+
+class PartFile(Bi4File):
+    """ A Part_XXXX.bi4 file with the particles of a part of a simulation. """
+
+    def __init__(self, file_path: str, part_head: "PartHead" = None):
+        super().__init__(file_path)
+        part_match = PART_FILE_REGEX.search(file_path)
+        self.part: int = int(part_match.group(1)) if part_match else None
+        self.part_head: PartHead = part_head
+
+    def get_time(self) -> float:
+        """ Returns the simulation time of the part. """
+        return self.get_value("TimeStep", None)
+
+    def get_particle_array(self, name: str) -> np.ndarray:
+        """ Returns a particle array by the name used on PARTICLE_ARRAYS (idp, pos, vel, rhop). """
+        for array_name in PARTICLE_ARRAYS[name]:
+            if self.root.find_array(array_name) is not None:
+                return self.get_array(array_name)
+        raise KeyError("There is no {} data on {}".format(name, self.file_path))
+
+    def get_idp(self) -> np.ndarray:
+        """ Returns the identifiers of the particles. """
+        return self.get_particle_array("idp")
+
+    def get_pos(self) -> np.ndarray:
+        """ Returns the positions of the particles, (n, 3). """
+        return self.get_particle_array("pos")
+
+    def get_vel(self) -> np.ndarray:
+        """ Returns the velocities of the particles, (n, 3). """
+        return self.get_particle_array("vel")
+
+    def get_rhop(self) -> np.ndarray:
+        """ Returns the densities of the particles. """
+        return self.get_particle_array("rhop")
+
+    def get_mk(self) -> np.ndarray:
+        """ Returns the mk of each particle, from the mk blocks of the part head. """
+        return self.get_part_head().get_block_field(self.get_idp(), "mk")
+
+    def get_type(self) -> np.ndarray:
+        """ Returns the type of each particle (i.e. Fixed, Moving, Floating, Fluid), from the mk blocks of the part head. """
+        return self.get_part_head().get_block_field(self.get_idp(), "type")
+
+    def get_part_head(self) -> "PartHead":
+        """ Returns the head of the simulation the part belongs to, loading it from the same folder if needed. """
+        if self.part_head is None:
+            self.part_head = PartHead("{}/{}".format(path.dirname(self.file_path) or ".", PART_HEAD_FILE_NAME))
+        return self.part_head
+
+
+class PartHead(Bi4File):
+    """ The Part_Head.ibi4 file of a simulation, describing the blocks of particles of each mk. """
+
+    def __init__(self, file_path: str):
+        super().__init__(file_path)
+        blocks = self.root.find_items(lambda item: all(key in item.values for key in ("Mk", "Begin", "Count")))
+        blocks.sort(key=lambda item: item.values["Begin"])
+        self.block_begin: np.ndarray = np.array([item.values["Begin"] for item in blocks], dtype=np.int64)
+        self.block_end: np.ndarray = np.array([item.values["Begin"] + item.values["Count"] for item in blocks], dtype=np.int64)
+        self.block_fields: dict = {
+            "mk": np.array([item.values["Mk"] for item in blocks], dtype=np.int32),
+            "type": np.array([str(item.values.get("Type", "")) for item in blocks], dtype=object)
+        }
+
+    def get_block_field(self, idp: np.ndarray, field: str) -> np.ndarray:
+        """ Returns a field of the mk block of each particle identifier. Particles outside every block get -1 or an empty type. """
+        blocks = np.searchsorted(self.block_begin, idp, side="right") - 1
+        valid = (blocks >= 0) & (idp < self.block_end[np.clip(blocks, 0, None)]) if len(self.block_begin) else np.zeros(len(idp), dtype=bool)
+        values = self.block_fields[field]
+        result = np.full(len(idp), -1 if field == "mk" else "", dtype=values.dtype)
+        result[valid] = values[blocks[valid]]
+        return result
+
+
+def get_part_file_paths(out_folder_path: str) -> list:
+    """ Returns the paths of the part files on the out folder, sorted by part number. [(part, path)] """
+    part_files: list = list()
+    for file_path in glob("{}/Part_*.bi4".format(out_folder_path)):
+        part_match = PART_FILE_REGEX.search(file_path)
+        if part_match:
+            part_files.append((int(part_match.group(1)), file_path))
+    return sorted(part_files)
+
+
+def iter_part_files(out_folder_path: str, first_part: int = None, last_part: int = None):
+    """ Yields a PartFile for each part on the out folder between first_part and last_part (both included).
+    The part head is shared by all of them. """
+    head_path = "{}/{}".format(out_folder_path, PART_HEAD_FILE_NAME)
+    part_head = None
+    for part, file_path in get_part_file_paths(out_folder_path):
+        if (first_part is not None and part < first_part) or (last_part is not None and part > last_part):
+            continue
+        if part_head is None and path.isfile(head_path):
+            part_head = PartHead(head_path)
+        yield PartFile(file_path, part_head)
+
+
+def get_time_index(out_folder_path: str) -> np.ndarray:
+    """ Returns the part numbers and simulation times of the parts on the out folder, read from their headers.
+    The result is a structured array with the fields part and time, sorted by part. """
+    parts = get_part_file_paths(out_folder_path)
+    index = np.zeros(len(parts), dtype=[("part", np.int32), ("time", np.float64)])
+    for i, (part, file_path) in enumerate(parts):
+        time_step = Bi4File(file_path).get_value("TimeStep", None)
+        index[i] = (part, np.nan if time_step is None else time_step)
+    return index
+
+
+def get_part_at_time(time_index: np.ndarray, time: float) -> int:
+    """ Returns the number of the last part written at or before the given simulation time, or None if there is none. """
+    position = np.searchsorted(time_index["time"], time, side="right") - 1
+    return int(time_index["part"][position]) if position >= 0 else None
+
+
+def check_part_file(part_file: PartFile) -> None:
+    """ Checks that the particle arrays of a part file can be read and agree with the particle count stored on it.
+    Particles outside every mk block of the part head are reported too, if there is a part head. Raises Bi4Error otherwise. """
+    idp = part_file.get_idp()
+    count = part_file.get_value("Npok", len(idp))
+    for name in ("idp", "pos", "vel", "rhop"):
+        if len(part_file.get_particle_array(name)) != count:
+            raise Bi4Error("{} has {} {} values for {} particles".format(part_file.file_path, len(part_file.get_particle_array(name)), name, count))
+    if len(np.unique(idp)) != count:
+        raise Bi4Error("{} has repeated particle identifiers".format(part_file.file_path))
+    if path.isfile("{}/{}".format(path.dirname(part_file.file_path) or ".", PART_HEAD_FILE_NAME)) and (part_file.get_mk() < 0).any():
+        raise Bi4Error("{} has particles outside the mk blocks of its part head".format(part_file.file_path))
+
+
+def generate_check_part_file(gencase_path: str, folder_path: str) -> PartFile:
+    """ Runs GenCase on CHECK_CASE_DEF in the given folder and returns the part file it writes, checking it with check_part_file
+    and against the particle counts of each type GenCase stores on it. Raises RuntimeError if GenCase fails and Bi4Error if
+    the file can not be read. """
+    with open("{}/{}_Def.xml".format(folder_path, CHECK_CASE_NAME), "w", encoding="utf-8") as f:
+        f.write(CHECK_CASE_DEF)
+    result = subprocess.run([gencase_path, "{}/{}_Def".format(folder_path, CHECK_CASE_NAME), "{}/out/{}".format(folder_path, CHECK_CASE_NAME)],
+                            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, check=False)
+    file_path = "{}/out/{}.bi4".format(folder_path, CHECK_CASE_NAME)
+    if result.returncode != 0 or not path.isfile(file_path):
+        raise RuntimeError("GenCase failed with exit code {}:\n{}".format(result.returncode, result.stdout.decode("utf-8", errors="replace")))
+
+    part_file = PartFile(file_path)
+    check_part_file(part_file)
+    counts = [part_file.get_value(name, None) for name in ("CaseNp", "CaseNfixed", "CaseNmoving", "CaseNfloat", "CaseNfluid")]
+    if None in counts or counts[0] != sum(counts[1:]) or counts[0] != len(part_file.get_idp()) or not counts[4]:
+        raise Bi4Error("{} does not have the particle counts of the check case: {}".format(file_path, counts))
+    return part_file
+
+
+if __name__ == "__main__":
+    # Check of the reader on a file written by GenCase:
+    #   python -m mod.bi4_tools <GenCase executable>
+    with tempfile.TemporaryDirectory() as check_folder_path:
+        checked_file = generate_check_part_file(sys.argv[1], check_folder_path)
+        print("{}: {} particles ({} fluid), arrays {}".format(checked_file.title, len(checked_file.get_idp()),
+                                                             checked_file.get_value("CaseNfluid"), ", ".join(checked_file.get_array_names())))
+        del checked_file  # Unmaps the file before the folder is removed
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3.7
+# -*- coding: utf-8 -*-
+
+""" Case data (casedata.dsphdata) serialization related tools.
+
+The file starts with a fixed header identifying the format and the schema
+version the case was written with, followed by the pickled case.
+Files without header were written by older versions using a plain
+pickle and are treated as schema 1.
+
+"""
+
+import sys
+import time
+import pickle
+import struct
+import random
+import tempfile
+
+from os import replace, path
+from copy import deepcopy
+
+from mod.constants import CASE_DATA_MAGIC, CASE_DATA_SCHEMA_VERSION, CASE_DATA_PICKLE_PROTOCOL
+
+# Magic bytes followed by the schema version as a little-endian unsigned int
+CASE_DATA_HEADER_FORMAT = "<{}sI".format(len(CASE_DATA_MAGIC))
+CASE_DATA_HEADER_SIZE = struct.calcsize(CASE_DATA_HEADER_FORMAT)
+
+LEGACY_SCHEMA_VERSION = 1
+
+
+def fill_missing_attributes(old, new) -> None:
+    """ Adds to the old object, recursively, copies of the attributes present on the new one that it lacks. """
+    for attr, value in new.__dict__.items():
+        if not hasattr(old, attr):
+            setattr(old, attr, deepcopy(value))
+        elif hasattr(value, "__dict__") and hasattr(getattr(old, attr), "__dict__"):
+            fill_missing_attributes(getattr(old, attr), value)
+
+
+def migrate_from_legacy(case: "Case") -> "Case":
+    """ Migrates a case saved as a plain pickle by previous versions.
+    Attributes added to the data structures since then are filled with their default values. """
+    fill_missing_attributes(case, type(case).create_defaults())
+    return case
+
+
+# Functions to upgrade a case from a schema version to the next one. {from_schema_version: migration_function}
+MIGRATIONS = {
+    LEGACY_SCHEMA_VERSION: migrate_from_legacy
+}
+
+
+def migrate_case(case: "Case", schema_version: int) -> "Case":
+    """ Applies all the migrations needed to upgrade a case from the given schema version to the current one. """
+    if schema_version > CASE_DATA_SCHEMA_VERSION:
+        raise ValueError("Case data schema version {} is not supported by this version.".format(schema_version))
+
+    for version in range(schema_version, CASE_DATA_SCHEMA_VERSION):
+        case = MIGRATIONS[version](case)
+    return case
+
+
+def dump_case_data(case: "Case", file_path: str) -> None:
+    """ Writes the case data on the given file, replacing it atomically once completely written. """
+    tmp_path = "{}.tmp".format(file_path)
+    with open(tmp_path, "wb") as f:
+        f.write(struct.pack(CASE_DATA_HEADER_FORMAT, CASE_DATA_MAGIC, CASE_DATA_SCHEMA_VERSION))
+        pickle.dump(case, f, CASE_DATA_PICKLE_PROTOCOL)
+    replace(tmp_path, file_path)
+
+
+def load_case_data(file_path: str) -> tuple:
+    """ Reads the case data from the given file. Returns the case and the schema version it was written with.
+    The case should be upgraded with migrate_case before using it. """
+    with open(file_path, "rb") as f:
+        header = f.read(CASE_DATA_HEADER_SIZE)
+        if len(header) == CASE_DATA_HEADER_SIZE and header.startswith(CASE_DATA_MAGIC):
+            _, schema_version = struct.unpack(CASE_DATA_HEADER_FORMAT, header)
+        else:
+            schema_version = LEGACY_SCHEMA_VERSION
+            f.seek(0)
+        case = pickle.load(f)
+
+    return case, schema_version
+
+
+def create_benchmark_case(zones: int = 20, uniform_rows: int = 50000, linear_rows: int = 20000, grid_rows: int = 50000) -> "Case":
+    """ Returns a case with big tables: inlet zones with variable uniform and linear velocities and a MeasureTool grid. """
+    # pylint: disable=import-outside-toplevel
+    from mod.dataobjects.case import Case
+    from mod.dataobjects.inletoutlet.inlet_outlet_zone import InletOutletZone
+    from mod.dataobjects.inletoutlet.velocities.linear_velocity import LinearVelocity
+
+    rng = random.Random(0)
+    case = Case.create_defaults()
+    for _ in range(zones):
+        zone = InletOutletZone()
+        zone.velocity_info.variable_uniform_values = [(i * 0.01, rng.random()) for i in range(uniform_rows)]
+        zone.velocity_info.variable_linear_values = [(i * 0.01, LinearVelocity(rng.random(), rng.random(), rng.random(), rng.random())) for i in range(linear_rows)]
+        case.inlet_outlet.zones.append(zone)
+    case.info.measuretool_grid = [[rng.random() for _ in range(12)] for _ in range(grid_rows)]
+    return case
+
+
+def benchmark_case_data(case: "Case" = None, repeat: int = 3) -> dict:
+    """ Times saving and loading a case as a plain protocol 1 pickle, as done before the versioned header,
+    and with dump_case_data and load_case_data. Uses create_benchmark_case if no case is given.
+    Returns {format: (size in bytes, best save time, best load time)}. """
+    case = case or create_benchmark_case()
+    results: dict = dict()
+    with tempfile.TemporaryDirectory() as folder_path:
+        legacy_path = path.join(folder_path, "legacy.dsphdata")
+        current_path = path.join(folder_path, "current.dsphdata")
+
+        def save_legacy():
+            """ Writes the case as previous versions did. """
+            with open(legacy_path, "wb") as f:
+                pickle.dump(case, f, 1)
+
+        for name, file_path, save, load in (("protocol 1", legacy_path, save_legacy, lambda: load_case_data(legacy_path)),
+                                            ("protocol {}".format(CASE_DATA_PICKLE_PROTOCOL), current_path,
+                                             lambda: dump_case_data(case, current_path), lambda: load_case_data(current_path))):
+            save_timings: list = list()
+            load_timings: list = list()
+            for _ in range(repeat):
+                start = time.time()
+                save()
+                save_timings.append(time.time() - start)
+                start = time.time()
+                load()
+                load_timings.append(time.time() - start)
+            results[name] = (path.getsize(file_path), min(save_timings), min(load_timings))
+            print("{}: {:.1f} MB, best of {}: save {:.2f} s, load {:.2f} s".format(name, results[name][0] / 1e6, repeat, results[name][1], results[name][2]))
+    return results
+
+
+if __name__ == "__main__":
+    # Benchmark of the case data format. Run inside FreeCAD or with its modules on the path:
+    #   python -m mod.case_data_tools [number of inlet zones]
+    benchmark_case_data(create_benchmark_case(int(sys.argv[1]) if len(sys.argv) > 1 else 20))
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3.7
+# -*- coding: utf-8 -*-
+
+""" DesignSPHysics headless pipeline runner.
+
+Runs the GenCase -> DualSPHysics -> post-processing pipeline of a saved
+case without a FreeCAD GUI session, building the same executable
+parameters as the GUI. Progress is streamed on the standard output as
+JSON lines, one event per line.
+
+Must be run from the DesignSPHysics folder with a Python interpreter able
+to import the FreeCAD modules (for example the one bundled with FreeCAD,
+with the FreeCAD lib folder on PYTHONPATH):
+
+    python -m mod.cli run <case folder>/casedata.dsphdata [--stages xml,gencase,simulation,partvtk] [--config pipeline.json]
+
+The optional JSON config may set "stages", "device", "threads" and the
+export options for each post-processing stage, with the same keys the
+post-processing dialogs use (see pipeline_tools.DEFAULT_POST_PROCESSING_OPTIONS).
+The vtu stage exports the parts to binary .vtu files with a .pvd collection,
+reading the part files directly instead of running PartVTK. Setting its
+"preview_particles" also writes decimated <file_name>Preview frames with up
+to that many particles, that the visualization shows while playing. The
+preview stage only writes those frames, for a series exported by PartVTK.
+Both stages can be limited to some particle types with "types" (i.e.
+["fluid"]), like the PartVTK -onlytype option.
+
+Parametric sweeps over a saved case are run with:
+
+    python -m mod.cli sweep <case folder>/casedata.dsphdata sweep.json [--max-parallel N]
+
+where sweep.json describes the design (see sweep_tools), for example:
+
+    {"name": "visco", "design": "grid", "parameters": {"execution_parameters.visco": [0.01, 0.05, 0.1]},
+     "max_parallel": 2, "stages": ["computeforces"], "computeforces": {"onlyprocess": "11"},
+     "outputs": [{"name": "max_fx", "file": "Force_Mk11.csv", "column": "fx [N]", "reduce": "max"}]}
+
+The part file reader and the .vtu export can be checked on a part file
+written by GenCase (i.e. the one bundled on dualsphysics/bin) with:
+
+    python -m mod.cli check <GenCase executable>
+
+"""
+
+import sys
+import json
+import argparse
+
+from mod.pipeline_tools import DEFAULT_STAGES, emit, run_pipeline, run_check
+from mod.sweep_tools import run_sweep
+
+
+def main(argv: list) -> int:
+    """ Command line entry point. """
+    parser = argparse.ArgumentParser(prog="python -m mod.cli", description="DesignSPHysics headless pipeline runner")
+    subparsers = parser.add_subparsers(dest="command")
+    run_parser = subparsers.add_parser("run", help="Runs the pipeline for a saved case")
+    run_parser.add_argument("case_data", help="Path to the casedata.dsphdata file of the case")
+    run_parser.add_argument("--stages", help="Comma separated stages to run. Default: {}".format(",".join(DEFAULT_STAGES)))
+    run_parser.add_argument("--config", help="JSON file with the pipeline configuration")
+    run_parser.add_argument("--device", choices=["cpu", "gpu"], help="Device to run the simulation on")
+    run_parser.add_argument("--threads", type=int, help="CPU threads for the simulation. 0 uses all of them")
+    sweep_parser = subparsers.add_parser("sweep", help="Runs a parametric sweep over a saved case")
+    sweep_parser.add_argument("case_data", help="Path to the casedata.dsphdata file of the base case")
+    sweep_parser.add_argument("config", help="JSON file with the sweep design")
+    sweep_parser.add_argument("--max-parallel", type=int, help="Maximum number of variants running at once")
+    sweep_parser.add_argument("--device", choices=["cpu", "gpu"], help="Device to run the simulations on")
+    sweep_parser.add_argument("--threads", type=int, help="CPU threads for each simulation. 0 uses all of them")
+    check_parser = subparsers.add_parser("check", help="Checks the part file reader and the .vtu export on a part file written by GenCase")
+    check_parser.add_argument("gencase", help="Path to the GenCase executable")
+    args = parser.parse_args(argv)
+
+    if args.command not in ("run", "sweep", "check"):
+        parser.print_help()
+        return 2
+
+    if args.command == "check":
+        try:
+            return run_check(args.gencase)
+        except Exception as ex:  # pylint: disable=broad-except
+            emit("error", message=str(ex))
+            return 1
+
+    config: dict = dict()
+    if args.config:
+        with open(args.config, "r", encoding="utf-8") as f:
+            config = json.load(f)
+    if args.device:
+        config["device"] = args.device.upper()
+    if args.threads is not None:
+        config["threads"] = args.threads
+
+    try:
+        if args.command == "sweep":
+            if args.max_parallel is not None:
+                config["max_parallel"] = args.max_parallel
+            return run_sweep(args.case_data, config)
+        stages = args.stages.split(",") if args.stages else config.get("stages", DEFAULT_STAGES)
+        return run_pipeline(args.case_data, stages, config)
+    except Exception as ex:  # pylint: disable=broad-except
+        emit("error", message=str(ex))
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
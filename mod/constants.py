@@ -3,6 +3,8 @@
 """ DesignSPHysics Define Constants.
     This file contains a collection of constants meant to use with DesignSPHysics. """
 
+import re
+
 from mod.enums import FreeCADObjectType
 
 # APP Constants
@@ -11,12 +13,41 @@ APP_NAME = "DesignSPHysics"
 DIVIDER = 1000
 LINE_END = "\n"
 PICKLE_PROTOCOL = 1  # Binary mode
+CASE_DATA_MAGIC = b"DSPHCASE"
+CASE_DATA_SCHEMA_VERSION = 2
+CASE_DATA_PICKLE_PROTOCOL = 4
 VERSION = "0.6.1.2207-03-01" # Version must be M.m.p.yymm-dd-rr and must be 0 padded
 WIDTH_2D = 0.001
 MAX_PARTICLE_WARNING = 2000000
 DISK_DUMP_FILE_NAME = "designsphysics-{}.log".format(VERSION)
 MKFLUID_LIMIT = 10
 MKFLUID_OFFSET = 1
+STAGING_MAX_WORKERS = 4
+STAGING_MANIFEST_FILE_NAME = "staged_files.json"
+BACKGROUND_POLL_INTERVAL_MS = 50
+BACKGROUND_DIALOG_DELAY_MS = 500
+GENCASE_CACHE_FOLDER_NAME = "designsphysics-gencase-cache"
+GENCASE_CACHE_DEFAULT_MAX_SIZE_MB = 2048
+GENCASE_TOTAL_PARTICLES_REGEX = re.compile(r"Total particles: (\d+)")
+TELEMETRY_CAPACITY = 4096
+TELEMETRY_REGRESSION_WINDOW = 20
+TELEMETRY_FILE_NAME = "Run_telemetry.npz"
+JOB_QUEUE_FOLDER_NAME = "designsphysics-jobs"
+JOB_QUEUE_DEFAULT_MAX_RUNNING_JOBS = 1
+JOB_QUEUE_DEFAULT_MAX_GPU_JOBS = 1
+SWEEP_FOLDER_SUFFIX = "_sweep"
+POST_PROCESSING_DEFAULT_MAX_PROCESSES = 0
+POST_PROCESSING_MIN_PARTS_PER_SHARD = 20
+POST_PROCESSING_MANIFEST_SUFFIX = "_manifest.json"
+POST_PROCESSING_FOLLOW_SETTLE_SECONDS = 5
+POST_PROCESSING_FOLLOW_INTERVAL_MS = 2000
+MEASURETOOL_INCREMENT_SUFFIX = "Increment"
+RESULTS_CATALOG_FILE_NAME = "ResultsCatalog.json"
+PREVIEW_FILE_SUFFIX = "Preview"
+PREVIEW_DEFAULT_PARTICLES = 200000
+PREVIEW_DEFAULT_ARRAYS = ["vel", "rhop", "mk"]
+SWEEP_SUMMARY_FILE_NAME = "summary.csv"
+SWEEP_DEFAULT_MAX_PARALLEL = 1
 GITHUB_MASTER_CONSTANTS_URL = "https://raw.githubusercontent.com/DualSPHysics/DesignSPHysics/master/mod/constants.py"
 
 # FreeCAD Related Constants
@@ -7,7 +7,8 @@ import json
 
 import FreeCAD
 
-from mod.constants import VERSION
+from mod.constants import VERSION, GENCASE_CACHE_DEFAULT_MAX_SIZE_MB, JOB_QUEUE_DEFAULT_MAX_RUNNING_JOBS, JOB_QUEUE_DEFAULT_MAX_GPU_JOBS
+from mod.constants import POST_PROCESSING_DEFAULT_MAX_PROCESSES
 
 
 class ApplicationSettings():
@@ -25,6 +26,10 @@ class ApplicationSettings():
         self.verbose_enabled: bool = False
         self.notify_on_outdated_version_enabled: bool = True
         self.force_moordyn_support_enabled: bool = False
+        self.gencase_cache_max_size_mb: int = GENCASE_CACHE_DEFAULT_MAX_SIZE_MB
+        self.job_queue_max_running_jobs: int = JOB_QUEUE_DEFAULT_MAX_RUNNING_JOBS
+        self.job_queue_max_gpu_jobs: int = JOB_QUEUE_DEFAULT_MAX_GPU_JOBS
+        self.post_processing_max_processes: int = POST_PROCESSING_DEFAULT_MAX_PROCESSES  # 0 uses all the available cores
         self.restore_from_disk()
 
     @staticmethod
@@ -53,6 +58,14 @@ class ApplicationSettings():
                 self.notify_on_outdated_version_enabled = disk_data["notify_on_outdated_version_enabled"]
             if "force_moordyn_support_enabled" in disk_data.keys():
                 self.force_moordyn_support_enabled = disk_data["force_moordyn_support_enabled"]
+            if "gencase_cache_max_size_mb" in disk_data.keys():
+                self.gencase_cache_max_size_mb = disk_data["gencase_cache_max_size_mb"]
+            if "job_queue_max_running_jobs" in disk_data.keys():
+                self.job_queue_max_running_jobs = disk_data["job_queue_max_running_jobs"]
+            if "job_queue_max_gpu_jobs" in disk_data.keys():
+                self.job_queue_max_gpu_jobs = disk_data["job_queue_max_gpu_jobs"]
+            if "post_processing_max_processes" in disk_data.keys():
+                self.post_processing_max_processes = disk_data["post_processing_max_processes"]
 
     def persist(self) -> None:
         """ Persists the current settings to disk for next instantiations to load. """
@@ -65,29 +65,21 @@ class Case():
             Case()
         return Case.__instance
 
+    @staticmethod
+    def create_defaults() -> "Case":
+        """ Returns a new case with the default values, leaving the current instance untouched. """
+        current = Case.__instance
+        defaults = Case(reset=True)
+        Case.__instance = current
+        return defaults
+
     @staticmethod
     def update_from_disk(disk_data: "Case") -> None:
-        """ Updates the current instance for the one passed as parameter. """
+        """ Updates the current instance for the one passed as parameter.
+        The data must be already migrated to the current version (see case_data_tools.migrate_case) """
         Case.the().reset()
-        Case.merge_old_object(disk_data, Case.__instance)
         Case.__instance = disk_data
 
-    @staticmethod
-    def merge_old_object(old, new):
-        """ Merges an old object with the current version. """
-        # FIXME: Add support for dicts,lists,tuples...
-        for attr, value in new.__dict__.items():
-            debug("Evaluating attr {} from the new object of type {}, for the old object of type {}".format(attr, type(new), type(old)))
-            if not hasattr(old, attr):
-                debug("Old object didn't have that attribute. Just updating it and going forward")
-                setattr(old, attr, value)
-                continue
-            if hasattr(value, "__dict__") and hasattr(old, attr):
-                # FIXME: old.attr may not have __dict__...
-                debug("The attr {} is an object, and the old object has it. Exploring...".format(attr))
-                Case.merge_old_object(getattr(old, attr), value)
-                continue
-
     def get_first_mk_not_used(self, object_type: ObjectType):
         """ Checks simulation objects to find the first not used MK group number. """
         mkset = set(map(lambda x: x.obj_mk, filter(lambda y: y.type == object_type, self.objects)))
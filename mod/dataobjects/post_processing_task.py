@@ -0,0 +1,64 @@
+#!/usr/bin/env python3.7
+# -*- coding: utf-8 -*-
+""" DesignSPHysics Post-Processing Task Data """
+
+import time
+import uuid
+
+from bisect import bisect_left
+
+from mod.enums import JobState
+
+
+class PostProcessingTask():
+    """ A post-processing tool execution on the post-processing task graph.
+    The task starts once all the tasks it depends on finished successfully and the ones it waits for finished. """
+
+    def __init__(self, tool: str = "", executable: str = "", parameters: list = None, dependencies: list = None,
+                 waits_for: list = None, parts: list = None, detached: bool = False):
+        self.id: str = uuid.uuid4().hex
+        self.tool: str = tool
+        self.executable: str = executable
+        self.parameters: list = parameters or list()
+        self.dependencies: list = dependencies or list()  # [task_id]
+        self.waits_for: list = waits_for or list()  # [task_id]. Their result does not matter.
+        self.parts: list = parts or list()  # [part]. Sorted numbers of the parts the task processes
+        self.total_parts: int = len(self.parts)
+        self.detached: bool = detached  # Launched without waiting for it to finish (i.e. ParaView)
+        self.state: str = JobState.QUEUED
+        self.current_part: int = None
+        self.output: str = ""
+        self.created: float = time.time()
+        self.started: float = None
+        self.finished: float = None
+        self.exit_code: int = None
+        self.get_current_part = None  # Function returning the part being processed from a chunk of output, or None
+        self.on_started = None  # Function called with the task right before its process starts, i.e. to write its input files
+        self.function = None  # Function run with the task on a background thread instead of an executable. Returns the exit code
+        self.on_finished = None  # Function called with the task once it finishes
+
+    def get_cmd_string(self) -> str:
+        """ Returns the command line that runs the task. """
+        if self.function:
+            return "{} (in process)".format(self.tool)
+        return "{} {}".format(self.executable, " ".join(self.parameters))
+
+    def get_processed_parts(self) -> int:
+        """ Returns the number of parts already processed by the task. """
+        if self.state == JobState.FINISHED:
+            return self.total_parts
+        if self.current_part is None:
+            return 0
+        return bisect_left(self.parts, self.current_part)
+
+    def get_progress(self) -> float:
+        """ Returns the completion of the task between 0 and 1. """
+        if self.state == JobState.FINISHED:
+            return 1.0
+        if self.total_parts <= 0:
+            return 0.0
+        return self.get_processed_parts() / self.total_parts
+
+    def is_active(self) -> bool:
+        """ Returns whether the task is still pending to finish. """
+        return self.state in (JobState.QUEUED, JobState.RUNNING)
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3.7
+# -*- coding: utf-8 -*-
+""" DesignSPHysics Simulation Job Data """
+
+import time
+import uuid
+
+from os import path
+
+from mod.enums import JobState
+
+
+class SimulationJob():
+    """ A DualSPHysics execution waiting, running or already run from the job queue. """
+
+    def __init__(self, case_name: str = "", case_path: str = "", executable: str = "", device: str = "GPU",
+                 additional_parameters: list = None, threads: int = 0, priority: int = 0):
+        self.id: str = uuid.uuid4().hex
+        self.case_name: str = case_name
+        self.case_path: str = case_path
+        self.executable: str = executable
+        self.device: str = device
+        self.additional_parameters: list = additional_parameters or list()
+        self.threads: int = threads  # 0 uses all the available cores
+        self.priority: int = priority  # Higher priority jobs start first
+        self.particle_number: int = 0
+        self.timemax: float = -1
+        self.state: str = JobState.QUEUED
+        self.created: float = time.time()
+        self.started: float = None
+        self.finished: float = None
+        self.exit_code: int = None
+        self.restart_part: int = None  # Part to resume the simulation from, or None to run it from the beginning
+
+    def get_out_folder_path(self) -> str:
+        """ Returns the out folder of the case the job runs. """
+        return "{path}/{name}_out/".format(path=self.case_path, name=self.case_name)
+
+    def get_run_log_path(self) -> str:
+        """ Returns the path of the log DualSPHysics writes for this job. """
+        return "{}Run.out".format(self.get_out_folder_path())
+
+    def get_arguments(self) -> list:
+        """ Returns the list of arguments to run DualSPHysics with. """
+        arguments = ["{}{}".format(self.get_out_folder_path(), self.case_name),
+                     self.get_out_folder_path(),
+                     "-{}".format(self.device.lower()),
+                     "-svres"]
+        if self.device.lower() == "cpu" and self.threads > 0:
+            arguments.append("-ompthreads:{}".format(self.threads))
+        if self.restart_part is not None:
+            arguments += ["-partbegin:{}".format(self.restart_part), self.get_out_folder_path()]
+        return arguments + self.additional_parameters
+
+    def get_cmd_string(self) -> str:
+        """ Returns the command line that runs the job. """
+        return "{} {}".format(self.executable, " ".join(self.get_arguments()))
+
+    def shares_out_folder(self, other: "SimulationJob") -> bool:
+        """ Returns whether this job and other write to the same out folder. """
+        return path.normcase(path.normpath(self.get_out_folder_path())) == path.normcase(path.normpath(other.get_out_folder_path()))
+
+    def is_active(self) -> bool:
+        """ Returns whether the job is still pending to finish. """
+        return self.state in (JobState.QUEUED, JobState.RUNNING, JobState.PAUSED)
+
+    def to_dict(self) -> dict:
+        """ Returns the job as a dictionary ready to be serialized. """
+        return dict(self.__dict__)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "SimulationJob":
+        """ Creates a job from a dictionary obtained with to_dict. """
+        job = cls()
+        for key, value in data.items():
+            if hasattr(job, key):
+                setattr(job, key, value)
+        return job
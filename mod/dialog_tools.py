@@ -22,9 +22,9 @@ def error_dialog(error_text, detailed_text=None):
 
 
 def info_dialog(info_text, detailed_text=None, input_text=None):
-    """Spawns an info dialog with the text and details passed."""
-    text_list = info_text.split(" ")
-    if text_list[0] == "IsoSurface":
+    """Spawns an info dialog with the text and details passed.
+    If input_text is given (case_path!!case_name!!file_name) the dialog can open the exported series on the visualization."""
+    if input_text:
         InformationIsoSurfaceDialog(__("Information"), info_text, detailed_text, input_text=input_text)
     else:
         InformationDialog(__("Information"), info_text, detailed_text)
@@ -282,6 +282,17 @@ class ContactMethod:
     SMC = 1
 
 
+class JobState:
+    """ States of a simulation job in the job queue. """
+    QUEUED = "queued"
+    RUNNING = "running"
+    PAUSED = "paused"
+    FINISHED = "finished"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+    INTERRUPTED = "interrupted"
+
+
 class HelpText:
     """ Help strings for different zones of the application GUIs. """
     GRAVITYX = __("Gravitational acceleration in X direction.")
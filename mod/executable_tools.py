@@ -15,6 +15,9 @@ import FreeCADGui
 from mod.translation_tools import __
 from mod.constants import APP_NAME
 
+# Versions reported by each executable, reused while the executable file does not change.
+_executable_versions: dict = dict()  # {executable: (size, mtime_ns, version)}
+
 
 def executable_contains_string(executable: str, string: str) -> bool:
     """ Returns whether the standard output of the executable contains the passed string.
@@ -39,6 +42,42 @@ def executable_contains_string(executable: str, string: str) -> bool:
     return False
 
 
+def get_executable_version(executable: str) -> str:
+    """ Returns the standard output of the executable when asked for its version, or an empty string if it does not exist.
+    The executable is only run the first time and again when it is replaced, as it blocks until it answers. """
+    refocus_cwd()
+    if not path.isfile(executable):
+        return ""
+
+    executable_stat = stat(executable)
+    cached = _executable_versions.get(executable, None)
+    if cached and cached[0] == executable_stat.st_size and cached[1] == executable_stat.st_mtime_ns:
+        return cached[2]
+
+    process = QtCore.QProcess(FreeCADGui.getMainWindow())
+
+    if platform in ("linux", "linux2"):
+        environ["LD_LIBRARY_PATH"] = path.dirname(executable)
+
+    ensure_process_is_executable_or_fail(executable)
+    process.start("\"{}\" -ver".format(executable))
+    process.waitForFinished()
+    output = process.readAllStandardOutput().data()
+    try:
+        version = str(output, encoding='utf-8')
+    except UnicodeDecodeError:
+        version = str(output, encoding='latin1')
+    _executable_versions[executable] = (executable_stat.st_size, executable_stat.st_mtime_ns, version)
+    return version
+
+
+def get_gencase_arguments(case_path: str, case_name: str) -> list:
+    """ Returns the arguments to run GenCase on the definition XML exported for a case. """
+    return ["{path}/{name}_Def".format(path=case_path, name=case_name),
+            "{path}/{name}_out/{name}".format(path=case_path, name=case_name),
+            "-save:+all"]
+
+
 def get_executable_info_flag(executable: str) -> dict:
     """ Returns a dictionary with the JSON generated by the -info flag on the
         DualSPHysics package executables. """
@@ -10,15 +10,13 @@ meant to use with FreeCAD.
 
 """
 
-import pickle
 import json
-import shutil
-import re
 
 from sys import platform
+from pickle import UnpicklingError
 from traceback import print_exc
 from glob import glob
-from os import path, chdir, makedirs
+from os import path, makedirs, replace, remove
 
 import FreeCAD
 import FreeCADGui
@@ -27,15 +25,18 @@ import Fem
 
 from femmesh.femmesh2mesh import femmesh_2_mesh
 
-from mod.stdout_tools import error, debug
+from mod.stdout_tools import log
 from mod.translation_tools import __
 from mod.xml.xml_exporter import XMLExporter
 from mod.dialog_tools import error_dialog, warning_dialog
 from mod.executable_tools import refocus_cwd
+from mod.staging_tools import stage_files
+from mod.gui_tools import run_in_background
+from mod.case_data_tools import load_case_data, dump_case_data, migrate_case
 from mod.freecad_tools import document_count, prompt_close_all_documents, get_fc_object
 from mod.enums import ObjectType, ObjectFillMode
 
-from mod.constants import VERSION, PICKLE_PROTOCOL
+from mod.constants import VERSION
 
 from mod.dataobjects.flow_tool_box import FlowToolBox
 from mod.dataobjects.motion.special_movement import SpecialMovement
@@ -48,11 +49,50 @@ from mod.dataobjects.simulation_object import SimulationObject
 from mod.dataobjects.properties.material_property import MaterialProperty
 
 
-def get_total_exported_parts_from_disk(out_folder_path) -> int:
-    """ Gets the integer for the part with largest number on the out folder. """
-    files_glob = glob("{}/Part_*.bi4".format(out_folder_path))
-    files_glob.sort()
-    return int(re.search("Part_(.*).bi4", files_glob[-1]).group(1))
+# Fingerprint of the object geometry last exported to each STL file path.
+_stl_fingerprints: dict = dict()  # {stl_path: fingerprint}
+
+
+def get_shape_fingerprint(fc_object) -> tuple:
+    """ Returns a tuple identifying the geometry and placement of a FreeCAD object, to know if it needs to be exported again. """
+    placement = fc_object.Placement
+    fingerprint = [fc_object.TypeId, tuple(placement.Base), tuple(placement.Rotation.Q)]
+    if hasattr(fc_object, "Mesh"):
+        mesh = fc_object.Mesh
+        fingerprint += [mesh.CountPoints, mesh.CountFacets, mesh.Area, mesh.Volume, str(mesh.BoundBox)]
+    if hasattr(fc_object, "Shape"):
+        fingerprint += [fc_object.Shape.hashCode(), str(fc_object.Shape.BoundBox)]
+    return tuple(fingerprint)
+
+
+def export_stl(fc_object, stl_path: str) -> None:
+    """ Exports an object to STL. It is written to a temporary file first and then renamed, so the file is never left half written. """
+    tmp_path = "{}.tmp.stl".format(stl_path)
+    try:
+        Mesh.export([fc_object], tmp_path)
+        replace(tmp_path, stl_path)
+    finally:
+        if path.isfile(tmp_path):
+            remove(tmp_path)
+
+
+def export_complex_objects(save_name: str, objects: list) -> None:
+    """ Exports to STL the given complex objects whose geometry changed since the last export.
+    Exports run on the main thread, as FreeCAD tessellation and Mesh.export are not thread-safe. """
+    written: int = 0
+    skipped: int = 0
+    for obj in objects:
+        fc_object = get_fc_object(obj.name)
+        stl_path = "{}/{}.stl".format(save_name, obj.name)
+        fingerprint = get_shape_fingerprint(fc_object)
+        if path.isfile(stl_path) and _stl_fingerprints.get(stl_path, None) == fingerprint:
+            skipped += 1
+            continue
+        export_stl(fc_object, stl_path)
+        _stl_fingerprints[stl_path] = fingerprint
+        written += 1
+
+    log("STL export finished: {} written, {} skipped as unchanged".format(written, skipped))
 
 
 def load_case(load_path: str) -> "Case":
@@ -70,22 +110,27 @@ def load_case(load_path: str) -> "Case":
 
     FreeCAD.open(project_folder_path + "/DSPH_Case.FCStd")
 
-    with open(load_path, "rb") as load_picklefile:
-        try:
-            loaded_data = pickle.load(load_picklefile)
-            if not loaded_data.version:
-                warning_dialog(__("The case data you're trying to load is older than version 0.6 and cannot be loaded."))
-                prompt_close_all_documents(prompt=False)
-                return None
-            if loaded_data.version < VERSION:
-                warning_dialog(__("The case data you are loading is from a previous version ({}) of this software. They may be missing features or errors.").format(loaded_data.version))
-            elif loaded_data.version > VERSION:
-                warning_dialog(__("You're loading a case data from a future version ({}) of this software. You should upgrade DesignSPHysics as they may be errors using this file.").format(loaded_data.version))
-
-            return loaded_data
-        except AttributeError:
-            error_dialog(__("There was an error opening the case. Case Data file seems to be corrupted."))
+    try:
+        loaded_data, schema_version = load_case_data(load_path)
+        if not loaded_data.version:
+            warning_dialog(__("The case data you're trying to load is older than version 0.6 and cannot be loaded."))
+            prompt_close_all_documents(prompt=False)
             return None
+        if loaded_data.version < VERSION:
+            warning_dialog(__("The case data you are loading is from a previous version ({}) of this software. They may be missing features or errors.").format(loaded_data.version))
+        elif loaded_data.version > VERSION:
+            warning_dialog(__("You're loading a case data from a future version ({}) of this software. You should upgrade DesignSPHysics as they may be errors using this file.").format(loaded_data.version))
+
+        return migrate_case(loaded_data, schema_version)
+    except ValueError as ex:
+        # The case data was written with a newer schema than this version supports
+        warning_dialog(__("The case data you're trying to load was saved by a newer version of this software and cannot be loaded. Please upgrade DesignSPHysics."), str(ex))
+        prompt_close_all_documents(prompt=False)
+        return None
+    except (AttributeError, UnpicklingError, EOFError):
+        error_dialog(__("There was an error opening the case. Case Data file seems to be corrupted."))
+        prompt_close_all_documents(prompt=False)
+        return None
 
 
 def save_case(save_name: str, case: "Case") -> None:
@@ -101,170 +146,50 @@ def save_case(save_name: str, case: "Case") -> None:
         makedirs("{}/{}_out".format(save_name, project_name))
 
     # Export all complex objects to STL
-    for obj in case.get_all_complex_objects():
-        Mesh.export([get_fc_object(obj.name)], "{}/{}.stl".format(save_name, obj.name))
+    export_complex_objects(save_name, case.get_all_complex_objects())
 
-    # FIXME: Too many branches
+    # Gather files from movements, acceleration input, pistons and relaxation zones to copy them inside the project and
+    # change their paths to relative ones. Relative paths are relative to the project folder.
+    staged_files: list = list()  # [(source_paths, object_holding_the_path, attribute_name)]
 
-    # Copy files from movements and change its paths to be inside the project.
     for _, mkproperties in case.mkbasedproperties.items():
         for movement in mkproperties.movements:
-            if isinstance(movement, SpecialMovement):
-                if isinstance(movement.generator, (FileGen, RotationFileGen)):
-                    filename = movement.generator.filename
-                    debug("Copying {} to {}".format(filename, save_name))
-
-                    # Change directory to de case one, so if file path is already relative it copies it to the
-                    # out folder
-                    chdir(save_name)
-
-                    try:
-                        # Copy to project root
-                        shutil.copy2(filename, save_name)
-                    except shutil.Error:
-                        # Probably already copied the file.
-                        pass
-                    except IOError:
-                        error("Unable to copy {} into {}".format(filename, save_name))
-
-                    try:
-                        # Copy to project out folder
-                        shutil.copy2(filename, save_name + "/" + project_name + "_out")
-
-                        movement.generator.filename = "{}".format(filename.split("/")[-1])
-                    except shutil.Error:
-                        # Probably already copied the file.
-                        pass
-                    except IOError:
-                        error("Unable to copy {} into {}".format(filename, save_name + "/" + project_name + "_out"))
-
-    # Copy files from Acceleration input and change paths to be inside the project folder.
+            if isinstance(movement, SpecialMovement) and isinstance(movement.generator, (FileGen, RotationFileGen)):
+                staged_files.append(([path.join(save_name, movement.generator.filename)], movement.generator, "filename"))
+
     for aid in case.acceleration_input.acclist:
-        filename = aid.datafile
-        debug("Copying {} to {}".format(filename, save_name + "/" + project_name + "_out"))
-
-        # Change directory to de case one, so if file path is already relative it copies it to the
-        # out folder
-        chdir(save_name)
-
-        try:
-            # Copy to project root
-            shutil.copy2(filename, save_name)
-        except shutil.Error:
-            # Probably already copied the file.
-            pass
-        except IOError:
-            error("Unable to copy {} into {}".format(filename, save_name))
-
-        try:
-            # Copy to project out folder
-            shutil.copy2(filename, save_name + "/" + project_name + "_out")
-
-            aid.datafile = filename.split("/")[-1]
-
-        except shutil.Error:
-            # Probably already copied the file.
-            pass
-        except IOError:
-            error("Unable to copy {} into {}".format(filename, save_name))
-
-    # Copy files from pistons and change paths to be inside the project folder.
+        staged_files.append(([path.join(save_name, aid.datafile)], aid, "datafile"))
+
     for _, mkproperties in case.mkbasedproperties.items():
         if isinstance(mkproperties.mlayerpiston, MLPiston1D):
-            filename = mkproperties.mlayerpiston.filevelx
-            debug("Copying {} to {}".format(filename, save_name + "/" + project_name + "_out"))
-            # Change directory to de case one, so if file path is already relative it copies it to the
-            # out folder
-            chdir(save_name)
-
-            try:
-                # Copy to project root
-                shutil.copy2(filename, save_name)
-            except shutil.Error:
-                # Probably already copied the file.
-                pass
-            except IOError:
-                error("Unable to copy {} into {}".format(filename, save_name))
-
-            try:
-                # Copy to project out folder
-                shutil.copy2(filename, save_name + "/" + project_name + "_out")
-
-                mkproperties.mlayerpiston.filevelx = filename.split("/")[-1]
-            except shutil.Error:
-                # Probably already copied the file.
-                pass
-            except IOError:
-                error("Unable to copy {} into {}".format(filename, save_name))
+            staged_files.append(([path.join(save_name, mkproperties.mlayerpiston.filevelx)], mkproperties.mlayerpiston, "filevelx"))
 
         if isinstance(mkproperties.mlayerpiston, MLPiston2D):
-            veldata = mkproperties.mlayerpiston.veldata
-            for v in veldata:
-                filename = v.filevelx
-                debug("Copying {} to {}".format(filename, save_name + "/" + project_name + "_out"))
-                # Change directory to de case one, so if file path is already relative it copies it to the
-                # out folder
-                chdir(save_name)
-
-                try:
-                    # Copy to project root
-                    shutil.copy2(filename, save_name)
-                except shutil.Error:
-                    # Probably already copied the file.
-                    pass
-                except IOError:
-                    error("Unable to copy {} into {}".format(filename, save_name))
-
-                try:
-                    # Copy to project out folder
-                    shutil.copy2(filename, save_name + "/" + project_name + "_out")
-
-                    v.filevelx = filename.split("/")[-1]
-                except shutil.Error:
-                    # Probably already copied the file.
-                    pass
-                except IOError:
-                    error("Unable to copy {} into {}".format(filename, save_name))
-
-    # Copies files needed for RelaxationZones into the project folder and changes data paths to relative ones.
+            for v in mkproperties.mlayerpiston.veldata:
+                staged_files.append(([path.join(save_name, v.filevelx)], v, "filevelx"))
+
     if isinstance(case.relaxation_zone, RelaxationZoneFile) and case.relaxation_zone.filesvel:
-        # Need to copy the abc_x*_y*.csv file series to the out folder
-        filename = case.relaxation_zone.filesvel
-
-        # Change directory to de case one, so if file path is already relative it copies it to the
-        # out folder
-        chdir(save_name)
-
-        for f in glob("{}*".format(filename)):
-            debug("Copying {} to {}".format(filename, save_name + "/" + project_name + "_out"))
-            try:
-                # Copy to project root
-                shutil.copy2(f, save_name)
-            except shutil.Error:
-                # Probably already copied the file.
-                pass
-            except IOError:
-                error("Unable to copy {} into {}".format(filename, save_name))
-
-            try:
-                # Copy to project out folder
-                shutil.copy2(f, save_name + "/" + project_name + "_out")
-
-                case.relaxation_zone.filesvel = filename.split("/")[-1]
-            except shutil.Error:
-                # Probably already copied the file.
-                pass
-            except IOError:
-                error("Unable to copy {} into {}".format(filename, save_name))
+        # Need to copy the abc_x*_y*.csv file series
+        staged_files.append((glob("{}*".format(path.join(save_name, case.relaxation_zone.filesvel))), case.relaxation_zone, "filesvel"))
+
+    # Staged on a background thread so the interface is still repainted while large files are copied
+    staging_progress: dict = {"done": 0, "total": 0}
+    failed_files: list = run_in_background(
+        lambda: stage_files(save_name, [f for sources, _, _ in staged_files for f in sources], [save_name, "{}/{}_out".format(save_name, project_name)],
+                            on_progress=lambda done, total: staging_progress.update(done=done, total=total)),
+        __("Copying case files..."), lambda: (staging_progress["done"], staging_progress["total"]))
+
+    for sources, holder, attribute in staged_files:
+        if sources and not any(f in failed_files for f in sources):
+            setattr(holder, attribute, path.basename(getattr(holder, attribute)))
 
     # Dumps all the case data to an XML file.
     XMLExporter().save_to_disk(save_name, case)
 
     case.version = VERSION
-    # Save data array on disk. It is saved as a binary file with Pickle.
+    # Save data array on disk. It is saved as a binary file with a versioned header.
     try:
-        with open(save_name + "/casedata.dsphdata", "wb") as picklefile:
-            pickle.dump(case, picklefile, PICKLE_PROTOCOL)
+        dump_case_data(case, save_name + "/casedata.dsphdata")
     except Exception:
         print_exc()
         error_dialog(__("There was a problem saving the DSPH information file (casedata.dsphdata)."))
@@ -345,21 +270,22 @@ def create_flowtool_boxes(file_path: str, boxes: list):
             f.write("\n")
 
 
+def get_measuretool_info(points: list, grid: list) -> str:
+    """ Returns the contents of the measuretool points/grid information file.
+        One of the parameters must be an empty list while the other must contain data. """
+    if points:
+        return "POINTS\n" + "".join("{}  {}  {}\n".format(*curr_point) for curr_point in points)
+    if grid:
+        return "".join("POINTSLIST\n{}  {}  {}\n{}  {}  {}\n{}  {}  {}\n".format(*curr_point) for curr_point in grid)
+    raise RuntimeError("Attempting to save measuretool info with no points or grid setup.")
+
+
 def save_measuretool_info(case_path: str, points: list, grid: list) -> None:
     """ Creates a file with measuretool points/grid information.
         One of the parameters must be an empty list while the other must contain data. """
-    if points:
-        with open("{}/points.txt".format(case_path), "w", encoding="utf-8") as f:
-            f.write("POINTS\n")
-            for curr_point in points:
-                f.write("{}  {}  {}\n".format(*curr_point))
-    elif grid:
-        with open("{}/points.txt".format(case_path), "w", encoding="utf-8") as f:
-            for curr_point in grid:
-                f.write("POINTSLIST\n")
-                f.write("{}  {}  {}\n{}  {}  {}\n{}  {}  {}\n".format(*curr_point))
-    else:
-        raise RuntimeError("Attempting to save measuretool info with no points or grid setup.")
+    measuretool_info = get_measuretool_info(points, grid)
+    with open("{}/points.txt".format(case_path), "w", encoding="utf-8") as f:
+        f.write(measuretool_info)
 
 
 def load_default_materials() -> list:
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3.7
+# -*- coding: utf-8 -*-
+
+""" GenCase results cache.
+
+Stores the files generated by GenCase keyed by a hash of everything that
+can change its result: the case definition XML, the files it references
+(geometry, materials...) and the GenCase version. Running GenCase on a
+case that already produced a cached result restores those files instead.
+Entries are independent copies of the files, never hard links, so runs
+writing to the out folder afterwards can not change them.
+
+"""
+
+import re
+import json
+import time
+import shutil
+import hashlib
+
+from os import path, listdir, makedirs, stat
+
+import FreeCAD
+
+from mod.stdout_tools import debug, log
+from mod.staging_tools import get_file_hash, clone_or_copy_file
+
+from mod.constants import GENCASE_CACHE_FOLDER_NAME
+
+GENCASE_CACHE_METADATA_FILE_NAME = "gencase_cache.json"
+
+# The generation date on the definition XML changes each time it is exported
+DEFINITION_DATE_REGEX = re.compile(r'date="[^"]*"')
+
+# Attributes of the definition XML referencing the files GenCase reads, i.e. <drawfilestl file="Box.stl">
+DEFINITION_FILE_REGEX = re.compile(r'\sfile="([^"]+)"')
+
+# Hashes already computed for each file, reused while the file size and modification time do not change.
+_file_hashes: dict = dict()  # {file_path: (size, mtime, hash)}
+
+
+def get_gencase_cache_folder() -> str:
+    """ Returns the folder where the GenCase results are cached. """
+    return "{datadir}/{folder}".format(datadir=FreeCAD.getUserAppDataDir(), folder=GENCASE_CACHE_FOLDER_NAME)
+
+
+def get_cached_file_hash(file_path: str) -> str:
+    """ Returns the hash of a file, reusing the last one computed if the file was not modified since then. """
+    file_stat = stat(file_path)
+    cached = _file_hashes.get(file_path, None)
+    if cached and cached[0] == file_stat.st_size and cached[1] == file_stat.st_mtime_ns:
+        return cached[2]
+    file_hash = get_file_hash(file_path)
+    _file_hashes[file_path] = (file_stat.st_size, file_stat.st_mtime_ns, file_hash)
+    return file_hash
+
+
+def get_gencase_cache_key(case_path: str, case_name: str, gencase_version: str) -> str:
+    """ Returns a key identifying the result GenCase would produce for the case in the given folder, hashing its definition XML
+    and the files the definition references, resolved from the case folder when they are relative. """
+    key_hash = hashlib.sha1()
+    key_hash.update(gencase_version.encode("utf-8"))
+    key_hash.update(case_name.encode("utf-8"))
+
+    with open("{}/{}_Def.xml".format(case_path, case_name), "r", encoding="utf-8") as f:
+        definition = DEFINITION_DATE_REGEX.sub("", f.read(), count=1)
+    key_hash.update(definition.encode("utf-8"))
+
+    for file_name in sorted(set(DEFINITION_FILE_REGEX.findall(definition))):
+        file_path = file_name if path.isabs(file_name) else "{}/{}".format(case_path, file_name)
+        key_hash.update(file_name.encode("utf-8"))
+        key_hash.update(get_cached_file_hash(file_path).encode("utf-8") if path.isfile(file_path) else b"missing")
+
+    return key_hash.hexdigest()
+
+
+def get_cache_entry_metadata(entry_folder: str) -> dict:
+    """ Returns the metadata stored for a cache entry, or None if it is not a valid entry. """
+    metadata_path = "{}/{}".format(entry_folder, GENCASE_CACHE_METADATA_FILE_NAME)
+    if not path.isfile(metadata_path):
+        return None
+    try:
+        with open(metadata_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except ValueError:
+        return None
+
+
+def save_cache_entry_metadata(entry_folder: str, metadata: dict) -> None:
+    """ Persists the metadata for a cache entry. """
+    with open("{}/{}".format(entry_folder, GENCASE_CACHE_METADATA_FILE_NAME), "w", encoding="utf-8") as f:
+        json.dump(metadata, f, indent=4)
+
+
+def restore_gencase_result(cache_key: str, out_folder: str) -> dict:
+    """ Places the files of a cached GenCase result on the out folder.
+    Returns the metadata stored with the result, or None if there is no result cached for the key. """
+    entry_folder = "{}/{}".format(get_gencase_cache_folder(), cache_key)
+    metadata = get_cache_entry_metadata(entry_folder)
+    if not metadata:
+        return None
+    entry_files = ["{}/{}".format(entry_folder, file_name) for file_name in metadata["files"]]
+    if any(not path.isfile(file_path) or stat(file_path).st_nlink > 1 for file_path in entry_files):
+        # Incomplete, or stored by a previous version as hard links to an out folder that may have been rewritten since then
+        debug("Discarding GenCase cache entry {}".format(cache_key))
+        shutil.rmtree(entry_folder, ignore_errors=True)
+        return None
+
+    if not path.isdir(out_folder):
+        makedirs(out_folder)
+
+    for file_name in metadata["files"]:
+        clone_or_copy_file("{}/{}".format(entry_folder, file_name), "{}/{}".format(out_folder, file_name))
+
+    metadata["last_used"] = time.time()
+    save_cache_entry_metadata(entry_folder, metadata)
+    log("Restored GenCase result {} from cache".format(cache_key))
+    return metadata
+
+
+def store_gencase_result(cache_key: str, out_folder: str, particle_number: int, output: str, max_size_mb: int) -> None:
+    """ Stores the files GenCase generated on the out folder as the result for the given key,
+    evicting the least recently used results to keep the cache below the size limit. """
+    cache_folder = get_gencase_cache_folder()
+    entry_folder = "{}/{}".format(cache_folder, cache_key)
+    if path.isdir(entry_folder):
+        shutil.rmtree(entry_folder)
+    makedirs(entry_folder)
+
+    files = [f for f in listdir(out_folder) if path.isfile("{}/{}".format(out_folder, f))]
+    size = 0
+    for file_name in files:
+        clone_or_copy_file("{}/{}".format(out_folder, file_name), "{}/{}".format(entry_folder, file_name))
+        size += stat("{}/{}".format(entry_folder, file_name)).st_size
+
+    save_cache_entry_metadata(entry_folder, {
+        "files": files,
+        "size": size,
+        "particle_number": particle_number,
+        "output": output,
+        "last_used": time.time()
+    })
+    debug("Stored GenCase result {} in cache ({} bytes)".format(cache_key, size))
+    evict_gencase_results(max_size_mb)
+
+
+def evict_gencase_results(max_size_mb: int) -> None:
+    """ Removes the least recently used results until the cache size is under the limit. """
+    cache_folder = get_gencase_cache_folder()
+    if not path.isdir(cache_folder):
+        return
+
+    entries: list = list()
+    for entry_name in listdir(cache_folder):
+        entry_folder = "{}/{}".format(cache_folder, entry_name)
+        metadata = get_cache_entry_metadata(entry_folder)
+        if metadata is None:
+            # Incomplete or corrupted entry
+            shutil.rmtree(entry_folder, ignore_errors=True)
+            continue
+        entries.append((metadata["last_used"], metadata["size"], entry_folder))
+
+    entries.sort()
+    total_size = sum(size for _, size, _ in entries)
+    while entries and total_size > max_size_mb * 1024 * 1024:
+        _, size, entry_folder = entries.pop(0)
+        debug("Evicting GenCase cache entry {}".format(entry_folder))
+        shutil.rmtree(entry_folder, ignore_errors=True)
+        total_size -= size
@@ -8,8 +8,14 @@ operations in DesignSPHysics.
 """
 
 import os
+import threading
 
-from PySide import QtGui
+from PySide import QtCore, QtGui
+
+from mod.translation_tools import __
+from mod.enums import JobState
+
+from mod.constants import BACKGROUND_POLL_INTERVAL_MS, BACKGROUND_DIALOG_DELAY_MS
 
 
 def h_line_generator() -> QtGui.QFrame:
@@ -34,3 +40,64 @@ def get_icon(file_name, return_only_path=False) -> QtGui.QIcon:
     if os.path.isfile(file_to_load):
         return file_to_load if return_only_path else QtGui.QIcon(file_to_load)
     raise IOError("File {} not found in images folder".format(file_name))
+
+
+def get_job_state_label(state: str) -> str:
+    """ Returns the translated name of a JobState, to show the state of jobs and post-processing tasks. """
+    return {
+        JobState.QUEUED: __("Queued"),
+        JobState.RUNNING: __("Running"),
+        JobState.PAUSED: __("Paused"),
+        JobState.FINISHED: __("Finished"),
+        JobState.FAILED: __("Failed"),
+        JobState.CANCELLED: __("Cancelled"),
+        JobState.INTERRUPTED: __("Interrupted")
+    }.get(state, state)
+
+
+def run_in_background(function, label: str, get_progress=None):
+    """ Runs function on a background thread and returns its result, keeping the interface repainted while it runs.
+    User input is ignored until it finishes. If it takes a while a progress dialog is shown with the given label and
+    the (done, total) tuple returned by get_progress, polled from the GUI thread. Exceptions are raised again here. """
+    result: dict = dict()
+
+    def run():
+        """ Stores the result or the exception raised by the function. """
+        try:
+            result["value"] = function()
+        except Exception as ex:  # pylint: disable=broad-except
+            result["error"] = ex
+
+    thread = threading.Thread(target=run, daemon=True)
+    loop = QtCore.QEventLoop()
+
+    progress_dialog = QtGui.QProgressDialog()
+    progress_dialog.setLabelText(label)
+    progress_dialog.setCancelButton(None)
+    progress_dialog.setRange(0, 0)
+    progress_dialog.setWindowModality(QtCore.Qt.ApplicationModal)
+    progress_dialog.setMinimumDuration(BACKGROUND_DIALOG_DELAY_MS)
+
+    def on_poll():
+        """ Updates the progress and ends the loop when the function finishes. """
+        if not thread.is_alive():
+            loop.quit()
+            return
+        if get_progress:
+            done, total = get_progress()
+            if total:
+                progress_dialog.setRange(0, total)
+                progress_dialog.setValue(done)
+
+    poll_timer = QtCore.QTimer()
+    poll_timer.timeout.connect(on_poll)
+    thread.start()
+    poll_timer.start(BACKGROUND_POLL_INTERVAL_MS)
+    loop.exec_(QtCore.QEventLoop.ExcludeUserInputEvents)
+    poll_timer.stop()
+    progress_dialog.close()
+    progress_dialog.deleteLater()
+
+    if "error" in result:
+        raise result["error"]
+    return result.get("value", None)
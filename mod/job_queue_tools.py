@@ -0,0 +1,64 @@
+#!/usr/bin/env python3.7
+# -*- coding: utf-8 -*-
+
+""" Simulation job queue persistence related tools.
+
+Each job is stored as a JSON file in a folder of the FreeCAD user data
+directory, so the queue survives FreeCAD restarts.
+
+"""
+
+import json
+
+from os import path, listdir, makedirs, replace, remove
+
+import FreeCAD
+
+from mod.stdout_tools import error
+
+from mod.constants import JOB_QUEUE_FOLDER_NAME
+
+from mod.dataobjects.simulation_job import SimulationJob
+
+
+def get_job_queue_folder() -> str:
+    """ Returns the folder where the queued jobs are stored, creating it if it does not exist. """
+    folder = "{datadir}/{folder}".format(datadir=FreeCAD.getUserAppDataDir(), folder=JOB_QUEUE_FOLDER_NAME)
+    if not path.isdir(folder):
+        makedirs(folder)
+    return folder
+
+
+def get_job_file_path(job_id: str) -> str:
+    """ Returns the file used to store the job with the given id. """
+    return "{}/{}.json".format(get_job_queue_folder(), job_id)
+
+
+def save_job(job: SimulationJob) -> None:
+    """ Persists a job, replacing its previous file atomically. """
+    job_file_path = get_job_file_path(job.id)
+    with open("{}.tmp".format(job_file_path), "w", encoding="utf-8") as f:
+        json.dump(job.to_dict(), f, indent=4)
+    replace("{}.tmp".format(job_file_path), job_file_path)
+
+
+def remove_job(job_id: str) -> None:
+    """ Removes the stored file of a job. """
+    job_file_path = get_job_file_path(job_id)
+    if path.isfile(job_file_path):
+        remove(job_file_path)
+
+
+def load_jobs() -> list:
+    """ Returns all the stored jobs, ordered by creation time. """
+    jobs: list = list()
+    folder = get_job_queue_folder()
+    for file_name in listdir(folder):
+        if not file_name.endswith(".json"):
+            continue
+        try:
+            with open("{}/{}".format(folder, file_name), "r", encoding="utf-8") as f:
+                jobs.append(SimulationJob.from_dict(json.load(f)))
+        except ValueError:
+            error("Job file {} is corrupted and will be ignored".format(file_name))
+    return sorted(jobs, key=lambda job: job.created)
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3.7
+# -*- coding: utf-8 -*-
+""" DesignSPHysics simulation job scheduler. """
+
+import os
+import time
+import signal
+
+from os import path, environ
+from sys import platform
+
+from PySide import QtCore
+
+from mod.translation_tools import __
+from mod.stdout_tools import log, debug, error
+from mod.executable_tools import refocus_cwd, ensure_process_is_executable_or_fail
+from mod.freecad_tools import get_fc_main_window
+from mod.job_queue_tools import save_job, remove_job, load_jobs
+from mod.results_catalog_tools import get_results_catalog
+
+from mod.enums import JobState
+
+from mod.dataobjects.application_settings import ApplicationSettings
+from mod.dataobjects.simulation_job import SimulationJob
+
+
+class JobScheduler(QtCore.QObject):
+    """ Runs the jobs of the persistent job queue in background, as many at once as the
+    application settings and the available CPU threads allow. """
+    __instance: "JobScheduler" = None
+
+    job_changed = QtCore.Signal(str)
+    job_finished = QtCore.Signal(str, int)
+
+    def __init__(self):
+        """ Virtually private constructor. """
+        if JobScheduler.__instance is not None:
+            raise Exception("JobScheduler class is a singleton and should not be initialized twice")
+        super().__init__(parent=get_fc_main_window())
+        JobScheduler.__instance = self
+        self.jobs: dict = dict()  # {job_id: SimulationJob}
+        self.processes: dict = dict()  # {job_id: QtCore.QProcess}
+        self.restore_from_disk()
+
+        # Continue with the jobs left on the queue once the application finishes loading
+        QtCore.QTimer.singleShot(0, self.schedule)
+
+    @staticmethod
+    def the() -> "JobScheduler":
+        """ Static access method. """
+        if JobScheduler.__instance is None:
+            JobScheduler()
+        return JobScheduler.__instance
+
+    def restore_from_disk(self) -> None:
+        """ Loads the stored jobs. Jobs that were running when the application closed are marked as interrupted,
+        keeping their outputs, until they are explicitly queued again with requeue. """
+        for job in load_jobs():
+            if job.state == JobState.RUNNING or (job.state == JobState.PAUSED and job.started is not None):
+                debug("Job {} was interrupted".format(job.id))
+                job.state = JobState.INTERRUPTED
+                job.finished = job.finished or time.time()
+                save_job(job)
+            self.jobs[job.id] = job
+
+    def get_jobs(self) -> list:
+        """ Returns all the jobs, ordered by creation time. """
+        return sorted(self.jobs.values(), key=lambda job: job.created)
+
+    def get_job(self, job_id: str) -> SimulationJob:
+        """ Returns the job with the given id, or None if it does not exist. """
+        return self.jobs.get(job_id, None)
+
+    def set_state(self, job: SimulationJob, state: str) -> None:
+        """ Changes the state of a job, persisting and notifying the change. """
+        job.state = state
+        save_job(job)
+        self.job_changed.emit(job.id)
+
+    def get_conflicting_job(self, job: SimulationJob) -> SimulationJob:
+        """ Returns an active job, other than the given one, writing to its same out folder, or None if there is none. """
+        return next((other for other in self.jobs.values() if other.id != job.id and other.is_active() and other.shares_out_folder(job)), None)
+
+    def submit(self, job: SimulationJob) -> bool:
+        """ Adds a job to the queue and starts it if there are resources available.
+        Jobs whose out folder is used by another queued, running or paused job are rejected. Returns whether the job was queued. """
+        if self.get_conflicting_job(job) is not None:
+            error(__("Job for case {} rejected: job {} is already using {}").format(job.case_name, self.get_conflicting_job(job).id, job.get_out_folder_path()))
+            return False
+        self.jobs[job.id] = job
+        log(__("Job {} queued for case {}").format(job.id, job.case_name))
+        self.set_state(job, JobState.QUEUED)
+        self.schedule()
+        return True
+
+    def get_restart_part(self, job: SimulationJob) -> int:
+        """ Returns the last complete part on the out folder of a job, that it can resume from, or None if there is none. """
+        return get_results_catalog(job.get_out_folder_path()).get_latest_complete_part()
+
+    def requeue(self, job_id: str, resume: bool) -> bool:
+        """ Queues again an interrupted, failed or cancelled job. If resume is set the simulation continues from the
+        last part on its out folder (see get_restart_part), keeping the outputs. Otherwise it runs from the beginning, removing
+        them once it starts. Returns whether the job was queued, which is not the case when resuming a job without parts. """
+        job = self.jobs[job_id]
+        if job.is_active() or self.get_conflicting_job(job) is not None:
+            return False
+        job.restart_part = self.get_restart_part(job) if resume else None
+        if resume and job.restart_part is None:
+            return False
+        job.started = None
+        job.finished = None
+        job.exit_code = None
+        log(__("Job {} queued again for case {}").format(job.id, job.case_name))
+        self.set_state(job, JobState.QUEUED)
+        self.schedule()
+        return True
+
+    def get_job_threads(self, job: SimulationJob) -> int:
+        """ Returns the number of host threads a job uses. """
+        if job.device.lower() != "cpu":
+            return 1
+        return min(job.threads, os.cpu_count()) if job.threads > 0 else os.cpu_count()
+
+    def can_start(self, job: SimulationJob) -> bool:
+        """ Returns whether there are resources available to start the job and no other started job writes to its out folder.
+        Paused jobs keep their out folder but do not count towards the running jobs, GPU jobs and threads limits. """
+        if any(self.jobs[job_id].shares_out_folder(job) for job_id in self.processes):
+            return False
+        running = [self.jobs[job_id] for job_id in self.processes if self.jobs[job_id].state == JobState.RUNNING]
+        if len(running) >= ApplicationSettings.the().job_queue_max_running_jobs:
+            return False
+        if job.device.lower() == "gpu" and len([r for r in running if r.device.lower() == "gpu"]) >= ApplicationSettings.the().job_queue_max_gpu_jobs:
+            return False
+        if not running:
+            return True
+        used_threads = sum(self.get_job_threads(r) for r in running)
+        return used_threads + self.get_job_threads(job) <= os.cpu_count()
+
+    def schedule(self) -> None:
+        """ Starts the queued jobs, by priority and then by age, while there are resources available for them. """
+        queued = sorted([job for job in self.jobs.values() if job.state == JobState.QUEUED], key=lambda job: (-job.priority, job.created))
+        for job in queued:
+            if job.state != JobState.QUEUED:
+                # Started or failed meanwhile
+                continue
+            if not self.can_start(job):
+                if any(self.jobs[job_id].shares_out_folder(job) for job_id in self.processes):
+                    # Waits for the job using its out folder, without holding the ones behind it
+                    continue
+                break
+            self.start_job(job)
+
+    def start_job(self, job: SimulationJob) -> None:
+        """ Launches the DualSPHysics process for a job. Jobs that can not be launched are marked as failed, freeing their slot. """
+        refocus_cwd()
+
+        # Remove the parts of a previous run, unless the job resumes from them
+        if job.restart_part is None and path.isdir(job.get_out_folder_path()):
+            for file_name in os.listdir(job.get_out_folder_path()):
+                if file_name.startswith("Part"):
+                    os.remove(job.get_out_folder_path() + file_name)
+
+        process = QtCore.QProcess(get_fc_main_window())
+        process.finished.connect(lambda exit_code, _=None, job_id=job.id: self.on_process_finished(job_id, exit_code))
+
+        self.processes[job.id] = process
+        job.started = time.time()
+        job.finished = None
+        job.exit_code = None
+        self.set_state(job, JobState.RUNNING)
+        try:
+            ensure_process_is_executable_or_fail(job.executable)
+        except (RuntimeError, OSError) as ex:
+            error("Error starting job {}: {}".format(job.id, ex))
+            self.fail_start(job)
+            return
+        if platform in ("linux", "linux2"):
+            environ["LD_LIBRARY_PATH"] = path.dirname(job.executable)
+        process.start(job.executable, job.get_arguments())
+
+        if not process.waitForStarted():
+            error("Error starting job {}: {}".format(job.id, job.get_cmd_string()))
+            self.fail_start(job)
+
+    def fail_start(self, job: SimulationJob) -> None:
+        """ Marks a job whose process could not be launched as failed and schedules the jobs behind it. """
+        process = self.processes.pop(job.id, None)
+        if process is not None:
+            process.deleteLater()
+        job.finished = time.time()
+        job.exit_code = -1
+        self.set_state(job, JobState.FAILED)
+        self.job_finished.emit(job.id, -1)
+        # Not from here, as this can be called while scheduling
+        QtCore.QTimer.singleShot(0, self.schedule)
+
+    def on_process_finished(self, job_id: str, exit_code: int) -> None:
+        """ Updates the job whose process finished and starts the next ones. """
+        process = self.processes.pop(job_id, None)
+        if process is not None:
+            process.deleteLater()
+        job = self.jobs.get(job_id, None)
+        if job is None:
+            return
+        job.finished = time.time()
+        job.exit_code = exit_code
+        if job.state != JobState.CANCELLED:
+            self.set_state(job, JobState.FINISHED if exit_code == 0 else JobState.FAILED)
+        self.job_finished.emit(job_id, exit_code)
+        self.schedule()
+
+    def cancel(self, job_id: str) -> None:
+        """ Cancels a job, stopping its process if it is running. """
+        job = self.jobs[job_id]
+        if not job.is_active():
+            return
+        log(__("Cancelling job {}").format(job_id))
+        self.set_state(job, JobState.CANCELLED)
+        if job_id in self.processes:
+            self.resume_process(job_id)
+            self.processes[job_id].kill()
+        else:
+            job.finished = time.time()
+            save_job(job)
+            self.job_finished.emit(job_id, -1)
+
+    def pause(self, job_id: str) -> bool:
+        """ Pauses a job. Queued jobs are held on the queue and running ones are suspended.
+        Returns whether the job could be paused, as suspending processes is only possible on Linux. """
+        job = self.jobs[job_id]
+        if job.state == JobState.QUEUED:
+            self.set_state(job, JobState.PAUSED)
+            return True
+        if job.state != JobState.RUNNING or platform not in ("linux", "linux2"):
+            return False
+        os.kill(self.processes[job_id].processId(), signal.SIGSTOP)
+        self.set_state(job, JobState.PAUSED)
+        # Its CPU threads are free now
+        self.schedule()
+        return True
+
+    def resume(self, job_id: str) -> None:
+        """ Resumes a paused job. """
+        job = self.jobs[job_id]
+        if job.state != JobState.PAUSED:
+            return
+        if job_id in self.processes:
+            self.resume_process(job_id)
+            self.set_state(job, JobState.RUNNING)
+        else:
+            self.set_state(job, JobState.QUEUED)
+            self.schedule()
+
+    def resume_process(self, job_id: str) -> None:
+        """ Continues the process of a job if it was suspended. """
+        if self.jobs[job_id].started is not None and platform in ("linux", "linux2"):
+            os.kill(self.processes[job_id].processId(), signal.SIGCONT)
+
+    def remove(self, job_id: str) -> None:
+        """ Removes a job that is not active from the queue. """
+        if self.jobs[job_id].is_active():
+            return
+        self.jobs.pop(job_id)
+        remove_job(job_id)
+        self.job_changed.emit(job_id)
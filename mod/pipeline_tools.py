@@ -0,0 +1,318 @@
+#!/usr/bin/env python3.7
+# -*- coding: utf-8 -*-
+
+""" Headless GenCase -> DualSPHysics -> post-processing pipeline tools.
+
+Run the stages of a saved case without a FreeCAD GUI session, building the
+same executable parameters as the GUI. Progress is reported on the standard
+output as JSON lines, one event per line.
+
+"""
+
+import sys
+import json
+import time
+import shutil
+import tempfile
+import threading
+import subprocess
+
+from os import path, environ
+from sys import platform
+
+import FreeCAD
+
+from mod.executable_tools import refocus_cwd, ensure_process_is_executable_or_fail, get_gencase_arguments
+from mod.case_data_tools import load_case_data, migrate_case, dump_case_data
+from mod.gencase_cache_tools import get_gencase_cache_key, restore_gencase_result, store_gencase_result
+from mod.file_tools import save_measuretool_info, create_flowtool_boxes
+from mod.run_log_tools import RunLogFollower
+from mod.results_catalog_tools import get_results_catalog
+from mod.post_processing_tools import get_partvtk_parameters, get_floatinginfo_parameters, get_computeforces_parameters
+from mod.post_processing_tools import get_measuretool_parameters, get_isosurface_parameters, get_flowtool_parameters
+from mod.bi4_tools import Bi4Error, generate_check_part_file
+from mod.vtk_tools import export_vtu_series, check_part_vtu
+from mod.xml.xml_exporter import XMLExporter
+
+from mod.constants import TELEMETRY_FILE_NAME, PREVIEW_DEFAULT_PARTICLES, PREVIEW_DEFAULT_ARRAYS
+from mod.constants import GENCASE_TOTAL_PARTICLES_REGEX
+
+from mod.dataobjects.case import Case
+from mod.dataobjects.application_settings import ApplicationSettings
+from mod.dataobjects.simulation_job import SimulationJob
+
+DEFAULT_STAGES = ["xml", "gencase", "simulation"]
+
+# Same defaults as the post-processing dialogs
+DEFAULT_POST_PROCESSING_OPTIONS = {
+    "partvtk": {"save_mode": 0, "save_types": "+all", "file_name": "ExportedPart", "additional_parameters": ""},
+    "floatinginfo": {"filename": "FloatingMotion", "onlyprocess": "", "additional_parameters": ""},
+    "computeforces": {"save_mode": 1, "onlyprocess_tag": "-onlymk:", "onlyprocess": "", "filename": "Force", "additional_parameters": ""},
+    "measuretool": {"save_mode": 1, "save_vars": "+all", "calculate_water_elevation": False, "filename": "MeasurePart", "additional_parameters": ""},
+    "isosurface": {"surface_or_slice": "-saveiso", "file_name": "IsoFile", "additional_parameters": ""},
+    "flowtool": {"csv_name": "_ResultFlow", "vtk_name": "Boxes", "additional_parameters": ""},
+    "vtu": {"file_name": "PartVtu", "arrays": ["idp", "vel", "rhop", "mk"], "mk": [], "types": [], "compress": True, "max_workers": 0,
+            "preview_particles": 0, "preview_method": "voxel"},
+    "preview": {"file_name": "ExportedPart", "arrays": PREVIEW_DEFAULT_ARRAYS, "mk": [], "types": [], "compress": True, "max_workers": 0,
+                "preview_particles": PREVIEW_DEFAULT_PARTICLES, "preview_method": "voxel"}
+}
+
+# {stage: (executable_paths attribute, parameter builder)}. Stages without executable run in this process.
+POST_PROCESSING_STAGES = {
+    "partvtk": ("partvtk", get_partvtk_parameters),
+    "floatinginfo": ("floatinginfo", get_floatinginfo_parameters),
+    "computeforces": ("computeforces", get_computeforces_parameters),
+    "measuretool": ("measuretool", get_measuretool_parameters),
+    "isosurface": ("isosurface", get_isosurface_parameters),
+    "flowtool": ("flowtool", get_flowtool_parameters),
+    "vtu": (None, None),
+    "preview": (None, None)
+}
+
+PROGRESS_INTERVAL_SECONDS = 1.0
+
+
+# Stages may run on several threads at once (see sweep_tools). Each thread can tag its events.
+_event_context = threading.local()
+_stdout_lock = threading.Lock()
+
+
+def set_event_context(**data) -> None:
+    """ Sets the fields added to every event emitted from the current thread. """
+    _event_context.data = data
+
+
+def emit(event: str, **data) -> None:
+    """ Writes an event as a JSON line on the standard output. """
+    data = dict(getattr(_event_context, "data", dict()), **data)
+    data["event"] = event
+    data["time"] = time.time()
+    with _stdout_lock:
+        sys.stdout.write("{}\n".format(json.dumps(data)))
+        sys.stdout.flush()
+
+
+def load_case_headless(case_data_path: str) -> Case:
+    """ Opens the FreeCAD document of a saved case and loads its case data as the current case. """
+    project_folder_path = path.dirname(path.abspath(case_data_path))
+    FreeCAD.openDocument("{}/DSPH_Case.FCStd".format(project_folder_path))
+
+    loaded_data, schema_version = load_case_data(case_data_path)
+    Case.update_from_disk(migrate_case(loaded_data, schema_version))
+
+    # The project may have been moved or renamed since it was saved
+    Case.the().path = project_folder_path
+    Case.the().name = path.basename(project_folder_path)
+    return Case.the()
+
+
+def get_executable_version_headless(executable: str) -> str:
+    """ Returns the standard output of the executable when asked for its version, without needing a Qt application. """
+    ensure_process_is_executable_or_fail(executable)
+    if platform in ("linux", "linux2"):
+        environ["LD_LIBRARY_PATH"] = path.dirname(executable)
+    output = subprocess.run([executable, "-ver"], stdout=subprocess.PIPE, stderr=subprocess.STDOUT, check=False).stdout
+    try:
+        return str(output, encoding="utf-8")
+    except UnicodeDecodeError:
+        return str(output, encoding="latin1")
+
+
+def run_process(stage: str, executable: str, arguments: list, cwd: str = None, on_line=None, on_tick=None) -> tuple:
+    """ Runs an executable streaming each line of its output as an event. Returns its exit code and whole output. """
+    executable = path.abspath(executable)
+    ensure_process_is_executable_or_fail(executable)
+    if platform in ("linux", "linux2"):
+        environ["LD_LIBRARY_PATH"] = path.dirname(executable)
+
+    emit("stage_started", stage=stage, cmd="{} {}".format(executable, " ".join(arguments)))
+    started = time.time()
+    output_lines: list = list()
+    process = subprocess.Popen([executable] + arguments, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+
+    last_tick = 0.0
+    for raw_line in iter(process.stdout.readline, b""):
+        try:
+            line = str(raw_line, encoding="utf-8")
+        except UnicodeDecodeError:
+            line = str(raw_line, encoding="latin1")
+        output_lines.append(line)
+        emit("output", stage=stage, line=line.rstrip())
+        if on_line:
+            on_line(line)
+        if on_tick and time.time() - last_tick > PROGRESS_INTERVAL_SECONDS:
+            on_tick()
+            last_tick = time.time()
+
+    exit_code = process.wait()
+    if on_tick:
+        on_tick()
+    emit("stage_finished", stage=stage, exit_code=exit_code, elapsed=time.time() - started)
+    return exit_code, "".join(output_lines)
+
+
+def run_xml_stage(case: Case) -> int:
+    """ Regenerates the XML files of the case from its data. """
+    emit("stage_started", stage="xml")
+    started = time.time()
+    XMLExporter().save_to_disk(case.path, case)
+    emit("stage_finished", stage="xml", exit_code=0, elapsed=time.time() - started)
+    return 0
+
+
+def run_gencase_stage(case: Case) -> int:
+    """ Runs GenCase on the case, reusing a cached result when possible. """
+    gencase_path = path.abspath(case.executable_paths.gencase)
+    out_folder = case.get_out_folder_path()
+    if path.isdir(out_folder):
+        shutil.rmtree(out_folder)
+
+    cache_max_size_mb: int = ApplicationSettings.the().gencase_cache_max_size_mb
+    cache_key: str = None
+    if cache_max_size_mb > 0:
+        cache_key = get_gencase_cache_key(case.path, case.name, get_executable_version_headless(gencase_path))
+        cached_result: dict = restore_gencase_result(cache_key, out_folder)
+        if cached_result:
+            emit("stage_started", stage="gencase", cached=True)
+            case.info.particle_number = cached_result["particle_number"]
+            case.info.is_gencase_done = True
+            case.info.needs_to_run_gencase = False
+            emit("stage_finished", stage="gencase", exit_code=0, elapsed=0.0, cached=True, particles=case.info.particle_number)
+            return 0
+
+    particles: dict = dict()
+
+    def on_line(line):
+        total_match = GENCASE_TOTAL_PARTICLES_REGEX.search(line)
+        if total_match:
+            particles["total"] = int(total_match.group(1))
+            emit("progress", stage="gencase", particles=particles["total"])
+
+    exit_code, output = run_process("gencase", gencase_path, get_gencase_arguments(case.path, case.name), cwd=case.path, on_line=on_line)
+    if exit_code or "total" not in particles:
+        case.info.is_gencase_done = False
+        case.info.needs_to_run_gencase = True
+        return exit_code or 1
+
+    if cache_key:
+        store_gencase_result(cache_key, out_folder, particles["total"], output, cache_max_size_mb)
+    case.info.particle_number = particles["total"]
+    case.info.is_gencase_done = True
+    case.info.needs_to_run_gencase = False
+    return 0
+
+
+def run_simulation_stage(case: Case, device: str, threads: int) -> int:
+    """ Runs DualSPHysics on the case with the same arguments the simulation dock uses. """
+    additional_parameters = case.info.run_additional_parameters.split(" ") if case.info.run_additional_parameters else list()
+    job = SimulationJob(case_name=case.name, case_path=case.path, executable=case.executable_paths.dsphysics,
+                        device=device, additional_parameters=additional_parameters, threads=threads)
+    run_log = RunLogFollower(job.get_run_log_path())
+
+    def on_tick():
+        run_log.read_new_lines()
+        timemax = case.execution_parameters.timemax if case.execution_parameters.timemax != -1 else run_log.timemax
+        sim_seconds_per_hour, steps_per_second = run_log.telemetry.get_throughput()
+        emit("progress", stage="simulation",
+             percentage=run_log.get_percentage(timemax),
+             sim_time=run_log.last_part_time,
+             particles_out=run_log.total_particles_out,
+             sim_seconds_per_hour=sim_seconds_per_hour,
+             steps_per_second=steps_per_second,
+             remaining_seconds=run_log.telemetry.get_remaining_seconds(timemax))
+
+    case.info.is_simulation_done = False
+    exit_code, _ = run_process("simulation", job.executable, job.get_arguments(), on_tick=on_tick)
+    if run_log.telemetry.size:
+        run_log.telemetry.save(job.get_out_folder_path() + TELEMETRY_FILE_NAME)
+    case.info.is_simulation_done = exit_code == 0
+    case.info.needs_to_run_gencase = exit_code != 0
+    return exit_code
+
+
+def run_post_processing_stage(case: Case, stage: str, options: dict) -> int:
+    """ Runs a post-processing tool with the given export options. """
+    if stage in ("vtu", "preview"):
+        return run_vtu_stage(case, options, stage)
+    executable_attribute, get_parameters = POST_PROCESSING_STAGES[stage]
+    if stage == "measuretool":
+        save_measuretool_info(case.path, case.info.measuretool_points, case.info.measuretool_grid)
+    if stage == "flowtool":
+        create_flowtool_boxes(case.path + "/" + "fileboxes.txt", case.flowtool_boxes)
+
+    exit_code, _ = run_process(stage, getattr(case.executable_paths, executable_attribute), get_parameters(options, case))
+    return exit_code
+
+
+def run_vtu_stage(case: Case, options: dict, stage: str = "vtu") -> int:
+    """ Exports the parts of the case to a binary .vtu series with its .pvd collection, reading them directly from the part files.
+    The preview stage only writes the decimated preview frames of a series, like the one exported by PartVTK. """
+    out_folder_path = case.get_out_folder_path()
+    part_numbers = get_results_catalog(out_folder_path).get_parts()
+    if not part_numbers:
+        emit("error", stage=stage, message="There are no parts to export on {}".format(out_folder_path))
+        return 1
+
+    emit("stage_started", stage=stage, parts=len(part_numbers))
+    started = time.time()
+    exported: list = list()
+
+    def on_part(part, part_time):
+        exported.append(part)
+        emit("progress", stage=stage, part=part, sim_time=part_time, done=len(exported), total=len(part_numbers))
+
+    try:
+        export_vtu_series(out_folder_path, out_folder_path, options["file_name"], options["arrays"], mk=options["mk"],
+                          compress=options["compress"], max_workers=options["max_workers"], on_part=on_part,
+                          preview_particles=options["preview_particles"], preview_method=options["preview_method"], full=stage == "vtu",
+                          types=options["types"])
+    except (Bi4Error, KeyError, OSError, ValueError) as e:
+        emit("error", stage=stage, message=str(e))
+        emit("stage_finished", stage=stage, exit_code=1, elapsed=time.time() - started)
+        return 1
+    emit("stage_finished", stage=stage, exit_code=0, elapsed=time.time() - started)
+    return 0
+
+
+def get_post_processing_options(stage: str, config: dict) -> dict:
+    """ Returns the export options for a post-processing stage: the dialog defaults updated with the ones on the config. """
+    return dict(DEFAULT_POST_PROCESSING_OPTIONS[stage], **config.get(stage, dict()))
+
+
+def run_pipeline(case_data_path: str, stages: list, config: dict) -> int:
+    """ Runs the given pipeline stages in order for a saved case, stopping on the first failure. Returns the exit code. """
+    refocus_cwd()
+    case = load_case_headless(case_data_path)
+    emit("pipeline_started", case=case.name, path=case.path, stages=stages)
+
+    exit_code = 0
+    for stage in stages:
+        if stage == "xml":
+            exit_code = run_xml_stage(case)
+        elif stage == "gencase":
+            exit_code = run_gencase_stage(case)
+        elif stage == "simulation":
+            exit_code = run_simulation_stage(case, config.get("device", "GPU"), config.get("threads", 0))
+        elif stage in POST_PROCESSING_STAGES:
+            exit_code = run_post_processing_stage(case, stage, get_post_processing_options(stage, config))
+        else:
+            emit("error", stage=stage, message="Unknown stage")
+            exit_code = 1
+
+        if exit_code:
+            break
+
+    dump_case_data(case, "{}/casedata.dsphdata".format(case.path))
+    emit("pipeline_finished", case=case.name, exit_code=exit_code)
+    return exit_code
+
+
+def run_check(gencase_path: str) -> int:
+    """ Checks the part file reader and the .vtu export used by the vtu and preview stages on a part file written by
+    the given GenCase executable, on a temporary folder. Returns the exit code. """
+    with tempfile.TemporaryDirectory() as folder_path:
+        part_file = generate_check_part_file(gencase_path, folder_path)
+        emit("check_part_read", file=part_file.title, particles=len(part_file.get_idp()), arrays=part_file.get_array_names())
+        emit("check_vtu_exported", particles=check_part_vtu(part_file, folder_path))
+        del part_file  # Unmaps the file before the folder is removed
+    return 0
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3.7
+# -*- coding: utf-8 -*-
+""" DesignSPHysics post-processing follow mode. """
+
+from PySide import QtCore
+
+from mod.translation_tools import __
+from mod.stdout_tools import log, debug
+from mod.post_processing_scheduler import PostProcessingScheduler
+
+from mod.enums import JobState
+
+from mod.constants import POST_PROCESSING_FOLLOW_INTERVAL_MS
+
+
+class PostProcessingFollower(QtCore.QObject):
+    """ Keeps the outputs of an incremental post-processing tool up to date while a simulation writes its parts.
+    Changes on the out folder are coalesced and trigger a new export of the parts that were closed since the last one.
+    Following stops when it is stopped by the user or an export of the tool fails. """
+
+    def __init__(self, tool, case, export_function, options, post_processing_widget):
+        super().__init__(parent=PostProcessingScheduler.the())
+        self.tool = tool
+        self.case = case
+        self.export_function = export_function
+        self.options = dict(options, incremental=True, follow=True)
+        self.post_processing_widget = post_processing_widget
+
+        self.watcher = QtCore.QFileSystemWatcher([case.get_out_folder_path()], self)
+        self.change_timer = QtCore.QTimer(self)
+        self.change_timer.setSingleShot(True)
+        self.change_timer.setInterval(POST_PROCESSING_FOLLOW_INTERVAL_MS)
+        # The last part is only exported once it settles, which may happen without further changes on the folder
+        self.poll_timer = QtCore.QTimer(self)
+        self.poll_timer.setInterval(POST_PROCESSING_FOLLOW_INTERVAL_MS * 5)
+
+        self.watcher.directoryChanged.connect(lambda _: self.change_timer.start())
+        self.change_timer.timeout.connect(self.on_export)
+        self.poll_timer.timeout.connect(self.on_export)
+        PostProcessingScheduler.the().task_finished.connect(self.on_task_finished)
+
+        self.poll_timer.start()
+        PostProcessingScheduler.the().add_follower(self)
+        log(__("Following the simulation with {}").format(self.tool))
+
+    def on_export(self) -> None:
+        """ Exports the parts pending to process, unless an export of the tool is still running. """
+        if any(task.tool == self.tool and task.is_active() for task in PostProcessingScheduler.the().get_tasks()):
+            self.change_timer.start()
+            return
+        debug("Follow mode: checking new parts for {}".format(self.tool))
+        self.export_function(self.options, self.case, self.post_processing_widget)
+
+    def on_task_finished(self, task_id: str, _: int) -> None:
+        """ Stops following if an export of the tool failed. """
+        task = PostProcessingScheduler.the().get_task(task_id)
+        if task is not None and task.tool == self.tool and task.state == JobState.FAILED:
+            self.stop()
+
+    def stop(self) -> None:
+        """ Stops following the simulation. """
+        if self not in PostProcessingScheduler.the().followers:
+            return
+        self.change_timer.stop()
+        self.poll_timer.stop()
+        self.watcher.directoryChanged.disconnect()
+        PostProcessingScheduler.the().task_finished.disconnect(self.on_task_finished)
+        PostProcessingScheduler.the().remove_follower(self)
+        log(__("Stopped following the simulation with {}").format(self.tool))
+        self.deleteLater()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3.7
+# -*- coding: utf-8 -*-
+
+""" Incremental post-processing related tools.
+
+Incremental post-processing tools keep a manifest on the out folder of the
+case. It records the hash of the options used and, for each processed part,
+the signature of its Part_XXXX.bi4 file and of the output files produced
+for it. Running the tool again only processes the parts that are new, were
+modified or whose outputs are missing or were modified.
+
+"""
+
+import re
+import csv
+import json
+import time
+import hashlib
+
+from os import path, stat, listdir, replace
+
+from mod.stdout_tools import error
+from mod.staging_tools import get_file_hash
+
+from mod.constants import POST_PROCESSING_MANIFEST_SUFFIX, POST_PROCESSING_FOLLOW_SETTLE_SECONDS
+
+
+def get_manifest_path(out_folder_path: str, tool: str, output_name: str) -> str:
+    """ Returns the path of the manifest for the outputs of a tool with the given name. """
+    return "{}{}_{}{}".format(out_folder_path, tool, output_name, POST_PROCESSING_MANIFEST_SUFFIX)
+
+
+def load_manifest(manifest_path: str) -> dict:
+    """ Loads a post-processing manifest, or an empty one if it doesn't exist. """
+    if not path.isfile(manifest_path):
+        return {"options_hash": None, "parts": dict(), "outputs": dict()}
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except ValueError:
+        error("Post-processing manifest {} is corrupted. All parts will be processed again".format(manifest_path))
+        return {"options_hash": None, "parts": dict(), "outputs": dict()}
+
+
+def save_manifest(manifest_path: str, manifest: dict) -> None:
+    """ Persists a post-processing manifest, replacing the previous one atomically. """
+    with open("{}.tmp".format(manifest_path), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=4)
+    replace("{}.tmp".format(manifest_path), manifest_path)
+
+
+def get_options_hash(parameters: list, input_files: list = None) -> str:
+    """ Returns a hash identifying the parameters a tool runs with and the contents of the extra files it reads. """
+    options = list(parameters)
+    for file_path in input_files or list():
+        options.append(get_file_hash(file_path) if path.isfile(file_path) else "")
+    return get_text_hash(json.dumps(options))
+
+
+def get_text_hash(text: str) -> str:
+    """ Returns the SHA1 hash for the given text. """
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def get_part_path(out_folder_path: str, part: int) -> str:
+    """ Returns the path of the file of a part. """
+    return "{}Part_{:04d}.bi4".format(out_folder_path, part)
+
+
+def get_file_signature(file_path: str) -> list:
+    """ Returns the size and modification time of a file. """
+    file_stat = stat(file_path)
+    return [file_stat.st_size, file_stat.st_mtime_ns]
+
+
+def get_output_signature(file_path: str, previous_signature: list = None) -> list:
+    """ Returns the size, modification time and hash of an output file.
+    The previous hash is reused if the size and modification time did not change. """
+    signature = get_file_signature(file_path)
+    if previous_signature and previous_signature[:2] == signature:
+        return previous_signature
+    return signature + [get_file_hash(file_path)]
+
+
+def is_output_valid(file_path: str, signature: list) -> bool:
+    """ Returns whether an output file still has the contents recorded on its signature. """
+    if not path.isfile(file_path):
+        return False
+    if get_file_signature(file_path) == signature[:2]:
+        return True
+    return get_file_hash(file_path) == signature[2]
+
+
+def get_output_series_files(out_folder_path: str, file_name: str, extension: str) -> dict:
+    """ Returns the output files named <file_name>_<part>.<extension> on the out folder. {part: output file name} """
+    output_regex = re.compile(r"^{}_(\d+)\.{}$".format(re.escape(file_name), re.escape(extension)))
+    return {int(output_match.group(1)): output_match.group(0) for output_match in map(output_regex.match, listdir(out_folder_path)) if output_match}
+
+
+def get_closed_parts(out_folder_path: str, part_numbers: list) -> list:
+    """ Returns the parts DualSPHysics already finished writing. The last part is considered open while it
+    was modified less than POST_PROCESSING_FOLLOW_SETTLE_SECONDS ago. """
+    if part_numbers and time.time() - stat(get_part_path(out_folder_path, part_numbers[-1])).st_mtime < POST_PROCESSING_FOLLOW_SETTLE_SECONDS:
+        return part_numbers[:-1]
+    return part_numbers
+
+
+def get_stale_parts(manifest: dict, out_folder_path: str, part_numbers: list, options_hash: str) -> list:
+    """ Returns the parts that need to be processed: all of them if the options or any of the outputs shared by
+    all the parts changed, or the ones that are new, were modified or whose outputs were modified otherwise. """
+    if manifest["options_hash"] != options_hash:
+        return list(part_numbers)
+    if any(not is_output_valid(out_folder_path + output, signature) for output, signature in manifest["outputs"].items()):
+        return list(part_numbers)
+
+    stale_parts: list = list()
+    for part in part_numbers:
+        entry = manifest["parts"].get(str(part), None)
+        if entry is None or entry["input"] != get_file_signature(get_part_path(out_folder_path, part)):
+            stale_parts.append(part)
+        elif any(not is_output_valid(out_folder_path + output, signature) for output, signature in entry["outputs"].items()):
+            stale_parts.append(part)
+    return stale_parts
+
+
+def update_manifest(manifest: dict, out_folder_path: str, parts: list, options_hash: str, part_outputs: dict = None, outputs: list = None) -> None:
+    """ Records the given parts as processed with the options identified by options_hash.
+    part_outputs are the output files of each part {part: [file name]} and outputs the ones shared by all the parts. """
+    if manifest["options_hash"] != options_hash:
+        manifest["options_hash"] = options_hash
+        manifest["parts"] = dict()
+    for part in parts:
+        previous_outputs = manifest["parts"].get(str(part), dict()).get("outputs", dict())
+        manifest["parts"][str(part)] = {
+            "input": get_file_signature(get_part_path(out_folder_path, part)),
+            "outputs": {output: get_output_signature(out_folder_path + output, previous_outputs.get(output, None))
+                        for output in (part_outputs or dict()).get(part, list())}
+        }
+    if outputs is not None:
+        manifest["outputs"] = {output: get_output_signature(out_folder_path + output, manifest["outputs"].get(output, None)) for output in outputs}
+
+
+def get_contiguous_ranges(part_numbers: list, selected_parts: list) -> list:
+    """ Groups the selected parts in ranges of parts consecutive on part_numbers. Returns a list of (first_part, last_part) tuples. """
+    selected = set(selected_parts)
+    ranges: list = list()
+    range_start = None
+    previous = None
+    for part in part_numbers:
+        if part in selected:
+            if range_start is None:
+                range_start = part
+            previous = part
+        elif range_start is not None:
+            ranges.append((range_start, previous))
+            range_start = None
+    if range_start is not None:
+        ranges.append((range_start, previous))
+    return ranges
+
+
+def merge_part_csv(source_path: str, target_path: str) -> None:
+    """ Merges a DualSPHysics CSV file (semicolon separated) with one row per part into another one.
+    The rows of the source replace the ones of the target for the same part (first column). """
+    def read_rows(file_path):
+        header_rows: list = list()
+        part_rows: dict = dict()
+        with open(file_path, "r", encoding="utf-8", errors="replace", newline="") as f:
+            for row in csv.reader(f, delimiter=";"):
+                try:
+                    part_rows[int(row[0])] = row
+                except (IndexError, ValueError):
+                    if not part_rows:
+                        header_rows.append(row)
+        return header_rows, part_rows
+
+    source_header, source_rows = read_rows(source_path)
+    target_header, target_rows = read_rows(target_path) if path.isfile(target_path) else (source_header, dict())
+    target_rows.update(source_rows)
+
+    with open("{}.tmp".format(target_path), "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f, delimiter=";", lineterminator="\n")
+        writer.writerows(target_header)
+        writer.writerows(target_rows[part] for part in sorted(target_rows))
+    replace("{}.tmp".format(target_path), target_path)
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3.7
+# -*- coding: utf-8 -*-
+""" DesignSPHysics post-processing task scheduler. """
+
+import os
+import time
+import threading
+
+from os import path, environ
+from sys import platform
+
+from PySide import QtCore
+
+from mod.translation_tools import __
+from mod.stdout_tools import log, debug, error
+from mod.executable_tools import ensure_process_is_executable_or_fail
+from mod.freecad_tools import get_fc_main_window
+
+from mod.enums import JobState
+
+from mod.dataobjects.application_settings import ApplicationSettings
+from mod.dataobjects.post_processing_task import PostProcessingTask
+
+
+class PostProcessingScheduler(QtCore.QObject):
+    """ Runs the post-processing tasks as a dependency graph: each task starts once the tasks it depends on
+    finished, running independent tasks at the same time up to the configured number of processes. """
+    __instance: "PostProcessingScheduler" = None
+
+    task_changed = QtCore.Signal(str)
+    task_finished = QtCore.Signal(str, int)
+    function_finished = QtCore.Signal(str, int)
+
+    def __init__(self):
+        """ Virtually private constructor. """
+        if PostProcessingScheduler.__instance is not None:
+            raise Exception("PostProcessingScheduler class is a singleton and should not be initialized twice")
+        super().__init__(parent=get_fc_main_window())
+        PostProcessingScheduler.__instance = self
+        self.tasks: dict = dict()  # {task_id: PostProcessingTask}
+        self.processes: dict = dict()  # {task_id: QtCore.QProcess}
+        self.threads: dict = dict()  # {task_id: threading.Thread} Tasks running a function instead of a process
+        self.followers: list = list()  # [PostProcessingFollower]
+        self.function_finished.connect(self.on_process_finished)
+
+    @staticmethod
+    def the() -> "PostProcessingScheduler":
+        """ Static access method. """
+        if PostProcessingScheduler.__instance is None:
+            PostProcessingScheduler()
+        return PostProcessingScheduler.__instance
+
+    def get_tasks(self) -> list:
+        """ Returns all the tasks, ordered by creation time. """
+        return sorted(self.tasks.values(), key=lambda task: task.created)
+
+    def get_task(self, task_id: str) -> PostProcessingTask:
+        """ Returns the task with the given id, or None if it does not exist. """
+        return self.tasks.get(task_id, None)
+
+    def get_max_processes(self) -> int:
+        """ Returns the number of tool processes allowed to run at once. """
+        return ApplicationSettings.the().post_processing_max_processes or os.cpu_count()
+
+    def is_busy(self) -> bool:
+        """ Returns whether there are tasks pending to finish. """
+        return any(task.is_active() for task in self.tasks.values())
+
+    def set_state(self, task: PostProcessingTask, state: str) -> None:
+        """ Changes the state of a task, notifying the change. """
+        task.state = state
+        self.task_changed.emit(task.id)
+
+    def submit(self, task: PostProcessingTask) -> str:
+        """ Adds a task to the graph and starts it if its dependencies are met. Returns the id of the task. """
+        self.tasks[task.id] = task
+        debug("Post-processing task {} ({}) queued. Depends on: {}. Waits for: {}".format(task.id, task.tool, task.dependencies, task.waits_for))
+        self.set_state(task, JobState.QUEUED)
+        self.schedule()
+        return task.id
+
+    def is_ready(self, task: PostProcessingTask) -> bool:
+        """ Returns whether all the tasks the task depends on finished successfully and the ones it waits for finished. """
+        if any(self.tasks[waited].is_active() for waited in task.waits_for if waited in self.tasks):
+            return False
+        return all(self.tasks[dependency].state == JobState.FINISHED for dependency in task.dependencies)
+
+    def schedule(self) -> None:
+        """ Starts the queued tasks whose dependencies are met while there are processes available for them.
+        Tasks depending on a task that did not finish successfully are cancelled. """
+        for task in self.get_tasks():
+            if task.state != JobState.QUEUED:
+                continue
+            if any(self.tasks[dependency].state in (JobState.FAILED, JobState.CANCELLED) for dependency in task.dependencies):
+                self.finish_task(task, JobState.CANCELLED, -1)
+                continue
+            if not self.is_ready(task):
+                continue
+            if task.detached:
+                self.launch_detached(task)
+                continue
+            if len(self.processes) + len(self.threads) >= self.get_max_processes():
+                continue
+            if task.function:
+                self.start_function(task)
+                continue
+            self.start_task(task)
+
+    def launch_detached(self, task: PostProcessingTask) -> None:
+        """ Launches a task that is not waited for, like opening the results on an external viewer. """
+        task.started = time.time()
+        started = QtCore.QProcess.startDetached(task.executable, task.parameters)
+        self.finish_task(task, JobState.FINISHED if started else JobState.FAILED, 0 if started else -1)
+
+    def start_task(self, task: PostProcessingTask) -> None:
+        """ Launches the tool process for a task. """
+        process = QtCore.QProcess(get_fc_main_window())
+        process.finished.connect(lambda exit_code, _=None, task_id=task.id: self.on_process_finished(task_id, exit_code))
+        process.readyReadStandardOutput.connect(lambda task_id=task.id: self.on_stdout_ready(task_id))
+
+        ensure_process_is_executable_or_fail(task.executable)
+        if platform in ("linux", "linux2"):
+            environ["LD_LIBRARY_PATH"] = path.dirname(task.executable)
+
+        self.processes[task.id] = process
+        task.started = time.time()
+        self.set_state(task, JobState.RUNNING)
+        if task.on_started:
+            task.on_started(task)
+        process.start(task.executable, task.parameters)
+
+        if not process.waitForStarted():
+            error("Error starting post-processing task {}: {}".format(task.id, task.get_cmd_string()))
+            self.processes.pop(task.id, None)
+            self.finish_task(task, JobState.FAILED, -1)
+
+    def start_function(self, task: PostProcessingTask) -> None:
+        """ Runs the function of a task on a background thread. Its end is notified on the main thread with function_finished. """
+        def run():
+            """ Runs the function, keeping any error on the output of the task. """
+            try:
+                exit_code = task.function(task)
+            except Exception as ex:  # pylint: disable=broad-except
+                task.output += "{}: {}\n".format(type(ex).__name__, ex)
+                exit_code = 1
+            self.function_finished.emit(task.id, exit_code)
+
+        self.threads[task.id] = threading.Thread(target=run, daemon=True)
+        task.started = time.time()
+        self.set_state(task, JobState.RUNNING)
+        if task.on_started:
+            task.on_started(task)
+        self.threads[task.id].start()
+
+    def on_stdout_ready(self, task_id: str) -> None:
+        """ Stores the output of a running task and updates the part it is processing. """
+        task = self.tasks[task_id]
+        current_output = str(self.processes[task_id].readAllStandardOutput().data(), encoding="utf-8", errors="replace")
+        task.output += current_output
+        current_part = task.get_current_part(current_output) if task.get_current_part else None
+        if current_part is not None:
+            task.current_part = current_part
+            self.task_changed.emit(task_id)
+
+    def on_process_finished(self, task_id: str, exit_code: int) -> None:
+        """ Updates the task whose process finished and starts the next ones. """
+        process = self.processes.pop(task_id, None)
+        if process is not None:
+            process.deleteLater()
+        self.threads.pop(task_id, None)
+        task = self.tasks.get(task_id, None)
+        if task is None:
+            return
+        if task.state == JobState.CANCELLED:
+            self.finish_task(task, JobState.CANCELLED, exit_code)
+        else:
+            self.finish_task(task, JobState.FINISHED if exit_code == 0 else JobState.FAILED, exit_code)
+
+    def finish_task(self, task: PostProcessingTask, state: str, exit_code: int) -> None:
+        """ Marks a task as finished with the given state, notifies it and starts the tasks waiting for it. """
+        task.finished = time.time()
+        task.exit_code = exit_code
+        self.set_state(task, state)
+        log(__("Post-processing task {} ({}) {}").format(task.id, task.tool, state))
+        if task.on_finished and state != JobState.CANCELLED:
+            task.on_finished(task)
+        self.task_finished.emit(task.id, exit_code)
+        self.schedule()
+
+    def cancel(self, task_id: str) -> None:
+        """ Cancels a task, killing its process if it is running. The tasks depending on it are cancelled too.
+        Functions running on a background thread can not be stopped: their task is marked as cancelled and its result ignored. """
+        task = self.tasks[task_id]
+        if not task.is_active():
+            return
+        if task_id in self.threads:
+            self.set_state(task, JobState.CANCELLED)
+        elif task_id in self.processes:
+            self.set_state(task, JobState.CANCELLED)
+            self.processes[task_id].kill()
+        else:
+            self.finish_task(task, JobState.CANCELLED, -1)
+
+    def cancel_all(self) -> None:
+        """ Cancels all the active tasks. """
+        for task in self.get_tasks():
+            self.cancel(task.id)
+
+    def add_follower(self, follower) -> None:
+        """ Registers a follower exporting the new parts of a running simulation. """
+        self.followers.append(follower)
+        self.task_changed.emit("")
+
+    def remove_follower(self, follower) -> None:
+        """ Unregisters a follower once it stopped. """
+        self.followers.remove(follower)
+        self.task_changed.emit("")
+
+    def stop_followers(self) -> None:
+        """ Stops all the followers. """
+        for follower in list(self.followers):
+            follower.stop()
+
+    def clear(self) -> None:
+        """ Removes the tasks that are not active, unless an active task depends on them. """
+        needed = {dependency for task in self.tasks.values() if task.is_active() for dependency in task.dependencies + task.waits_for}
+        for task in self.get_tasks():
+            if not task.is_active() and task.id not in needed:
+                self.tasks.pop(task.id)
+                self.task_changed.emit(task.id)
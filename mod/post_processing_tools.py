@@ -2,150 +2,320 @@
 # -*- coding: utf-8 -*-
 """DesignSPHysics Post-Processing tools utilities. """
 
-import subprocess
+import re
 
-from PySide import QtCore
+from os import listdir, remove
+from copy import deepcopy
 
 from mod.translation_tools import __
 from mod.dialog_tools import error_dialog, info_dialog
-from mod.freecad_tools import get_fc_main_window
-from mod.file_tools import get_total_exported_parts_from_disk, save_measuretool_info
+from mod.file_tools import get_measuretool_info, save_measuretool_info, create_flowtool_boxes
 from mod.executable_tools import ensure_process_is_executable_or_fail
+from mod.post_processing_scheduler import PostProcessingScheduler
+from mod.results_catalog_tools import get_results_catalog
+from mod.bi4_tools import Bi4Error
+from mod.vtk_tools import write_series_manifest, get_series_manifest_path, export_vtu_series
+from mod.post_processing_manifest_tools import get_manifest_path, load_manifest, save_manifest, get_options_hash, get_output_series_files
+from mod.post_processing_manifest_tools import get_closed_parts, get_stale_parts, update_manifest, get_contiguous_ranges, merge_part_csv
+
+from mod.constants import POST_PROCESSING_MIN_PARTS_PER_SHARD, MEASURETOOL_INCREMENT_SUFFIX
+from mod.constants import PREVIEW_FILE_SUFFIX, PREVIEW_DEFAULT_ARRAYS
+
+from mod.dataobjects.post_processing_task import PostProcessingTask
+
+# Particle types selected by each value of the PartVTK -onlytype option
+ONLYTYPE_TYPES = {
+    "all": ("fixed", "moving", "floating", "fluid"),
+    "bound": ("fixed", "moving", "floating"),
+    "fixed": ("fixed",),
+    "moving": ("moving",),
+    "floating": ("floating",),
+    "fluid": ("fluid",)
+}
+ONLYMK_REGEX = re.compile(r"-onlymk:([\d,\-]+)")
+
+
+def get_part_shards(part_numbers: list, max_shards: int) -> list:
+    """ Splits a list of parts in up to max_shards lists of consecutive parts of similar size, with at least
+    POST_PROCESSING_MIN_PARTS_PER_SHARD parts each. """
+    shards = max(1, min(max_shards, len(part_numbers) // POST_PROCESSING_MIN_PARTS_PER_SHARD))
+    bounds = [len(part_numbers) * shard // shards for shard in range(shards + 1)]
+    return [part_numbers[bounds[shard]:bounds[shard + 1]] for shard in range(shards)]
+
+
+def get_part_selection_parameters(all_parts: list, selected_parts: list) -> list:
+    """ Returns the tool parameters processing only the selected parts: -first/-last for a contiguous range
+    of the parts on the out folder, or a -files list of parts and ranges of parts otherwise. """
+    ranges = get_contiguous_ranges(all_parts, selected_parts)
+    if len(ranges) == 1:
+        return ["-first:{}".format(ranges[0][0]), "-last:{}".format(ranges[0][1])]
+    return ["-files:{}".format(",".join(str(first) if first == last else "{}-{}".format(first, last) for first, last in ranges))]
+
+
+def get_window_parts(out_folder_path, part_window) -> list:
+    """ Returns the parts on the out folder inside a part window selected with PartSelectionWidget, or None to process all of them.
+    The window is resolved on each export, so follow mode exports include the parts written after it was selected. """
+    if part_window is None:
+        return None
+    return get_results_catalog(out_folder_path).get_parts_in_window(part_window["start_time"], part_window["end_time"], part_window["stride"])
+
+
+def get_missing_output_parts(out_folder_path, file_name, extension, part_numbers) -> list:
+    """ Returns the parts of the given ones without an output file named <file_name>_<part>.<extension> on the out folder. """
+    exported_parts = get_output_series_files(out_folder_path, file_name, extension)
+    return [part for part in part_numbers if part not in exported_parts]
+
+
+def submit_export(tool, executable, executable_parameters, case, post_processing_widget, get_current_part, on_finished,
+                  output_series=None, parts=None, quiet=False, on_started=None) -> list:
+    """ Queues a post-processing tool execution on the post-processing task graph and shows the post-processing queue,
+    unless quiet is set. Executions of the same tool run one after another, as they share their input files.
+
+    By default all the parts on the out folder are processed. parts limits the execution to the given part numbers.
+    Tools writing one file per part can pass output_series as (file_name, extension). Their execution is then split in
+    shards processing consecutive parts that run in parallel, and the output series is checked for completeness once
+    all of them finish.
+    on_finished is called with the exit code and the details of the execution. on_started, if given, is called with each task
+    right before it starts, so the input files shared by the executions of the tool are written when they are going to be read.
+    Returns the ids of the tasks. """
+    ensure_process_is_executable_or_fail(executable)
+    previous_tasks = [task.id for task in PostProcessingScheduler.the().get_tasks() if task.tool == tool and task.is_active()]
+    all_parts = get_results_catalog(case.get_out_folder_path()).get_parts()
+    if parts is None:
+        part_numbers = all_parts
+    else:
+        selected_parts = set(parts)
+        part_numbers = [part for part in all_parts if part in selected_parts]
+    if parts is not None and not part_numbers:
+        error_dialog(__("There are no parts to process on the selected time window."))
+        return list()
+
+    if output_series and part_numbers:
+        shards = get_part_shards(part_numbers, PostProcessingScheduler.the().get_max_processes())
+    else:
+        shards = [part_numbers]
+
+    tasks: list = list()
+    for shard in shards:
+        parameters = list(executable_parameters)
+        if shard and shard != all_parts:
+            parameters += get_part_selection_parameters(all_parts, shard)
+        task = PostProcessingTask(tool=tool, executable=executable, parameters=parameters, waits_for=previous_tasks, parts=shard)
+        task.get_current_part = get_current_part
+        task.on_started = on_started
+        tasks.append(task)
+
+    def on_task_finished(_):
+        """ Reports the execution once all its tasks finished. """
+        if any(task.is_active() for task in tasks):
+            return
+        exit_code = next((task.exit_code for task in tasks if task.exit_code), 0)
+        detailed_text = "\n\n".join("The executed command line was: {}\n\n{}".format(task.get_cmd_string(), task.output) for task in tasks)
+        if output_series and not exit_code:
+            missing_parts = get_missing_output_parts(case.get_out_folder_path(), output_series[0], output_series[1], part_numbers)
+            if missing_parts:
+                exit_code = 1
+                detailed_text += "\n\nMissing output files for parts: {}".format(", ".join(map(str, missing_parts)))
+        on_finished(exit_code, detailed_text)
+
+    if not quiet:
+        post_processing_widget.show_post_processing_queue()
+    for task in tasks:
+        task.on_finished = on_task_finished
+        PostProcessingScheduler.the().submit(task)
+    return [task.id for task in tasks]
+
+
+def get_onlytype_types(onlytype: str) -> list:
+    """ Returns the particle types selected by a PartVTK -onlytype value (i.e. -all,+fluid), applying its values in order over all the types. """
+    types: set = set(ONLYTYPE_TYPES["all"])
+    for value in onlytype.split(","):
+        selected = set(ONLYTYPE_TYPES.get(value.strip().lstrip("+-").lower(), ()))
+        types = types - selected if value.strip().startswith("-") else types | selected
+    return sorted(types)
+
+
+def get_onlymk_values(additional_parameters: str) -> list:
+    """ Returns the mk selected with a -onlymk option (i.e. -onlymk:11,13-15) on the additional parameters of a tool, or None if there is none. """
+    onlymk_match = ONLYMK_REGEX.search(additional_parameters)
+    if not onlymk_match:
+        return None
+    mk: list = list()
+    for value in onlymk_match.group(1).split(","):
+        first, _, last = value.partition("-")
+        if first.isdigit() and (last.isdigit() or not last):
+            mk += list(range(int(first), int(last or first) + 1))
+    return mk
+
+
+def submit_preview(case, file_name, parts, types, mk, preview_particles, dependencies, on_finished) -> str:
+    """ Queues writing the decimated <file_name>Preview frames of the given parts (or all of them if None) of a series exported by PartVTK,
+    with up to preview_particles of the given types and mk each. They are written on a background thread, reading the part files directly,
+    once the tasks it depends on finish successfully. on_finished is called with the exit code and the details of the execution. """
+    out_folder_path = case.get_out_folder_path()
+    previous_tasks = [task.id for task in PostProcessingScheduler.the().get_tasks() if task.tool == "Preview" and task.is_active()]
+    task = PostProcessingTask(tool="Preview", dependencies=dependencies, waits_for=previous_tasks,
+                              parts=get_results_catalog(out_folder_path).get_parts() if parts is None else sorted(parts))
+
+    def write_previews(task):
+        """ Writes the preview frames and the collection listing all the ones on the out folder. """
+        def on_part(part, _):
+            task.current_part = part
+            PostProcessingScheduler.the().task_changed.emit(task.id)
 
-from mod.widgets.postprocessing.export_progress_dialog import ExportProgressDialog
+        try:
+            export_vtu_series(out_folder_path, out_folder_path, file_name, PREVIEW_DEFAULT_ARRAYS, mk=mk, on_part=on_part,
+                              preview_particles=preview_particles, full=False, types=types, parts=task.parts)
+        except (Bi4Error, KeyError, OSError, ValueError) as ex:
+            task.output += "Error writing the previews: {}\n".format(ex)
+            return 1
+        write_series_manifest(out_folder_path, file_name + PREVIEW_FILE_SUFFIX, "vtu")
+        task.output += "Preview frames with up to {} particles written for {} parts\n".format(preview_particles, len(task.parts))
+        return 0
 
+    task.function = write_previews
+    task.on_finished = lambda task: on_finished(task.exit_code, task.output)
+    return PostProcessingScheduler.the().submit(task)
 
-def partvtk_export(options, case, post_processing_widget) -> None:
-    """ Export VTK button behaviour. Launches a process while disabling the button. """
-    post_processing_widget.adapt_to_export_start()
 
-    save_extension: str = {0: "vtk", 1: "csv", 2: "asc"}[options["save_mode"]]
-    save_flag: str = {0: "-savevtk", 1: "-savecsv", 2: "-saveascii"}[options["save_mode"]]
+def submit_paraview_launch(case, data_path, dependencies) -> str:
+    """ Queues opening ParaView with the given data file once the tasks it depends on finish successfully. """
+    task = PostProcessingTask(tool="ParaView", executable=case.executable_paths.paraview, parameters=["--data={}".format(data_path)], dependencies=dependencies, detached=True)
+    return PostProcessingScheduler.the().submit(task)
 
-    exported_parts: int = get_total_exported_parts_from_disk(case.get_out_folder_path())
 
-    export_dialog = ExportProgressDialog(0, exported_parts, parent=get_fc_main_window())
-    export_dialog.show()
+def get_partvtk_parameters(options, case) -> list:
+    """ Returns the parameters to run PartVTK with the given export options. """
+    save_flag: str = {0: "-savevtk", 1: "-savecsv", 2: "-saveascii"}[options["save_mode"]]
+    return ["-dirin {}".format(case.get_out_folder_path()),
+            "{save_flag} {out_path}{file_name}".format(save_flag=save_flag, out_path=case.get_out_folder_path(), file_name=options["file_name"]),
+            "-onlytype:{save_types} {additional}".format(save_types=options["save_types"], additional=options["additional_parameters"])]
 
-    case.info.current_output = ""
 
-    # Build parameters
-    executable_parameters = ["-dirin {}".format(case.get_out_folder_path()),
-                             "{save_flag} {out_path}{file_name}".format(save_flag=save_flag, out_path=case.get_out_folder_path(), file_name=options["file_name"]),
-                             "-onlytype:{save_types} {additional}".format(save_types=options["save_types"], additional=options["additional_parameters"])]
-
-    # Information ready handler.
-    def on_stdout_ready():
-        """ Updates the export dialog on every stdout available from the process. """
-        current_output = str(export_process.readAllStandardOutput().data(), encoding='utf-8')
-        case.info.current_output += current_output
+def partvtk_export(options, case, post_processing_widget) -> None:
+    """ Export VTK button behaviour. Queues a PartVTK execution, followed by a ParaView launch if requested.
+    Incremental exports only process the parts whose outputs are not up to date on the PartVTK manifest.
+    Follow mode exports are incremental, skip the part still being written and only report errors.
+    VTK exports with preview_particles set are followed by the preview frames of the exported parts, with the same particle types and mk. """
+    save_extension: str = {0: "vtk", 1: "csv", 2: "asc"}[options["save_mode"]]
+    executable_parameters = get_partvtk_parameters(options, case)
+    out_folder_path = case.get_out_folder_path()
+    follow = options.get("follow", False)
+    incremental = follow or options.get("incremental", False)
+    series_manifest_path = get_series_manifest_path(out_folder_path, options["file_name"], save_extension)
+    preview_particles = options.get("preview_particles", 0) if save_extension == "vtk" else 0
+    input_text = case.path + "!!" + case.name + "!!" + options["file_name"] if save_extension == "vtk" else None
+    results: dict = {"exit_code": 0, "detailed_text": ""}  # Result of the PartVTK execution, shown once its previews are written
+
+    def on_preview_finished(exit_code, detailed_text):
+        """ Displays info/error about the whole export once the previews are written. """
+        if exit_code:
+            error_dialog(__("There was an error writing the previews. Show details to view the errors."), detailed_text=detailed_text)
+        elif not follow and not results["exit_code"]:
+            info_dialog(info_text=__("PartVTK finished successfully"), detailed_text="{}\n\n{}".format(results["detailed_text"], detailed_text).strip(),
+                        input_text=input_text)
+
+    def submit_export_preview(preview_parts, dependencies):
+        """ Queues the preview frames of the given parts, or of all of them if None. """
+        submit_preview(case, options["file_name"], preview_parts, get_onlytype_types(options["save_types"]), get_onlymk_values(options["additional_parameters"]),
+                       preview_particles, dependencies, on_preview_finished)
+
+    parts = get_window_parts(out_folder_path, options.get("part_window", None))
+    if incremental:
+        manifest_path = get_manifest_path(out_folder_path, "PartVTK", options["file_name"])
+        options_hash = get_options_hash(executable_parameters)
+        part_numbers = get_results_catalog(out_folder_path).get_parts()
+        if parts is not None:
+            selected_parts = set(parts)
+            part_numbers = [part for part in part_numbers if part in selected_parts]
+        if follow:
+            part_numbers = get_closed_parts(out_folder_path, part_numbers)
+        stale_parts = get_stale_parts(load_manifest(manifest_path), out_folder_path, part_numbers, options_hash)
+        if not stale_parts:
+            missing_previews = get_missing_output_parts(out_folder_path, options["file_name"] + PREVIEW_FILE_SUFFIX, "vtu", part_numbers) if preview_particles else []
+            if missing_previews:
+                submit_export_preview(missing_previews, list())
+            elif not follow:
+                info_dialog(info_text=__("PartVTK outputs are already up to date"), input_text=input_text if part_numbers else None)
+            if not follow and options["open_paraview"] and write_series_manifest(out_folder_path, options["file_name"], save_extension):
+                submit_paraview_launch(case, series_manifest_path, list())
+            return
+        parts = stale_parts
+
+    def get_current_part(current_output):
+        """ Returns the part being exported from the output of the process. """
         try:
             current_part = current_output.split("{}_".format(options["file_name"]))[1]
-            current_part = int(current_part.split(".{}".format(save_extension))[0])
-        except IndexError:
-            current_part = export_dialog.get_value()
-        export_dialog.update_data(current_part)
-
-    # Cancel button handler
-    def on_cancel():
-        """ Kills the process and cancels the export dialog. """
-        export_process.kill()
-        post_processing_widget.adapt_to_export_finished()
-        export_dialog.reject()
-
-    # PartVTK export finish handler
-    def on_export_finished(exit_code):
-        """ Closes and displays info/error about the process. """
-        post_processing_widget.adapt_to_export_finished()
-        export_dialog.accept()
-        detailed_text = "The executed command line was: {} {}\n\n{}".format(case.executable_paths.partvtk, " ".join(executable_parameters), case.info.current_output)
-
+            return int(current_part.split(".{}".format(save_extension))[0])
+        except (IndexError, ValueError):
+            return None
+
+    def on_export_finished(exit_code, detailed_text):
+        """ Writes the series manifest, records the exported parts on the incremental manifest and displays info/error about the process. """
+        if save_extension == "vtk":
+            write_series_manifest(out_folder_path, options["file_name"], save_extension)
+        if incremental:
+            part_outputs = {part: [output] for part, output in get_output_series_files(out_folder_path, options["file_name"], save_extension).items()
+                            if part in stale_parts}
+            manifest = load_manifest(manifest_path)
+            update_manifest(manifest, out_folder_path, list(part_outputs.keys()), options_hash, part_outputs=part_outputs)
+            save_manifest(manifest_path, manifest)
+
+        results["exit_code"], results["detailed_text"] = exit_code, detailed_text
         if not exit_code:
-            info_dialog(info_text=__("PartVTK finished successfully"), detailed_text=detailed_text)
+            if not follow and not preview_particles:
+                info_dialog(info_text=__("PartVTK finished successfully"), detailed_text=detailed_text, input_text=input_text)
         else:
             error_dialog(__("There was an error on the post-processing. Show details to view the errors."), detailed_text=detailed_text)
 
-        if options["open_paraview"]:
-            subprocess.Popen([case.executable_paths.paraview, "--data={}\\{}_..{}".format(case.get_out_folder_path(), options["file_name"], save_extension)], stdout=subprocess.PIPE)
-
-    export_dialog.on_cancel.connect(on_cancel)
-    export_process = QtCore.QProcess(get_fc_main_window())
-    export_process.finished.connect(on_export_finished)
-    export_process.readyReadStandardOutput.connect(on_stdout_ready)
-    ensure_process_is_executable_or_fail(case.executable_paths.partvtk)
-    export_process.start(case.executable_paths.partvtk, executable_parameters)
-
-
-def floatinginfo_export(options, case, post_processing_widget) -> None:
-    """ FloatingInfo tool export. """
-    post_processing_widget.adapt_to_export_start()
+    task_ids = submit_export("PartVTK", case.executable_paths.partvtk, executable_parameters, case, post_processing_widget, get_current_part, on_export_finished,
+                             output_series=(options["file_name"], save_extension), parts=parts, quiet=follow)
+    if preview_particles and task_ids:
+        submit_export_preview(parts, task_ids)
 
-    exported_parts: int = get_total_exported_parts_from_disk(case.get_out_folder_path())
+    if options["open_paraview"] and not follow:
+        submit_paraview_launch(case, series_manifest_path, task_ids)
 
-    export_dialog = ExportProgressDialog(0, exported_parts, parent=get_fc_main_window())
-    export_dialog.show()
 
-    case.info.current_output = ""
-
-    # Build parameters
+def get_floatinginfo_parameters(options, case) -> list:
+    """ Returns the parameters to run FloatingInfo with the given export options. """
     executable_parameters = ["-dirin {}".format(case.get_out_folder_path()),
                              "-savedata {out_path}{file_name}".format(out_path=case.get_out_folder_path(), file_name=options["filename"])]
 
-
     if options["onlyprocess"]:
         executable_parameters.append("-onlymk:" + options["onlyprocess"])
 
     if options["additional_parameters"]:
         executable_parameters.append(options["additional_parameters"])
 
-    def on_stdout_ready():
-        """ Updates the export dialog on every stdout avasilable from the process. """
-        current_output = str(export_process.readAllStandardOutput().data(), encoding='utf-8')
-        case.info.current_output += current_output
-        try:
-            current_part = int(current_output.split("Part_")[-1].split(".bi4")[0])
-        except (IndexError, ValueError):
-            current_part = export_dialog.get_value()
-        export_dialog.update_data(current_part)
+    return executable_parameters
 
-    def on_cancel():
-        """ Kills the process and cancels the export dialog. """
-        export_process.kill()
-        post_processing_widget.adapt_to_export_finished()
-        export_dialog.reject()
 
-    def on_export_finished(exit_code):
-        """ Closes and displays info/error about the process. """
-        post_processing_widget.adapt_to_export_finished()
-        export_dialog.accept()
-        detailed_text = "The executed command line was: {} {}\n\n{}".format(case.executable_paths.floatinginfo, " ".join(executable_parameters), case.info.current_output)
+def floatinginfo_export(options, case, post_processing_widget) -> None:
+    """ FloatingInfo tool export. """
+    executable_parameters = get_floatinginfo_parameters(options, case)
 
+    def get_current_part(current_output):
+        """ Returns the part being processed from the output of the process. """
+        try:
+            return int(current_output.split("Part_")[-1].split(".bi4")[0])
+        except (IndexError, ValueError):
+            return None
+
+    def on_export_finished(exit_code, detailed_text):
+        """ Displays info/error about the process. """
         if not exit_code:
             info_dialog(info_text=__("FloatingInfo finished successfully"), detailed_text=detailed_text)
         else:
             error_dialog(__("There was an error on the post-processing. Show details to view the errors."), detailed_text=detailed_text)
 
-    export_dialog.on_cancel.connect(on_cancel)
-    export_process = QtCore.QProcess(get_fc_main_window())
-    export_process.finished.connect(on_export_finished)
-    export_process.readyReadStandardOutput.connect(on_stdout_ready)
-    ensure_process_is_executable_or_fail(case.executable_paths.floatinginfo)
-    export_process.start(case.executable_paths.floatinginfo, executable_parameters)
+    submit_export("FloatingInfo", case.executable_paths.floatinginfo, executable_parameters, case, post_processing_widget, get_current_part, on_export_finished,
+                  parts=get_window_parts(case.get_out_folder_path(), options.get("part_window", None)))
 
 
-def computeforces_export(options, case, post_processing_widget) -> None:
-    """ ComputeForces tool export. """
-    post_processing_widget.adapt_to_export_start()
-
+def get_computeforces_parameters(options, case) -> list:
+    """ Returns the parameters to run ComputeForces with the given export options. """
     save_flag: str = {0: "-savevtk", 1: "-savecsv", 2: "-saveascii"}[options["save_mode"]]
-
-    exported_parts: int = get_total_exported_parts_from_disk(case.get_out_folder_path())
-
-    export_dialog = ExportProgressDialog(0, exported_parts, parent=get_fc_main_window())
-    export_dialog.show()
-
-    case.info.current_output = ""
-
     executable_parameters = ["-dirin {}".format(case.get_out_folder_path()),
                              "-filexml {out_path}{case_name}.xml".format(out_path=case.get_out_folder_path(), case_name=case.name),
                              "{save_flag} {out_path}{file_name}".format(save_flag=save_flag, out_path=case.get_out_folder_path(), file_name=options["filename"])]
@@ -156,55 +326,35 @@ def computeforces_export(options, case, post_processing_widget) -> None:
     if options["additional_parameters"]:
         executable_parameters.append(options["additional_parameters"])
 
-    def on_stdout_ready():
-        """ Updates the export dialog on every stdout available from the process. """
-        current_output = str(export_process.readAllStandardOutput().data(), encoding='utf-8')
-        case.info.current_output += current_output
+    return executable_parameters
+
+
+def computeforces_export(options, case, post_processing_widget) -> None:
+    """ ComputeForces tool export. """
+    executable_parameters = get_computeforces_parameters(options, case)
+
+    def get_current_part(current_output):
+        """ Returns the part being processed from the output of the process. """
         try:
-            current_part = int(current_output.split("Part_")[1].split(".bi4")[0])
-        except IndexError:
-            current_part = export_dialog.get_value()
-        export_dialog.update_data(current_part)
-
-    def on_cancel():
-        """ Kills the process and cancels the export dialog. """
-        export_process.kill()
-        post_processing_widget.adapt_to_export_finished()
-        export_dialog.reject()
-
-    def on_export_finished(exit_code):
-        """ Closes and displays info/error about the process. """
-        post_processing_widget.adapt_to_export_finished()
-        export_dialog.accept()
-        detailed_text = "The executed command line was: {} {}\n\n{}".format(case.executable_paths.computeforces, " ".join(executable_parameters), case.info.current_output)
+            return int(current_output.split("Part_")[1].split(".bi4")[0])
+        except (IndexError, ValueError):
+            return None
 
+    def on_export_finished(exit_code, detailed_text):
+        """ Displays info/error about the process. """
         if not exit_code:
             info_dialog(info_text=__("ComputeForces finished successfully"), detailed_text=detailed_text)
         else:
             error_dialog(__("There was an error on the post-processing. Show details to view the errors."), detailed_text=detailed_text)
 
-    export_dialog.on_cancel.connect(on_cancel)
-    export_process = QtCore.QProcess(get_fc_main_window())
-    export_process.finished.connect(on_export_finished)
-    export_process.readyReadStandardOutput.connect(on_stdout_ready)
-    ensure_process_is_executable_or_fail(case.executable_paths.computeforces)
-    export_process.start(case.executable_paths.computeforces, executable_parameters)
+    submit_export("ComputeForces", case.executable_paths.computeforces, executable_parameters, case, post_processing_widget, get_current_part, on_export_finished,
+                  parts=get_window_parts(case.get_out_folder_path(), options.get("part_window", None)))
 
 
-def measuretool_export(options, case, post_processing_widget) -> None:
-    """ MeasureTool tool export. """
-    post_processing_widget.adapt_to_export_start()
-
+def get_measuretool_parameters(options, case) -> list:
+    """ Returns the parameters to run MeasureTool with the given export options.
+    The points to measure are read from the points.txt file written with save_measuretool_info when the execution starts. """
     save_flag: str = {0: "-savevtk", 1: "-savecsv", 2: "-saveascii"}[options["save_mode"]]
-    exported_parts: int = get_total_exported_parts_from_disk(case.get_out_folder_path())
-
-    export_dialog = ExportProgressDialog(0, exported_parts, parent=get_fc_main_window())
-    export_dialog.show()
-
-    case.info.current_output = ""
-
-    save_measuretool_info(case.path, case.info.measuretool_points, case.info.measuretool_grid)
-
     executable_parameters = ["-dirin {out_path}".format(out_path=case.get_out_folder_path()),
                              "-filexml {out_path}{case_name}.xml".format(out_path=case.get_out_folder_path(), case_name=case.name),
                              "{save_flag} {out_path}{file_name}".format(save_flag=save_flag, out_path=case.get_out_folder_path(), file_name=options["filename"]),
@@ -215,80 +365,103 @@ def measuretool_export(options, case, post_processing_widget) -> None:
     if options["additional_parameters"]:
         executable_parameters.append(options["additional_parameters"])
 
-    def on_stdout_ready():
-        """ Updates the export dialog on every stdout available from the process. """
-        current_output = str(export_process.readAllStandardOutput().data(), encoding='utf-8')
-        case.info.current_output += current_output
+    return executable_parameters
+
+
+def get_measuretool_outputs(out_folder_path, file_name) -> list:
+    """ Returns the CSV files written by MeasureTool with the given file name on the out folder. """
+    output_regex = re.compile(r"^{}_[^.]+\.csv$".format(re.escape(file_name)))
+    return sorted(output for output in listdir(out_folder_path) if output_regex.match(output))
+
+
+def measuretool_export(options, case, post_processing_widget) -> None:
+    """ MeasureTool tool export.
+    Incremental exports on CSV format only measure the parts from the first one that is not up to date on the
+    MeasureTool manifest, on separate files that are merged afterwards with the previous results.
+    Follow mode exports are incremental, skip the part still being written and only report errors.
+    The points are written to points.txt when the execution starts, as previous executions may still be reading it. """
+    points, grid = deepcopy(case.info.measuretool_points), deepcopy(case.info.measuretool_grid)
+    executable_parameters = get_measuretool_parameters(options, case)
+    out_folder_path = case.get_out_folder_path()
+    follow = options.get("follow", False)
+    incremental = (follow or options.get("incremental", False)) and options["save_mode"] == 1
+    run_file_name = options["filename"]
+
+    parts = get_window_parts(out_folder_path, options.get("part_window", None))
+    if incremental:
+        manifest_path = get_manifest_path(out_folder_path, "MeasureTool", options["filename"])
+        options_hash = get_options_hash(executable_parameters + [get_measuretool_info(points, grid)])
+        part_numbers = get_results_catalog(out_folder_path).get_parts()
+        if parts is not None:
+            selected_parts = set(parts)
+            part_numbers = [part for part in part_numbers if part in selected_parts]
+        if follow:
+            part_numbers = get_closed_parts(out_folder_path, part_numbers)
+        stale_parts = get_stale_parts(load_manifest(manifest_path), out_folder_path, part_numbers, options_hash)
+        if not stale_parts:
+            if not follow:
+                info_dialog(info_text=__("MeasureTool outputs are already up to date"))
+            return
+        if stale_parts != part_numbers:
+            run_file_name = options["filename"] + MEASURETOOL_INCREMENT_SUFFIX
+            executable_parameters = get_measuretool_parameters(dict(options, filename=run_file_name), case)
+        parts = [part for part in part_numbers if part >= stale_parts[0]]
+
+    def get_current_part(current_output):
+        """ Returns the part being processed from the output of the process. """
         try:
-            current_part = int(current_output.split("/Part_")[1].split(".bi4")[0])
-        except IndexError:
-            current_part = export_dialog.get_value()
-        export_dialog.update_data(current_part)
-
-    def on_cancel():
-        """ Kills the process and cancels the export dialog. """
-        export_process.kill()
-        post_processing_widget.adapt_to_export_finished()
-        export_dialog.reject()
-
-    def on_export_finished(exit_code):
-        """ Closes and displays info/error about the process. """
-        post_processing_widget.adapt_to_export_finished()
-        export_dialog.accept()
-        detailed_text = "The executed command line was: {} {}\n\n{}".format(case.executable_paths.measuretool, " ".join(executable_parameters), case.info.current_output)
+            return int(current_output.split("/Part_")[1].split(".bi4")[0])
+        except (IndexError, ValueError):
+            return None
+
+    def on_export_finished(exit_code, detailed_text):
+        """ Merges the measured parts with the previous results, records them on the manifest and displays info/error about the process. """
+        if incremental and not exit_code:
+            if run_file_name != options["filename"]:
+                for output in get_measuretool_outputs(out_folder_path, run_file_name):
+                    merge_part_csv(out_folder_path + output, out_folder_path + output.replace(run_file_name, options["filename"], 1))
+                    remove(out_folder_path + output)
+            manifest = load_manifest(manifest_path)
+            update_manifest(manifest, out_folder_path, parts, options_hash,
+                            outputs=get_measuretool_outputs(out_folder_path, options["filename"]))
+            save_manifest(manifest_path, manifest)
 
         if not exit_code:
-            info_dialog(info_text=__("MeasureTool finished successfully."), detailed_text=detailed_text)
+            if not follow:
+                info_dialog(info_text=__("MeasureTool finished successfully."), detailed_text=detailed_text)
         else:
             error_dialog(__("There was an error on the post-processing. Show details to view the errors."), detailed_text=detailed_text)
 
-    export_dialog.on_cancel.connect(on_cancel)
-    export_process = QtCore.QProcess(get_fc_main_window())
-    export_process.finished.connect(on_export_finished)
-    export_process.readyReadStandardOutput.connect(on_stdout_ready)
-    ensure_process_is_executable_or_fail(case.executable_paths.measuretool)
-    export_process.start(case.executable_paths.measuretool, executable_parameters)
-
-
-def isosurface_export(options, case, post_processing_widget) -> None:
-    """ Export IsoSurface button behaviour. Launches a process while disabling the button. """
-    post_processing_widget.adapt_to_export_start()
-
-    exported_parts: int = get_total_exported_parts_from_disk(case.get_out_folder_path())
-    export_dialog = ExportProgressDialog(0, exported_parts, parent=get_fc_main_window())
-    export_dialog.show()
+    submit_export("MeasureTool", case.executable_paths.measuretool, executable_parameters, case, post_processing_widget, get_current_part, on_export_finished,
+                  parts=parts, quiet=follow, on_started=lambda _: save_measuretool_info(case.path, points, grid))
 
-    case.info.current_output = ""
 
-    # Build parameters
+def get_isosurface_parameters(options, case) -> list:
+    """ Returns the parameters to run IsoSurface with the given export options. """
     executable_parameters = ["-dirin {out_path}".format(out_path=case.get_out_folder_path()),
                              "{surface_or_slice} {out_path}{file_name}".format(surface_or_slice=options["surface_or_slice"], out_path=case.get_out_folder_path(), file_name=options["file_name"])]
 
     if options["additional_parameters"]:
         executable_parameters.append(options["additional_parameters"])
 
-    def on_stdout_ready():
-        """ Updates the export dialog on every stdout available from the process. """
-        current_output = str(export_process.readAllStandardOutput().data(), encoding='utf-8')
-        case.info.current_output += current_output
+    return executable_parameters
+
+
+def isosurface_export(options, case, post_processing_widget) -> None:
+    """ Export IsoSurface button behaviour. Queues an IsoSurface execution, followed by a ParaView launch if requested. """
+    executable_parameters = get_isosurface_parameters(options, case)
+
+    def get_current_part(current_output):
+        """ Returns the part being exported from the output of the process. """
         try:
             current_part = current_output.split("{}_".format(options["file_name"]))[1]
-            current_part = int(current_part.split(".vtk")[0])
-        except IndexError:
-            current_part = export_dialog.get_value()
-        export_dialog.update_data(current_part)
-
-    def on_cancel():
-        """ Kills the process and cancels the export dialog. """
-        export_process.kill()
-        post_processing_widget.adapt_to_export_finished()
-        export_dialog.reject()
-
-    def on_export_finished(exit_code):
-        """ Closes and displays info/error about the process. """
-        post_processing_widget.adapt_to_export_finished()
-        export_dialog.accept()
-        detailed_text = "The executed command line was: {} {}\n\n{}".format(case.executable_paths.isosurface, " ".join(executable_parameters), case.info.current_output)
+            return int(current_part.split(".vtk")[0])
+        except (IndexError, ValueError):
+            return None
+
+    def on_export_finished(exit_code, detailed_text):
+        """ Writes the series manifest and displays info/error about the process. """
+        write_series_manifest(case.get_out_folder_path(), options["file_name"], "vtk")
         input_text = case.path + "!!" + case.name + "!!" + options["file_name"]
 
         if not exit_code:
@@ -299,30 +472,16 @@ def isosurface_export(options, case, post_processing_widget) -> None:
         else:
             error_dialog(__("There was an error on the post-processing. Show details to view the errors."), detailed_text=detailed_text)
 
-        if options["open_paraview"]:
-            subprocess.Popen([case.executable_paths.paraview,
-                              "--data={}\\{}_..{}".format(case.path + "\\" + case.name + "_out",
-                                                          options["file_name"], "vtk")],
-                             stdout=subprocess.PIPE)
+    task_ids = submit_export("IsoSurface", case.executable_paths.isosurface, executable_parameters, case, post_processing_widget, get_current_part, on_export_finished,
+                             output_series=(options["file_name"], "vtk"), parts=get_window_parts(case.get_out_folder_path(), options.get("part_window", None)))
 
-    export_dialog.on_cancel.connect(on_cancel)
-    export_process = QtCore.QProcess(get_fc_main_window())
-    export_process.finished.connect(on_export_finished)
-    export_process.readyReadStandardOutput.connect(on_stdout_ready)
-    ensure_process_is_executable_or_fail(case.executable_paths.isosurface)
-    export_process.start(case.executable_paths.isosurface, executable_parameters)
+    if options["open_paraview"]:
+        submit_paraview_launch(case, get_series_manifest_path(case.get_out_folder_path(), options["file_name"], "vtk"), task_ids)
 
 
-def flowtool_export(options, case, post_processing_widget) -> None:
-    """ Export FlowTool button behaviour. Launches a process while disabling the button. """
-    post_processing_widget.adapt_to_export_start()
-
-    exported_parts: int = get_total_exported_parts_from_disk(case.get_out_folder_path())
-    export_dialog = ExportProgressDialog(0, exported_parts, parent=get_fc_main_window())
-    export_dialog.show()
-
-    case.info.current_output = ""
-
+def get_flowtool_parameters(options, case) -> list:
+    """ Returns the parameters to run FlowTool with the given export options.
+    The boxes are read from the fileboxes.txt file written with create_flowtool_boxes when the execution starts. """
     executable_parameters = ["-dirin {}".format(case.get_out_folder_path()),
                              "-fileboxes {case_path}/fileboxes.txt".format(case_path=case.path),
                              "-savecsv {out_path}{file_name}.csv".format(out_path=case.get_out_folder_path(), file_name=options["csv_name"]),
@@ -331,37 +490,30 @@ def flowtool_export(options, case, post_processing_widget) -> None:
     if options["additional_parameters"]:
         executable_parameters.append(options["additional_parameters"])
 
-    def on_stdout_ready():
-        """ Updates the export dialog on every stdout available from the process. """
-        current_output = str(export_process.readAllStandardOutput().data(), encoding='utf-8')
-        case.info.current_output += current_output
+    return executable_parameters
+
+
+def flowtool_export(options, case, post_processing_widget) -> None:
+    """ Export FlowTool button behaviour. Queues a FlowTool execution.
+    The boxes are written to fileboxes.txt when the execution starts, as previous executions may still be reading it. """
+    executable_parameters = get_flowtool_parameters(options, case)
+    boxes = deepcopy(case.flowtool_boxes)
+
+    def get_current_part(current_output):
+        """ Returns the part being exported from the output of the process. """
         try:
             current_part = current_output.split("{}_".format(options["vtk_name"]))[1]
-            current_part = int(current_part.split(".vtk")[0])
-        except IndexError:
-            current_part = export_dialog.get_value()
-        export_dialog.update_data(current_part)
-
-    def on_cancel():
-        """ Kills the process and cancels the export dialog. """
-        export_process.kill()
-        post_processing_widget.adapt_to_export_finished()
-        export_dialog.reject()
-
-    def on_export_finished(exit_code):
-        """ Closes and displays info/error about the process. """
-        post_processing_widget.adapt_to_export_finished()
-        export_dialog.accept()
-        detailed_text = "The executed command line was: {} {}\n\n{}".format(case.executable_paths.flowtool, " ".join(executable_parameters), case.info.current_output)
+            return int(current_part.split(".vtk")[0])
+        except (IndexError, ValueError):
+            return None
 
+    def on_export_finished(exit_code, detailed_text):
+        """ Displays info/error about the process. """
         if not exit_code:
             info_dialog(info_text=__("FlowTool finished successfully"), detailed_text=detailed_text)
         else:
             error_dialog(__("There was an error on the post-processing. Show details to view the errors."), detailed_text=detailed_text)
 
-    export_dialog.on_cancel.connect(on_cancel)
-    export_process = QtCore.QProcess(get_fc_main_window())
-    export_process.finished.connect(on_export_finished)
-    export_process.readyReadStandardOutput.connect(on_stdout_ready)
-    ensure_process_is_executable_or_fail(case.executable_paths.flowtool)
-    export_process.start(case.executable_paths.flowtool, executable_parameters)
+    submit_export("FlowTool", case.executable_paths.flowtool, executable_parameters, case, post_processing_widget, get_current_part, on_export_finished,
+                  parts=get_window_parts(case.get_out_folder_path(), options.get("part_window", None)),
+                  on_started=lambda _: create_flowtool_boxes(case.path + "/" + "fileboxes.txt", boxes))
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3.7
+# -*- coding: utf-8 -*-
+
+""" Simulation results catalog.
+
+Keeps an index of the parts on the out folder of a case: their number,
+simulation time, file size, particle count and the per-part outputs the
+post-processing tools wrote for them. The catalog is persisted on the out
+folder and refreshed incrementally: only the part files that are new or
+changed since the last refresh are read, and only their headers.
+
+"""
+
+import re
+import json
+import time
+import threading
+
+from os import path, scandir, replace
+
+import numpy as np
+
+from mod.stdout_tools import debug, error
+from mod.bi4_tools import Bi4File, Bi4Error, Bi4TruncatedError, PART_FILE_REGEX
+from mod.run_log_tools import RunLogFollower
+
+from mod.constants import RESULTS_CATALOG_FILE_NAME, POST_PROCESSING_FOLLOW_SETTLE_SECONDS
+
+# Files written by the post-processing tools for a single part: <name>_<part>.<extension>
+PART_OUTPUT_REGEX = re.compile(r"^(.+)_(\d{4,})\.(vtk|vtu|csv|asc|ply)$")
+
+# {out folder path: ResultsCatalog}
+_catalogs: dict = dict()
+_catalogs_lock = threading.Lock()
+
+
+class ResultsCatalog():
+    """ Index of the parts and per-part outputs of a simulation out folder.
+    Each part is stored as {"time", "size", "mtime_ns", "particles", "complete", "error", "outputs": [file name]}.
+    error keeps why a part file could not be read, other than being still written. It is not read again until it changes. """
+
+    def __init__(self, out_folder_path: str):
+        self.out_folder_path: str = out_folder_path
+        self.parts: dict = dict()  # {part: entry}
+        self.lock = threading.RLock()
+        self.run_log: RunLogFollower = RunLogFollower("{}/Run.out".format(out_folder_path))
+        self.load()
+
+    def get_catalog_path(self) -> str:
+        """ Returns the path of the file the catalog is persisted on. """
+        return "{}/{}".format(self.out_folder_path, RESULTS_CATALOG_FILE_NAME)
+
+    def load(self) -> None:
+        """ Loads the catalog persisted on the out folder, if any. """
+        if not path.isfile(self.get_catalog_path()):
+            return
+        try:
+            with open(self.get_catalog_path(), "r", encoding="utf-8") as f:
+                self.parts = {int(part): entry for part, entry in json.load(f)["parts"].items()}
+        except (ValueError, KeyError):
+            debug("Results catalog {} is corrupted. It will be built again".format(self.get_catalog_path()))
+            self.parts = dict()
+
+    def save(self) -> None:
+        """ Persists the catalog on the out folder, replacing the previous one atomically. """
+        with open("{}.tmp".format(self.get_catalog_path()), "w", encoding="utf-8") as f:
+            json.dump({"parts": {str(part): entry for part, entry in self.parts.items()}}, f)
+        replace("{}.tmp".format(self.get_catalog_path()), self.get_catalog_path())
+
+    def refresh(self) -> bool:
+        """ Updates the catalog with the contents of the out folder. Only new or changed part files are read.
+        Returns whether anything changed. """
+        with self.lock:
+            if not path.isdir(self.out_folder_path):
+                changed = bool(self.parts)
+                self.parts = dict()
+                return changed
+
+            part_stats: dict = dict()  # {part: (size, mtime_ns)}
+            outputs: dict = dict()  # {part: [file name]}
+            with scandir(self.out_folder_path) as entries:
+                for entry in entries:
+                    part_match = PART_FILE_REGEX.match(entry.name)
+                    if part_match and part_match.group(0) == entry.name:
+                        entry_stat = entry.stat()
+                        part_stats[int(part_match.group(1))] = (entry_stat.st_size, entry_stat.st_mtime_ns)
+                        continue
+                    output_match = PART_OUTPUT_REGEX.match(entry.name)
+                    if output_match:
+                        outputs.setdefault(int(output_match.group(2)), list()).append(entry.name)
+
+            changed = set(self.parts) != set(part_stats)
+            for part in set(self.parts) - set(part_stats):
+                self.parts.pop(part)
+            for part, (size, mtime_ns) in part_stats.items():
+                entry = self.parts.get(part, None)
+                if entry is None or entry["size"] != size or entry["mtime_ns"] != mtime_ns or not (entry["complete"] or entry.get("error", None)):
+                    self.parts[part] = self.read_part(part, size, mtime_ns)
+                    changed = changed or self.parts[part] != entry
+                part_outputs = sorted(outputs.get(part, list()))
+                if self.parts[part]["outputs"] != part_outputs:
+                    self.parts[part]["outputs"] = part_outputs
+                    changed = True
+
+            if changed:
+                self.save()
+            return changed
+
+    def read_part(self, part: int, size: int, mtime_ns: int) -> dict:
+        """ Reads the time and particle count of a part from its header.
+        If the file is still being written the time is taken from the run log and the part is marked as not complete.
+        Files that can not be read for other reasons are reported and keep the error on their entry. """
+        entry = {"time": None, "size": size, "mtime_ns": mtime_ns, "particles": None, "complete": False, "error": None, "outputs": list()}
+        try:
+            part_file = Bi4File("{}/Part_{:04d}.bi4".format(self.out_folder_path, part))
+            idp = part_file.root.find_array("Idp")
+            entry["time"] = part_file.get_value("TimeStep", None)
+            entry["particles"] = idp.count if idp is not None else None
+            entry["complete"] = entry["time"] is not None
+        except Bi4TruncatedError:
+            pass
+        except (Bi4Error, OSError) as ex:
+            entry["error"] = str(ex)
+            error("Part {} of {} can not be read: {}".format(part, self.out_folder_path, ex))
+        if entry["time"] is None:
+            entry["time"] = self.get_run_log_times().get(part, None)
+        return entry
+
+    def get_run_log_times(self) -> dict:
+        """ Returns the time of each part reported on the run log. {part: time} """
+        self.run_log.read_new_lines()
+        telemetry = self.run_log.telemetry
+        return dict(zip(telemetry.get_column("part").tolist(), telemetry.get_column("sim_time").tolist()))
+
+    def get_parts(self) -> list:
+        """ Returns the sorted part numbers. """
+        with self.lock:
+            return sorted(self.parts)
+
+    def get_part(self, part: int) -> dict:
+        """ Returns the entry of a part, or None if it is not on the catalog. """
+        with self.lock:
+            return self.parts.get(part, None)
+
+    def get_time_index(self) -> np.ndarray:
+        """ Returns the part numbers and times as a structured array with the fields part and time, sorted by part.
+        Parts without a known time have NaN as time. """
+        with self.lock:
+            index = np.zeros(len(self.parts), dtype=[("part", np.int32), ("time", np.float64)])
+            for i, part in enumerate(sorted(self.parts)):
+                part_time = self.parts[part]["time"]
+                index[i] = (part, np.nan if part_time is None else part_time)
+            return index
+
+    def get_parts_between(self, start_time: float, end_time: float) -> list:
+        """ Returns the parts with a time between start_time and end_time, both included. """
+        index = self.get_time_index()
+        return index["part"][(index["time"] >= start_time) & (index["time"] <= end_time)].tolist()
+
+    def get_parts_in_window(self, start_time: float, end_time: float = None, stride: int = 1) -> list:
+        """ Returns every stride-th part with a time between start_time and end_time, both included.
+        Without end_time the window includes the parts written later on. """
+        return self.get_parts_between(start_time, np.inf if end_time is None else end_time)[::stride]
+
+    def get_part_at_time(self, part_time: float) -> int:
+        """ Returns the last part written at or before the given time, or None if there is none. """
+        index = self.get_time_index()
+        index = index[~np.isnan(index["time"])]
+        position = np.searchsorted(index["time"], part_time, side="right") - 1
+        return int(index["part"][position]) if position >= 0 else None
+
+    def get_latest_complete_part(self) -> int:
+        """ Returns the last part that DualSPHysics finished writing, or None if there is none.
+        The last part is considered still open while it was modified less than POST_PROCESSING_FOLLOW_SETTLE_SECONDS ago. """
+        with self.lock:
+            parts = sorted(part for part, entry in self.parts.items() if entry["complete"])
+            if parts and parts[-1] == max(self.parts) and time.time() - self.parts[parts[-1]]["mtime_ns"] / 1e9 < POST_PROCESSING_FOLLOW_SETTLE_SECONDS:
+                parts.pop()
+            return parts[-1] if parts else None
+
+    def get_output_parts(self, file_name: str, extension: str) -> list:
+        """ Returns the parts having an output named <file_name>_<part>.<extension>. """
+        with self.lock:
+            return sorted(part for part, entry in self.parts.items()
+                          if "{}_{:04d}.{}".format(file_name, part, extension) in entry["outputs"])
+
+
+def get_results_catalog(out_folder_path: str, refresh: bool = True) -> ResultsCatalog:
+    """ Returns the results catalog of an out folder, refreshed with its current contents unless refresh is False. """
+    key = path.normpath(out_folder_path)
+    with _catalogs_lock:
+        if key not in _catalogs:
+            _catalogs[key] = ResultsCatalog(key)
+        catalog = _catalogs[key]
+    if refresh:
+        catalog.refresh()
+    return catalog
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3.7
+# -*- coding: utf-8 -*-
+
+""" DualSPHysics run log (Run.out) related tools. """
+
+import re
+
+from os import path
+
+from mod.telemetry_tools import RunTelemetry
+
+TIMEMAX_REGEX = re.compile(r"TimeMax=(\S+)")
+# Part line columns: Part, PartTime, TotalSteps, Steps, Time/Sec and Finish time
+PART_LINE_REGEX = re.compile(r"Part_(\d+)\s+(\S+)(?:\s+(\d+)\s(?:\s*\d+\s+([\d.]+)\s)?)?")
+TOTAL_OUT_REGEX = re.compile(r"\(total out: (\d+)\)")
+
+
+class RunLogFollower():
+    """ Follows a growing Run.out file, reading and parsing only the lines appended since the last read. """
+
+    def __init__(self, file_path: str):
+        self.file_path: str = file_path
+        self.reset()
+
+    def reset(self) -> None:
+        """ Forgets everything read from the file. """
+        self.offset: int = 0
+        self.pending: bytes = b""
+
+        self.timemax: float = None
+        self.last_part_time: float = None
+        self.last_estimated_time: str = None
+        self.elapsed_seconds: float = 0.0  # Wall seconds of the run up to the last part, from the Time/Sec column
+        self.total_particles_out: int = 0
+        self.telemetry: RunTelemetry = RunTelemetry()
+
+    def read_new_lines(self) -> list:
+        """ Returns the complete lines appended to the file since the last call and updates the parsed information with them. """
+        if not path.isfile(self.file_path):
+            return []
+
+        if path.getsize(self.file_path) < self.offset:
+            # The file was truncated or replaced by a new run. Start over.
+            self.reset()
+
+        with open(self.file_path, "rb") as run_file:
+            run_file.seek(self.offset)
+            data = run_file.read()
+        self.offset += len(data)
+
+        # Keep the last line for the next read if it's not complete yet
+        data = self.pending + data
+        last_line_break = data.rfind(b"\n")
+        if last_line_break == -1:
+            self.pending = data
+            return []
+        self.pending = data[last_line_break + 1:]
+
+        lines = str(data[:last_line_break + 1], encoding="utf-8", errors="replace").splitlines(True)
+        for line in lines:
+            self.parse_line(line)
+        return lines
+
+    def parse_line(self, line: str) -> None:
+        """ Updates the parsed information with a single line of the log. """
+        if self.timemax is None and "TimeMax=" in line:
+            timemax_match = TIMEMAX_REGEX.search(line)
+            if timemax_match:
+                self.timemax = float(timemax_match.group(1))
+
+        if "Part_" in line and "stored" not in line and "      " in line:
+            part_match = PART_LINE_REGEX.search(line)
+            if part_match:
+                previous_part_time = self.last_part_time
+                self.last_part_time = float(part_match.group(2))
+                if part_match.group(4) and previous_part_time is not None:
+                    # Time/Sec is the wall seconds spent per simulated second since the previous part
+                    self.elapsed_seconds += float(part_match.group(4)) * (self.last_part_time - previous_part_time)
+                if part_match.group(3):
+                    self.telemetry.append(int(part_match.group(1)), self.last_part_time, int(part_match.group(3)), self.total_particles_out,
+                                          wall_time=self.elapsed_seconds if part_match.group(4) else None)
+                self.last_estimated_time = " ".join(line.split(None)[-2:])
+
+        if "total out: " in line:
+            total_out_match = TOTAL_OUT_REGEX.search(line)
+            if total_out_match:
+                self.total_particles_out = int(total_out_match.group(1))
+
+    def get_percentage(self, timemax: float) -> float:
+        """ Returns the percentage of the simulation completed, or None if no part was stored yet. """
+        if self.last_part_time is None or not timemax or timemax <= 0:
+            return None
+        return (self.last_part_time * float(100)) / float(timemax)
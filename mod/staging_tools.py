@@ -0,0 +1,146 @@
+#!/usr/bin/env python3.7
+# -*- coding: utf-8 -*-
+
+""" Tools to stage the external files a case depends on into its project folders. """
+
+import json
+import shutil
+import hashlib
+
+from sys import platform
+from os import path, stat, replace, remove
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from mod.stdout_tools import debug, error
+
+from mod.constants import STAGING_MAX_WORKERS, STAGING_MANIFEST_FILE_NAME
+
+# ioctl request to clone a file sharing its blocks on copy-on-write linux filesystems (btrfs, xfs...)
+FICLONE = 0x40049409
+
+
+def get_file_hash(file_path: str) -> str:
+    """ Returns the SHA1 hash for the contents of the given file. """
+    file_hash = hashlib.sha1()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+def load_staging_manifest(project_folder: str) -> dict:
+    """ Loads the record of files staged on the project folder, or an empty one if it doesn't exist. """
+    manifest_path = "{}/{}".format(project_folder, STAGING_MANIFEST_FILE_NAME)
+    if not path.isfile(manifest_path):
+        return dict()
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except ValueError:
+        error("Staging manifest {} is corrupted. All files will be staged again".format(manifest_path))
+        return dict()
+
+
+def save_staging_manifest(project_folder: str, manifest: dict) -> None:
+    """ Persists the record of files staged on the project folder. """
+    with open("{}/{}".format(project_folder, STAGING_MANIFEST_FILE_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=4)
+
+
+def reflink_file(source: str, destination: str) -> bool:
+    """ Tries to create a copy-on-write clone of the source file. Returns whether it was possible or not. """
+    if platform not in ("linux", "linux2"):
+        return False
+    import fcntl  # pylint: disable=import-outside-toplevel
+    try:
+        with open(source, "rb") as src, open(destination, "wb") as dst:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        shutil.copystat(source, destination)
+        return True
+    except OSError:
+        if path.isfile(destination):
+            remove(destination)
+        return False
+
+
+def clone_or_copy_file(source: str, destination: str) -> None:
+    """ Places an independent copy of source in destination: a copy-on-write clone if the filesystem allows it or a regular copy.
+    Files are never hard linked, so later in-place writes to one file do not change the other.
+    The destination file is replaced atomically. """
+    tmp_destination = "{}.staging".format(destination)
+    if path.isfile(tmp_destination):
+        remove(tmp_destination)
+
+    if not reflink_file(source, tmp_destination):
+        shutil.copy2(source, tmp_destination)
+
+    replace(tmp_destination, destination)
+
+
+def is_already_staged(source: str, destination: str, record: dict, source_stat) -> bool:
+    """ Returns whether the destination already contains the current version of source, based on its staging record. """
+    if not record or not path.isfile(destination) or record["source"] != source:
+        return False
+    if path.samefile(source, destination):
+        # Hard linked to the source by a previous version. It must be replaced by a copy.
+        return False
+    if record["size"] == source_stat.st_size and record["mtime"] == source_stat.st_mtime_ns:
+        return True
+    # Touched but maybe not modified. Compare the contents.
+    return record["size"] == source_stat.st_size and record["hash"] == get_file_hash(source)
+
+
+def stage_file(source: str, destination: str, record: dict) -> tuple:
+    """ Stages a file into destination if needed. Returns its updated staging record and whether the file was staged or it was already up to date. """
+    source_stat = stat(source)
+    if is_already_staged(source, destination, record, source_stat):
+        return dict(record, mtime=source_stat.st_mtime_ns), False
+
+    debug("Staging {} to {}".format(source, destination))
+    clone_or_copy_file(source, destination)
+    return {
+        "source": source,
+        "size": source_stat.st_size,
+        "mtime": source_stat.st_mtime_ns,
+        "hash": get_file_hash(source)
+    }, True
+
+
+def stage_files(project_folder: str, files: list, destination_folders: list, on_progress=None) -> list:
+    """ Stages the given files into each one of the destination folders, skipping the ones already staged and unchanged.
+    Files are staged on a bounded thread pool as copy-on-write clones or regular copies, so the staged files do not change when
+    the source files are edited afterwards. on_progress, if given, is called as on_progress(done, total) from the calling thread.
+    This blocks until all the files are staged: GUI code should call it through gui_tools.run_in_background.
+    Returns the list of files that could not be staged. """
+    manifest: dict = load_staging_manifest(project_folder)
+    jobs: list = list()
+    for source in files:
+        for folder in destination_folders:
+            destination = path.abspath("{}/{}".format(folder, path.basename(source)))
+            if path.abspath(source) == destination:
+                # Already in place.
+                continue
+            if (path.abspath(source), destination) not in jobs:
+                jobs.append((path.abspath(source), destination))
+
+    failed: set = set()
+    updated: int = 0
+    failed_jobs: int = 0
+    with ThreadPoolExecutor(max_workers=STAGING_MAX_WORKERS) as executor:
+        futures = {executor.submit(stage_file, source, destination, manifest.get(destination, None)): (source, destination) for source, destination in jobs}
+        for done, future in enumerate(as_completed(futures), start=1):
+            source, destination = futures[future]
+            try:
+                manifest[destination], staged = future.result()
+                updated += int(staged)
+            except (IOError, OSError):
+                error("Unable to copy {} into {}".format(source, path.dirname(destination)))
+                manifest.pop(destination, None)
+                failed.add(source)
+                failed_jobs += 1
+            if on_progress:
+                on_progress(done, len(jobs))
+
+    debug("Staging finished: {} files staged, {} already up to date, {} failed".format(updated, len(jobs) - updated - failed_jobs, failed_jobs))
+    save_staging_manifest(project_folder, manifest)
+    return [source for source in files if path.abspath(source) in failed]
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3.7
+# -*- coding: utf-8 -*-
+
+""" Parametric sweep tools.
+
+Generate variants of a saved case changing some of its parameters, following
+a full grid or a Latin hypercube design, and run the pipeline for all of them
+with a limited number of variants at once. Parameters are referenced by their
+dotted path on the case data, for example "dp", "execution_parameters.visco",
+"constants.coefh" or "mkbasedproperties.11.movements.0.motion_list.0.wave_height".
+
+Each variant lives on <sweep folder>/<variant id>/<case name>, keeping the
+case name of the base case. Variants whose GenCase definition only differs on
+the execution parameters share the result of a single GenCase run.
+
+"""
+
+import re
+import csv
+import copy
+import json
+import time
+import random
+import hashlib
+import itertools
+
+from os import path, listdir, makedirs
+from concurrent.futures import ThreadPoolExecutor
+
+from mod.executable_tools import refocus_cwd
+from mod.case_data_tools import dump_case_data
+from mod.staging_tools import clone_or_copy_file
+from mod.gencase_cache_tools import GENCASE_CACHE_IGNORED_FILES, DEFINITION_DATE_REGEX
+from mod.pipeline_tools import POST_PROCESSING_STAGES, emit, set_event_context, load_case_headless, get_post_processing_options
+from mod.pipeline_tools import run_gencase_stage, run_simulation_stage, run_post_processing_stage
+from mod.xml.xml_exporter import XMLExporter
+
+from mod.constants import SWEEP_FOLDER_SUFFIX, SWEEP_SUMMARY_FILE_NAME, SWEEP_DEFAULT_MAX_PARALLEL
+
+from mod.dataobjects.case import Case
+
+# Files of the base project folder that are generated again for each variant
+SWEEP_IGNORED_FILES = GENCASE_CACHE_IGNORED_FILES + ("points.txt", "fileboxes.txt")
+
+# Execution parameters block of a definition XML. GenCase copies it as is on the XML it generates for DualSPHysics.
+PARAMETERS_BLOCK_REGEX = re.compile(r"<parameters>.*?</parameters>", re.DOTALL)
+
+# Functions to reduce a column of an output CSV to the single value shown on the summary
+OUTPUT_REDUCTIONS = {
+    "max": max,
+    "min": min,
+    "mean": lambda values: sum(values) / len(values),
+    "last": lambda values: values[-1]
+}
+
+
+def get_parameter_key(target, key: str):
+    """ Returns the key used to access the item named key on a dictionary or a list. Dictionaries may use integer keys. """
+    if isinstance(target, list) or (isinstance(target, dict) and key.lstrip("-").isdigit() and int(key) in target):
+        return int(key)
+    return key
+
+
+def get_parameter_child(target, key: str):
+    """ Returns the attribute, dictionary value or list item referenced by key on the target. """
+    if isinstance(target, (dict, list)):
+        return target[get_parameter_key(target, key)]
+    return getattr(target, key)
+
+
+def set_case_parameter(case: Case, parameter_path: str, value) -> None:
+    """ Sets the parameter referenced by its dotted path on the case, keeping the type of its current value. """
+    keys = parameter_path.split(".")
+    target = case
+    try:
+        for key in keys[:-1]:
+            target = get_parameter_child(target, key)
+        current = get_parameter_child(target, keys[-1])
+    except (AttributeError, KeyError, IndexError, ValueError):
+        raise ValueError("Case parameter {} does not exist".format(parameter_path))
+
+    if isinstance(current, bool):
+        value = bool(value)
+    elif isinstance(current, int) and not isinstance(value, (list, str)):
+        value = int(round(value))
+    elif isinstance(current, float) and not isinstance(value, (list, str)):
+        value = float(value)
+
+    if isinstance(target, (dict, list)):
+        target[get_parameter_key(target, keys[-1])] = value
+    else:
+        setattr(target, keys[-1], value)
+
+
+def get_grid_design(parameters: dict) -> list:
+    """ Returns all the combinations of the values given for each parameter. parameters is {path: [value]}. """
+    parameter_paths = sorted(parameters.keys())
+    return [dict(zip(parameter_paths, values)) for values in itertools.product(*(parameters[p] for p in parameter_paths))]
+
+
+def get_latin_hypercube_design(parameters: dict, samples: int, seed: int = None) -> list:
+    """ Returns a Latin hypercube sampling of the parameter ranges. parameters is {path: [low, high]}.
+    Each range is split in as many intervals as samples and each interval is used exactly once.
+    Ranges with integer bounds produce integer values. """
+    rng = random.Random(seed)
+    design: list = [dict() for _ in range(samples)]
+    for parameter_path in sorted(parameters.keys()):
+        low, high = parameters[parameter_path]
+        intervals = list(range(samples))
+        rng.shuffle(intervals)
+        for sample, interval in zip(design, intervals):
+            value = low + (interval + rng.random()) / samples * (high - low)
+            sample[parameter_path] = int(round(value)) if isinstance(low, int) and isinstance(high, int) else value
+    return design
+
+
+def get_sweep_design(config: dict) -> list:
+    """ Returns the list of parameter values for each variant described by the sweep configuration. """
+    design_type = config.get("design", "grid")
+    if design_type == "grid":
+        return get_grid_design(config["parameters"])
+    if design_type == "lhs":
+        return get_latin_hypercube_design(config["parameters"], config["samples"], config.get("seed", None))
+    raise ValueError("Unknown sweep design: {}".format(design_type))
+
+
+def create_variant(base_case: Case, variant_folder: str, values: dict, xml_exporter: XMLExporter) -> Case:
+    """ Creates the project folder of a variant of the base case with the given parameter values. Returns the variant case. """
+    variant_case: Case = copy.deepcopy(base_case)
+    for parameter_path, value in values.items():
+        set_case_parameter(variant_case, parameter_path, value)
+    variant_case.path = "{}/{}".format(variant_folder, base_case.name)
+    variant_case.info.is_gencase_done = False
+    variant_case.info.needs_to_run_gencase = True
+    variant_case.info.is_simulation_done = False
+
+    if not path.isdir(variant_case.path):
+        makedirs(variant_case.path)
+
+    # Geometry and data files are copied from the base case. The XML files are generated for each variant.
+    for file_name in listdir(base_case.path):
+        file_path = "{}/{}".format(base_case.path, file_name)
+        if file_name in SWEEP_IGNORED_FILES or file_name in (xml_exporter.MATERIAL_FILE_NAME, base_case.name + xml_exporter.GENCASE_XML_SUFFIX):
+            continue
+        if path.isfile(file_path):
+            clone_or_copy_file(file_path, "{}/{}".format(variant_case.path, file_name))
+
+    xml_exporter.save_to_disk(variant_case.path, variant_case)
+    dump_case_data(variant_case, "{}/casedata.dsphdata".format(variant_case.path))
+    return variant_case
+
+
+def get_gencase_group_key(case: Case) -> str:
+    """ Returns a key shared by the variants that produce the same GenCase result: their definition XML and materials
+    only differ on the execution parameters, which GenCase just copies to its output. """
+    key_hash = hashlib.sha1()
+    with open("{}/{}{}".format(case.path, case.name, XMLExporter.GENCASE_XML_SUFFIX), "r", encoding="utf-8") as f:
+        definition = DEFINITION_DATE_REGEX.sub("", f.read(), count=1)
+    key_hash.update(PARAMETERS_BLOCK_REGEX.sub("", definition, count=1).encode("utf-8"))
+    with open("{}/{}".format(case.path, XMLExporter.MATERIAL_FILE_NAME), "r", encoding="utf-8") as f:
+        key_hash.update(f.read().encode("utf-8"))
+    return key_hash.hexdigest()
+
+
+def share_gencase_result(source_case: Case, case: Case) -> None:
+    """ Places the GenCase result of the source case on the out folder of another variant of its group,
+    replacing the execution parameters with the ones of that variant. """
+    out_folder = case.get_out_folder_path()
+    if not path.isdir(out_folder):
+        makedirs(out_folder)
+
+    out_xml_name = "{}.xml".format(case.name)
+    for file_name in listdir(source_case.get_out_folder_path()):
+        file_path = source_case.get_out_folder_path() + file_name
+        if file_name != out_xml_name and path.isfile(file_path):
+            clone_or_copy_file(file_path, out_folder + file_name)
+
+    with open("{}/{}{}".format(case.path, case.name, XMLExporter.GENCASE_XML_SUFFIX), "r", encoding="utf-8") as f:
+        parameters_block = PARAMETERS_BLOCK_REGEX.search(f.read()).group(0)
+    with open(source_case.get_out_folder_path() + out_xml_name, "r", encoding="utf-8") as f:
+        out_xml = f.read()
+    # Written as a new file. The source one must not be modified.
+    with open(out_folder + out_xml_name, "w", encoding="utf-8") as f:
+        f.write(PARAMETERS_BLOCK_REGEX.sub(lambda _: parameters_block, out_xml, count=1))
+
+    case.info.particle_number = source_case.info.particle_number
+    case.info.is_gencase_done = True
+    case.info.needs_to_run_gencase = False
+
+
+def read_output_value(file_path: str, column: str, reduction: str) -> float:
+    """ Reads a column of a DualSPHysics CSV file (semicolon separated) and reduces it to a single value.
+    Returns None if the file or the column do not exist. """
+    if not path.isfile(file_path):
+        return None
+    column_index = None
+    values: list = list()
+    with open(file_path, "r", encoding="utf-8", errors="replace") as f:
+        for row in csv.reader(f, delimiter=";"):
+            row = [cell.strip() for cell in row]
+            if column_index is None:
+                if column in row:
+                    column_index = row.index(column)
+                continue
+            try:
+                values.append(float(row[column_index]))
+            except (IndexError, ValueError):
+                continue
+    return OUTPUT_REDUCTIONS[reduction](values) if values else None
+
+
+def collect_outputs(case: Case, outputs: list) -> dict:
+    """ Returns the summary values configured on the outputs list, read from the out folder of the case.
+    Each output is a dict with "name", "file" (relative to the out folder), "column" and "reduce" (max, min, mean or last). """
+    return {output["name"]: read_output_value(case.get_out_folder_path() + output["file"], output["column"], output.get("reduce", "last"))
+            for output in outputs}
+
+
+def write_summary(file_path: str, rows: list) -> None:
+    """ Writes the summary table of a sweep, one row per variant, as a CSV file. """
+    columns: list = list()
+    for row in rows:
+        columns.extend(column for column in row.keys() if column not in columns)
+    with open(file_path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=columns, delimiter=";")
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def run_variant(variant_id: str, case: Case, config: dict, post_processing_stages: list) -> dict:
+    """ Runs the simulation and the post-processing stages of a variant whose GenCase result is ready.
+    Returns its summary row. """
+    set_event_context(variant=variant_id)
+    started = time.time()
+    exit_code = run_simulation_stage(case, config.get("device", "GPU"), config.get("threads", 0))
+    for stage in post_processing_stages:
+        if exit_code:
+            break
+        exit_code = run_post_processing_stage(case, stage, get_post_processing_options(stage, config))
+    dump_case_data(case, "{}/casedata.dsphdata".format(case.path))
+
+    row = {"variant": variant_id, "exit_code": exit_code, "particles": case.info.particle_number, "elapsed": round(time.time() - started, 2)}
+    if not exit_code:
+        row.update(collect_outputs(case, config.get("outputs", list())))
+    emit("variant_finished", exit_code=exit_code)
+    return row
+
+
+def run_sweep(case_data_path: str, config: dict) -> int:
+    """ Generates and runs all the variants of a parametric sweep over a saved case, writing a summary table of
+    their results. Returns 0 if all the variants finished correctly. """
+    refocus_cwd()
+    base_case = load_case_headless(case_data_path)
+    sweep_name = config.get("name", "sweep")
+    sweep_folder = config.get("folder", "{}{}_{}".format(base_case.path, SWEEP_FOLDER_SUFFIX, sweep_name))
+    max_parallel = max(1, config.get("max_parallel", SWEEP_DEFAULT_MAX_PARALLEL))
+    post_processing_stages = [stage for stage in config.get("stages", list()) if stage in POST_PROCESSING_STAGES]
+
+    design = get_sweep_design(config)
+    emit("sweep_started", case=base_case.name, folder=sweep_folder, variants=len(design))
+    if not path.isdir(sweep_folder):
+        makedirs(sweep_folder)
+    with open("{}/sweep.json".format(sweep_folder), "w", encoding="utf-8") as f:
+        json.dump(config, f, indent=4)
+
+    # Variants are created one after another, as the XML exporter is not thread safe.
+    xml_exporter = XMLExporter()
+    variants: dict = dict()  # {variant_id: Case}
+    groups: dict = dict()  # {gencase group key: [variant_id]}
+    for index, values in enumerate(design):
+        variant_id = "variant_{:04d}".format(index)
+        variants[variant_id] = create_variant(base_case, "{}/{}".format(sweep_folder, variant_id), values, xml_exporter)
+        groups.setdefault(get_gencase_group_key(variants[variant_id]), list()).append(variant_id)
+        emit("variant_created", variant=variant_id, parameters=values)
+
+    def gencase_group(variant_ids: list) -> int:
+        set_event_context(variant=variant_ids[0])
+        exit_code = run_gencase_stage(variants[variant_ids[0]])
+        if not exit_code:
+            for variant_id in variant_ids[1:]:
+                share_gencase_result(variants[variant_ids[0]], variants[variant_id])
+        return exit_code
+
+    emit("sweep_gencase", runs=len(groups), variants=len(design))
+    with ThreadPoolExecutor(max_workers=max_parallel) as executor:
+        gencase_results = dict(zip(groups.keys(), executor.map(gencase_group, groups.values())))
+
+    rows: dict = {variant_id: {"variant": variant_id, "exit_code": gencase_results[key], "particles": 0, "elapsed": 0.0}
+                  for key, variant_ids in groups.items() for variant_id in variant_ids}
+    ready = [variant_id for variant_id in variants if not rows[variant_id]["exit_code"]]
+    with ThreadPoolExecutor(max_workers=max_parallel) as executor:
+        for row in executor.map(lambda variant_id: run_variant(variant_id, variants[variant_id], config, post_processing_stages), ready):
+            rows[row["variant"]] = row
+
+    summary_rows: list = list()
+    for variant_id, values in zip(variants.keys(), design):
+        summary_row = {"variant": variant_id}
+        summary_row.update(values)
+        summary_row.update(rows[variant_id])
+        summary_rows.append(summary_row)
+    summary_path = "{}/{}".format(sweep_folder, SWEEP_SUMMARY_FILE_NAME)
+    write_summary(summary_path, summary_rows)
+
+    failed = len([row for row in summary_rows if row["exit_code"]])
+    set_event_context()
+    emit("sweep_finished", summary=summary_path, variants=len(summary_rows), failed=failed)
+    return 1 if failed else 0
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3.7
+# -*- coding: utf-8 -*-
+
+""" Simulation telemetry.
+
+Keeps a compact columnar time series of the parts reported by DualSPHysics
+on its run log, with fixed size ring buffers, and derives the throughput and
+a time estimation for the rest of the simulation from the most recent parts.
+
+"""
+
+import time
+
+from os import replace
+
+import numpy as np
+
+from mod.constants import TELEMETRY_CAPACITY, TELEMETRY_REGRESSION_WINDOW
+
+# Columns stored for each part and their types
+TELEMETRY_COLUMNS = (
+    ("part", np.int32),
+    ("sim_time", np.float64),
+    ("wall_time", np.float64),
+    ("steps", np.int64),
+    ("dt", np.float64),
+    ("particles_out", np.int64),
+    ("part_seconds", np.float64)
+)
+
+
+class RunTelemetry():
+    """ Ring buffered time series of the parts of a simulation run. """
+
+    def __init__(self, capacity: int = TELEMETRY_CAPACITY):
+        self.capacity: int = capacity
+        self.columns: dict = {name: np.zeros(capacity, dtype=dtype) for name, dtype in TELEMETRY_COLUMNS}
+        self.size: int = 0
+        self.next_index: int = 0
+
+    def append(self, part: int, sim_time: float, steps: int, particles_out: int, wall_time: float = None) -> None:
+        """ Adds the information of a new part. dt is the mean time step since the previous part.
+        wall_time is the wall clock second the part was written at, from any origin. The current time is used if it is not known. """
+        wall_time = time.time() if wall_time is None else wall_time
+        dt = 0.0
+        part_seconds = 0.0
+        if self.size:
+            last = self.get_last_index()
+            if steps > self.columns["steps"][last]:
+                dt = (sim_time - self.columns["sim_time"][last]) / (steps - self.columns["steps"][last])
+            part_seconds = wall_time - self.columns["wall_time"][last]
+
+        for name, value in (("part", part), ("sim_time", sim_time), ("wall_time", wall_time), ("steps", steps),
+                            ("dt", dt), ("particles_out", particles_out), ("part_seconds", part_seconds)):
+            self.columns[name][self.next_index] = value
+
+        self.next_index = (self.next_index + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def get_last_index(self) -> int:
+        """ Returns the position in the buffers of the last part added. """
+        return (self.next_index - 1) % self.capacity
+
+    def get_column(self, name: str, last: int = None) -> np.ndarray:
+        """ Returns the values of a column in chronological order, optionally only the last ones. """
+        column = self.columns[name]
+        if self.size < self.capacity:
+            values = column[:self.size]
+        else:
+            values = np.concatenate((column[self.next_index:], column[:self.next_index]))
+        return values if last is None else values[-last:]
+
+    def get_throughput(self, window: int = TELEMETRY_REGRESSION_WINDOW) -> tuple:
+        """ Returns the simulated seconds per wall hour and the steps per second over the most recent parts, or (None, None) if not known yet. """
+        wall_time = self.get_column("wall_time", window)
+        if len(wall_time) < 2 or wall_time[-1] <= wall_time[0]:
+            return None, None
+        elapsed = wall_time[-1] - wall_time[0]
+        sim_time = self.get_column("sim_time", window)
+        steps = self.get_column("steps", window)
+        return (sim_time[-1] - sim_time[0]) * 3600.0 / elapsed, (steps[-1] - steps[0]) / elapsed
+
+    def get_remaining_seconds(self, timemax: float, window: int = TELEMETRY_REGRESSION_WINDOW) -> float:
+        """ Estimates the wall seconds left to reach timemax with a linear regression of the wall time over the simulated time of the most recent parts.
+        Returns None if there is not enough information. """
+        sim_time = self.get_column("sim_time", window)
+        wall_time = self.get_column("wall_time", window)
+        if not timemax or len(sim_time) < 3 or np.ptp(sim_time) <= 0 or np.ptp(wall_time) <= 0:
+            return None
+        slope, intercept = np.polyfit(sim_time, wall_time, 1)
+        if slope <= 0:
+            return None
+        return max(0.0, slope * timemax + intercept - wall_time[-1])
+
+    def get_mean_dt(self, window: int = TELEMETRY_REGRESSION_WINDOW) -> float:
+        """ Returns the mean time step of the most recent parts, or None if not known yet. """
+        dt = self.get_column("dt", window)
+        dt = dt[dt > 0]
+        return float(dt.mean()) if len(dt) else None
+
+    def save(self, file_path: str) -> None:
+        """ Writes the series in chronological order on the given file, replacing it atomically. """
+        tmp_path = "{}.tmp.npz".format(file_path)
+        np.savez_compressed(tmp_path, **{name: self.get_column(name) for name, _ in TELEMETRY_COLUMNS})
+        replace(tmp_path, file_path)
+
+    @classmethod
+    def load(cls, file_path: str, capacity: int = TELEMETRY_CAPACITY) -> "RunTelemetry":
+        """ Reads a series previously saved on the given file. """
+        telemetry = cls(capacity)
+        with np.load(file_path) as data:
+            size = min(len(data["part"]), capacity)
+            for name, dtype in TELEMETRY_COLUMNS:
+                telemetry.columns[name][:size] = data[name][-size:].astype(dtype)
+        telemetry.size = size
+        telemetry.next_index = size % capacity
+        return telemetry
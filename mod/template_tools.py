@@ -3,16 +3,59 @@
 
 """ Template loading and formatting related tools. """
 
-from os import path
+from os import path, walk
+from threading import Lock
+
+TEMPLATES_FOLDER = "/templates"
+
+# Template texts already loaded in memory, keyed by their path relative to the mod folder (i.e: /templates/gencase/base.xml)
+_templates: dict = dict()
+_templates_loaded: bool = False
+_templates_lock: Lock = Lock()
+
+
+def get_mod_folder() -> str:
+    """ Returns the absolute path of the mod folder, used as root for template paths. """
+    return path.dirname(path.realpath(__file__))
+
+
+def read_templates_from_disk() -> dict:
+    """ Reads every template under the templates folder and returns them keyed by template path. """
+    mod_folder = get_mod_folder()
+    to_ret = dict()
+    for root, _, files in walk("{}{}".format(mod_folder, TEMPLATES_FOLDER)):
+        for filename in files:
+            full_path = path.join(root, filename)
+            template_path = "/" + path.relpath(full_path, mod_folder).replace("\\", "/")
+            with open(full_path, "r", encoding="utf-8") as template:
+                to_ret[template_path] = template.read()
+    return to_ret
+
+
+def preload_templates() -> None:
+    """ Loads all the templates under the templates folder in memory.
+    Further calls to get_template_text will not touch the filesystem. """
+    global _templates_loaded
+    templates = read_templates_from_disk()
+
+    with _templates_lock:
+        _templates.clear()
+        _templates.update(templates)
+        _templates_loaded = True
 
 
 def get_template_text(template_path) -> str:
     """ Returns the text for a given template. """
-    template_data = ""
-    mod_folder = path.dirname(path.realpath(__file__))
+    if not _templates_loaded:
+        preload_templates()
 
-    with open("{}{}".format(mod_folder, template_path), "r", encoding="utf-8") as template:
-        template_data = template.read()
+    template_data = _templates.get(template_path, None)
+    if template_data is None:
+        # Not found in the registry. Read it from disk and keep it for the next time
+        with open("{}{}".format(get_mod_folder(), template_path), "r", encoding="utf-8") as template:
+            template_data = template.read()
+        with _templates_lock:
+            _templates[template_path] = template_data
     return template_data
 
 
@@ -3,36 +3,156 @@
 
 """ Translation related tools. """
 
-from os import path
+from os import path, walk
+from threading import Lock
+import re
+import ast
+import time
+import atexit
 import json
 
 import FreeCADGui
 
+DEFAULT_LOCALE = "english"
 
-def __(text):
-    """ Translation helper. Takes a string and tries to return its translation to the current FreeCAD locale.
-    If the translation is missing or the file does not exists, return default english string. """
-    # Get FreeCAD current language
-    freecad_locale = FreeCADGui.getLocale().lower().replace(", ", "-").replace(" ", "-")
+# Literal strings passed to the translation helper, i.e. __("Save case")
+TRANSLATED_LITERAL_REGEX = re.compile(r'__\(("(?:[^"\\\n]|\\.)*")\)')
 
-    # Find mod directory
-    mod_directory = path.dirname(path.abspath(__file__))
+# Translation catalogs already parsed from disk, keyed by their json file path.
+_catalogs: dict = dict()  # {filename: {text: translation}}
+
+# Strings requested but not present on a catalog, waiting to be written to disk.
+_missing_keys: dict = dict()  # {filename: [text]}
 
-    # Open translation file and print the matching string, if it's defined.
+# Locale and catalog file resolved on the last call, to avoid probing the disk on each translation.
+_current_locale: str = None
+_current_filename: str = None
+
+_catalog_lock: Lock = Lock()
+
+
+def get_translation_filename(freecad_locale: str) -> str:
+    """ Returns the path of the translation file for the given locale, falling back to the english one if it does not exist. """
+    mod_directory = path.dirname(path.abspath(__file__))
     filename = "{mod_directory}/lang/{locale}.json".format(mod_directory=mod_directory, locale=freecad_locale)
 
     if not path.isfile(filename):
-        filename = "{mod_directory}/lang/{locale}.json".format(mod_directory=mod_directory, locale="english")
+        filename = "{mod_directory}/lang/{locale}.json".format(mod_directory=mod_directory, locale=DEFAULT_LOCALE)
+
+    return filename
 
-    with open(filename, "r", encoding="utf-8") as f:
-        translation = json.load(f)
 
-    # Tries to return the translation. It it does not exist, creates it
-    to_ret = translation.get(text, None)
+def get_translation_catalog(filename: str) -> dict:
+    """ Returns the translation catalog stored on the given file, loading it from disk only the first time. """
+    catalog = _catalogs.get(filename, None)
+    if catalog is None:
+        with open(filename, "r", encoding="utf-8") as f:
+            catalog = json.load(f)
+        _catalogs[filename] = catalog
+    return catalog
+
+
+def invalidate_translation_catalogs() -> None:
+    """ Discards all the loaded catalogs so they are read again from disk on the next translation. """
+    global _current_locale, _current_filename
+    with _catalog_lock:
+        _catalogs.clear()
+        _current_locale = None
+        _current_filename = None
+
+
+def flush_missing_translations() -> None:
+    """ Writes all the strings found missing since the last flush to their translation files in one batch. """
+    with _catalog_lock:
+        pending = dict(_missing_keys)
+        _missing_keys.clear()
+
+    for filename, texts in pending.items():
+        # Re-read the file to not override changes made on disk while the catalog was loaded.
+        with open(filename, "r", encoding="utf-8") as f:
+            translation = json.load(f)
+
+        for text in texts:
+            translation.setdefault(text, text)
 
-    if not to_ret:
-        translation[text] = text
         with open(filename, "w", encoding="utf-8") as f:
             json.dump(translation, f, indent=4)
-        return text
+
+
+def __(text):
+    """ Translation helper. Takes a string and tries to return its translation to the current FreeCAD locale.
+    If the translation is missing or the file does not exists, return default english string. """
+    global _current_locale, _current_filename
+
+    # Get FreeCAD current language. Without a GUI session (see mod.cli) there is no locale available.
+    try:
+        freecad_locale = FreeCADGui.getLocale().lower().replace(", ", "-").replace(" ", "-")
+    except (AttributeError, RuntimeError):
+        freecad_locale = "english"
+
+    with _catalog_lock:
+        # Resolve the catalog file again only when the locale changes.
+        if freecad_locale != _current_locale:
+            _current_filename = get_translation_filename(freecad_locale)
+            _current_locale = freecad_locale
+
+        translation = get_translation_catalog(_current_filename)
+
+        # Tries to return the translation. It it does not exist, queues it to be created on the next flush
+        to_ret = translation.get(text, None)
+
+        if not to_ret:
+            translation[text] = text
+            _missing_keys.setdefault(_current_filename, []).append(text)
+            return text
     return to_ret
+
+
+def get_translated_literals(folder: str) -> list:
+    """ Returns the literal strings passed to the translation helper on the python files of the given folder. """
+    texts: list = list()
+    for directory, _, file_names in walk(folder):
+        for file_name in sorted(f for f in file_names if f.endswith(".py")):
+            with open(path.join(directory, file_name), "r", encoding="utf-8") as f:
+                texts.extend(ast.literal_eval(literal) for literal in TRANSLATED_LITERAL_REGEX.findall(f.read()))
+    return texts
+
+
+def benchmark_translations(repeat: int = 3) -> tuple:
+    """ Times translating all the literal strings used by mod/widgets, roughly what building the dock and its dialogs does.
+    Compares resolving and parsing the catalog file on each call, as done before catalogs were cached, with the cached catalogs.
+    Returns the best (uncached, cached) times in seconds. """
+    texts = get_translated_literals("{}/widgets".format(path.dirname(path.abspath(__file__))))
+
+    uncached_timings: list = list()
+    cached_timings: list = list()
+    for _ in range(repeat):
+        start = time.time()
+        for text in texts:
+            with open(get_translation_filename(DEFAULT_LOCALE), "r", encoding="utf-8") as f:
+                json.load(f).get(text, text)
+        uncached_timings.append(time.time() - start)
+
+        invalidate_translation_catalogs()
+        start = time.time()
+        for text in texts:
+            __(text)
+        cached_timings.append(time.time() - start)
+
+    # Strings missing on the catalog are only benchmarked, not written to disk
+    with _catalog_lock:
+        _missing_keys.clear()
+    invalidate_translation_catalogs()
+
+    print("Translating {} strings, best of {}: {:.3f} s reading the catalog on each call, {:.3f} s with cached catalogs".format(
+        len(texts), repeat, min(uncached_timings), min(cached_timings)))
+    return min(uncached_timings), min(cached_timings)
+
+
+atexit.register(flush_missing_translations)
+
+
+if __name__ == "__main__":
+    # Benchmark of the catalog cache. Run inside FreeCAD or with FreeCADGui on the path:
+    #   python -m mod.translation_tools
+    benchmark_translations()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3.7
+# -*- coding: utf-8 -*-
+""" DesignSPHysics visualization service. """
+
+import json
+import shutil
+import itertools
+
+from os import path
+from sys import platform
+
+import FreeCADGui
+
+from PySide import QtCore
+
+from mod.stdout_tools import log, debug, error
+
+VISUALIZATION_SERVER_SCRIPT = "{}/widgets/paraview_visualization.py".format(path.dirname(path.abspath(__file__)))
+
+
+class VisualizationService(QtCore.QObject):
+    """ Keeps a single ParaView visualization server running (see paraview_visualization.py) and sends it requests.
+    The server is started on the first request and reused afterwards. Requests never block: their results
+    are delivered to the callback given when they were made. """
+    __instance: "VisualizationService" = None
+
+    frame_changed = QtCore.Signal(int, float)
+    running_changed = QtCore.Signal(bool)
+
+    def __init__(self):
+        """ Virtually private constructor. """
+        if VisualizationService.__instance is not None:
+            raise Exception("VisualizationService class is a singleton and should not be initialized twice")
+        # The main window is taken from FreeCADGui: freecad_tools and Case import the dialogs using this service
+        super().__init__(parent=FreeCADGui.getMainWindow())
+        VisualizationService.__instance = self
+        self.process: QtCore.QProcess = None
+        self.request_ids = itertools.count(1)
+        self.callbacks: dict = dict()  # {request_id: function(result, error)}
+        self.pending_output: bytes = b""
+
+    @staticmethod
+    def the() -> "VisualizationService":
+        """ Static access method. """
+        if VisualizationService.__instance is None:
+            VisualizationService()
+        return VisualizationService.__instance
+
+    def get_pvpython_path(self) -> str:
+        """ Returns the pvpython executable next to the configured ParaView, or the one on the PATH. """
+        from mod.dataobjects.case import Case  # pylint: disable=import-outside-toplevel
+        executable_name = "pvpython.exe" if platform == "win32" else "pvpython"
+        paraview_path = Case.the().executable_paths.paraview
+        if paraview_path and path.isfile("{}/{}".format(path.dirname(paraview_path), executable_name)):
+            return "{}/{}".format(path.dirname(paraview_path), executable_name)
+        return shutil.which(executable_name)
+
+    def is_running(self) -> bool:
+        """ Returns whether the visualization server is running. """
+        return self.process is not None and self.process.state() != QtCore.QProcess.NotRunning
+
+    def start(self) -> bool:
+        """ Starts the visualization server if it is not running. Returns whether it is running. """
+        if self.is_running():
+            return True
+        pvpython_path = self.get_pvpython_path()
+        if not pvpython_path:
+            error("pvpython was not found. Configure the ParaView executable path to use the visualization.")
+            return False
+
+        self.process = QtCore.QProcess(FreeCADGui.getMainWindow())
+        self.process.readyReadStandardOutput.connect(self.on_stdout_ready)
+        self.process.readyReadStandardError.connect(lambda: debug(str(self.process.readAllStandardError().data(), encoding="utf-8", errors="replace")))
+        self.process.finished.connect(self.on_process_finished)
+        self.pending_output = b""
+        self.process.start(pvpython_path, [VISUALIZATION_SERVER_SCRIPT])
+        if not self.process.waitForStarted():
+            error("The visualization server could not be started with {}".format(pvpython_path))
+            self.process = None
+            return False
+        log("Visualization server started with {}".format(pvpython_path))
+        self.running_changed.emit(True)
+        return True
+
+    def call(self, method: str, callback=None, **params) -> None:
+        """ Sends a request to the visualization server, starting it if needed.
+        callback, if given, is called with the result and the error of the request once it is served. """
+        if not self.start():
+            if callback:
+                callback(None, "The visualization server is not available")
+            return
+        request_id = next(self.request_ids)
+        if callback:
+            self.callbacks[request_id] = callback
+        self.process.write("{}\n".format(json.dumps({"id": request_id, "method": method, "params": params})).encode("utf-8"))
+
+    def on_stdout_ready(self) -> None:
+        """ Dispatches the responses and events written by the server. """
+        data = self.pending_output + self.process.readAllStandardOutput().data()
+        lines = data.split(b"\n")
+        self.pending_output = lines.pop()
+        for line in lines:
+            try:
+                message = json.loads(str(line, encoding="utf-8", errors="replace"))
+            except ValueError:
+                debug("Visualization server: {}".format(str(line, encoding="utf-8", errors="replace").rstrip()))
+                continue
+            if message.get("event", None) == "frame":
+                self.frame_changed.emit(message["frame"], message["time"])
+            callback = self.callbacks.pop(message.get("id", None), None) if "event" not in message else None
+            if callback:
+                callback(message.get("result", None), message.get("error", None))
+            elif message.get("error", None):
+                error("Visualization server: {}".format(message["error"]))
+
+    def on_process_finished(self, exit_code, _=None) -> None:
+        """ Forgets the requests pending when the server ends, as when its window is closed. """
+        for callback in self.callbacks.values():
+            callback(None, "The visualization server was closed")
+        self.callbacks.clear()
+        self.process.deleteLater()
+        self.process = None
+        log("Visualization server finished with exit code {}".format(exit_code))
+        self.running_changed.emit(False)
+
+    def stop(self) -> None:
+        """ Asks the visualization server to close. """
+        if self.is_running():
+            self.call("quit")
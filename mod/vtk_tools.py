@@ -0,0 +1,346 @@
+#!/usr/bin/env python3.7
+# -*- coding: utf-8 -*-
+
+""" VTK XML files related tools.
+
+Writes particle data read from the DualSPHysics part files as VTK XML
+unstructured grids (.vtu) with their arrays on a raw binary appended
+section, optionally compressed with zlib, and the ParaView collection
+(.pvd) that gives each file its simulation time. The series of files
+written by the DualSPHysics post-processing tools get a manifest too, so
+viewers open a single file, get the frames in part order with their times
+and only read the frame being shown.
+
+Particle series can also get decimated preview frames, with up to a
+given number of particles each, that viewers show while playing.
+
+"""
+
+import re
+import json
+import zlib
+import tempfile
+
+from os import path, replace, makedirs, cpu_count
+from shutil import copyfileobj
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from mod.bi4_tools import PartHead, PartFile, get_part_file_paths, PART_HEAD_FILE_NAME
+from mod.results_catalog_tools import get_results_catalog
+
+from mod.constants import PREVIEW_FILE_SUFFIX
+
+VTK_BLOCK_SIZE = 1 << 16  # Size in bytes of the blocks compressed independently
+VTK_VERTEX = 1
+VTK_XML_EXTENSIONS = ("vtu", "vtp", "vts", "vtr", "vti")  # Formats that can be listed on a .pvd collection
+
+VTK_DATA_ARRAY_REGEX = re.compile(r'<DataArray type="(\w+)" Name="([^"]*)" NumberOfComponents="(\d+)" format="appended" offset="(\d+)"/>')
+
+VTK_TYPES = {
+    np.dtype(np.int8): "Int8",
+    np.dtype(np.uint8): "UInt8",
+    np.dtype(np.int16): "Int16",
+    np.dtype(np.uint16): "UInt16",
+    np.dtype(np.int32): "Int32",
+    np.dtype(np.uint32): "UInt32",
+    np.dtype(np.int64): "Int64",
+    np.dtype(np.uint64): "UInt64",
+    np.dtype(np.float32): "Float32",
+    np.dtype(np.float64): "Float64"
+}
+
+PREVIEW_METHODS = ("stride", "voxel", "surface")
+PREVIEW_VOXEL_ITERATIONS = 8  # Voxel size refinements done to get close to the particle budget
+
+# Arrays that can be exported from a part: {option name: (array name on the file, function(PartFile) -> np.ndarray)}
+PART_ARRAYS = {
+    "idp": ("Idp", lambda part_file: part_file.get_idp()),
+    "vel": ("Vel", lambda part_file: part_file.get_vel()),
+    "rhop": ("Rhop", lambda part_file: part_file.get_rhop()),
+    "mk": ("Mk", lambda part_file: part_file.get_mk()),
+    "speed": ("Speed", lambda part_file: np.linalg.norm(part_file.get_vel(), axis=1).astype(np.float32))
+}
+
+
+def write_appended_array(stream, array: np.ndarray, compress: bool) -> None:
+    """ Writes the data of an array on an appended section, with a UInt64 header.
+    Compressed data is written in independent zlib blocks of VTK_BLOCK_SIZE bytes, as vtkZLibDataCompressor does. """
+    data = np.ascontiguousarray(array, dtype=array.dtype.newbyteorder("<")).reshape(-1).view(np.uint8)
+    if not compress:
+        stream.write(np.uint64(len(data)).tobytes())
+        for start in range(0, len(data), VTK_BLOCK_SIZE * 16):
+            stream.write(data[start:start + VTK_BLOCK_SIZE * 16].tobytes())
+        return
+
+    blocks = -(-len(data) // VTK_BLOCK_SIZE)
+    header_position = stream.tell()
+    header = np.zeros(3 + blocks, dtype="<u8")
+    header[0] = blocks
+    header[1] = VTK_BLOCK_SIZE
+    header[2] = len(data) % VTK_BLOCK_SIZE
+    stream.write(header.tobytes())
+    for block in range(blocks):
+        compressed = zlib.compress(data[block * VTK_BLOCK_SIZE:(block + 1) * VTK_BLOCK_SIZE].tobytes())
+        header[3 + block] = len(compressed)
+        stream.write(compressed)
+    end_position = stream.tell()
+    stream.seek(header_position)
+    stream.write(header.tobytes())
+    stream.seek(end_position)
+
+
+def get_data_array_tag(array: np.ndarray, name: str, offset: int) -> str:
+    """ Returns the DataArray tag describing an array of the appended section. """
+    components = array.shape[1] if array.ndim > 1 else 1
+    return '<DataArray type="{}"{} NumberOfComponents="{}" format="appended" offset="{}"/>'.format(
+        VTK_TYPES[np.dtype(array.dtype.type)], ' Name="{}"'.format(name) if name else "", components, offset)
+
+
+def write_vtu(file_path: str, points: np.ndarray, point_data: dict, compress: bool = True) -> None:
+    """ Writes points, as vertex cells, with their point data {name: (n,) or (n, 3) array} to a binary .vtu file.
+    The appended section is written first to a temporary file, as the offsets of the arrays on the XML header
+    depend on their compressed sizes. """
+    count = len(points)
+    cell_arrays = (("connectivity", np.arange(count, dtype=np.int64)),
+                   ("offsets", np.arange(1, count + 1, dtype=np.int64)),
+                   ("types", np.full(count, VTK_VERTEX, dtype=np.uint8)))
+    output_folder = path.dirname(file_path) or "."
+    with tempfile.TemporaryFile(dir=output_folder) as appended:
+        tags: dict = {"point_data": list(), "points": None, "cells": list()}
+        for name, array in point_data.items():
+            tags["point_data"].append(get_data_array_tag(array, name, appended.tell()))
+            write_appended_array(appended, array, compress)
+        tags["points"] = get_data_array_tag(points, "Points", appended.tell())
+        write_appended_array(appended, points, compress)
+        for name, array in cell_arrays:
+            tags["cells"].append(get_data_array_tag(array, name, appended.tell()))
+            write_appended_array(appended, array, compress)
+        appended.seek(0)
+
+        with open("{}.tmp".format(file_path), "wb") as f:
+            f.write('<?xml version="1.0"?>\n<VTKFile type="UnstructuredGrid" version="1.0" byte_order="LittleEndian" header_type="UInt64"{}>\n'.format(
+                ' compressor="vtkZLibDataCompressor"' if compress else "").encode("ascii"))
+            f.write('  <UnstructuredGrid>\n    <Piece NumberOfPoints="{0}" NumberOfCells="{0}">\n'.format(count).encode("ascii"))
+            f.write("      <PointData>\n{}      </PointData>\n".format("".join("        {}\n".format(tag) for tag in tags["point_data"])).encode("ascii"))
+            f.write("      <Points>\n        {}\n      </Points>\n".format(tags["points"]).encode("ascii"))
+            f.write("      <Cells>\n{}      </Cells>\n".format("".join("        {}\n".format(tag) for tag in tags["cells"])).encode("ascii"))
+            f.write('    </Piece>\n  </UnstructuredGrid>\n  <AppendedData encoding="raw">\n_'.encode("ascii"))
+            copyfileobj(appended, f)
+            f.write("\n  </AppendedData>\n</VTKFile>\n".encode("ascii"))
+    replace("{}.tmp".format(file_path), file_path)
+
+
+def read_vtu_array(file_path: str, name: str) -> np.ndarray:
+    """ Reads back an array of a .vtu file written by write_vtu, by its name ("Points" for the positions). """
+    with open(file_path, "rb") as f:
+        data = f.read()
+    appended_start = data.index(b'<AppendedData encoding="raw">\n_') + len(b'<AppendedData encoding="raw">\n_')
+    header = data[:appended_start].decode("ascii")
+    array_tag = next((tag for tag in VTK_DATA_ARRAY_REGEX.findall(header) if tag[1] == name), None)
+    if array_tag is None:
+        raise KeyError("There is no array {} on {}".format(name, file_path))
+    vtk_type, _, components, offset = array_tag
+    dtype = np.dtype(next(np_type for np_type, type_name in VTK_TYPES.items() if type_name == vtk_type)).newbyteorder("<")
+    position = appended_start + int(offset)
+    if "vtkZLibDataCompressor" not in header:
+        size = int(np.frombuffer(data, dtype="<u8", count=1, offset=position)[0])
+        raw = data[position + 8:position + 8 + size]
+    else:
+        blocks = int(np.frombuffer(data, dtype="<u8", count=1, offset=position)[0])
+        block_sizes = np.frombuffer(data, dtype="<u8", count=blocks, offset=position + 24)
+        position += 8 * (3 + blocks)
+        chunks = list()
+        for block_size in block_sizes.tolist():
+            chunks.append(zlib.decompress(data[position:position + block_size]))
+            position += block_size
+        raw = b"".join(chunks)
+    values = np.frombuffer(raw, dtype=dtype)
+    return values.reshape(-1, int(components)) if int(components) > 1 else values
+
+
+def write_pvd(file_path: str, datasets: list) -> None:
+    """ Writes a ParaView collection file for the given [(time, file name)] datasets. """
+    with open("{}.tmp".format(file_path), "w", encoding="utf-8") as f:
+        f.write('<?xml version="1.0"?>\n<VTKFile type="Collection" version="0.1" byte_order="LittleEndian">\n  <Collection>\n')
+        for time, file_name in datasets:
+            f.write('    <DataSet timestep="{}" group="" part="0" file="{}"/>\n'.format(repr(float(time)), file_name))
+        f.write("  </Collection>\n</VTKFile>\n")
+    replace("{}.tmp".format(file_path), file_path)
+
+
+def write_series(file_path: str, datasets: list) -> None:
+    """ Writes a ParaView JSON file series (.series) for the given [(time, file name)] datasets.
+    Unlike .pvd collections, these can list legacy .vtk files. """
+    with open("{}.tmp".format(file_path), "w", encoding="utf-8") as f:
+        json.dump({"file-series-version": "1.0", "files": [{"name": file_name, "time": float(time)} for time, file_name in datasets]}, f, indent=1)
+    replace("{}.tmp".format(file_path), file_path)
+
+
+def get_series_manifest_path(output_folder_path: str, file_name: str, extension: str) -> str:
+    """ Returns the path of the manifest listing the <file_name>_XXXX.<extension> series of an output folder. """
+    if extension in VTK_XML_EXTENSIONS:
+        return "{}/{}.pvd".format(path.normpath(output_folder_path), file_name)
+    return "{}/{}.{}.series".format(path.normpath(output_folder_path), file_name, extension)
+
+
+def write_series_manifest(out_folder_path: str, file_name: str, extension: str) -> str:
+    """ Writes the manifest of the <file_name>_XXXX.<extension> files written on the out folder for each part, sorted by
+    part number and with the times of their parts on the results catalog. If any of those times is not known the part
+    numbers are used as times instead, so the frames keep their order. Returns the path of the manifest, or None if
+    there are no files on the series. """
+    catalog = get_results_catalog(out_folder_path)
+    parts = catalog.get_output_parts(file_name, extension)
+    if not parts:
+        return None
+    times = [catalog.get_part(part)["time"] for part in parts]
+    if None in times:
+        times = parts
+    datasets = [(time, "{}_{:04d}.{}".format(file_name, part, extension)) for time, part in zip(times, parts)]
+    manifest_path = get_series_manifest_path(out_folder_path, file_name, extension)
+    if extension in VTK_XML_EXTENSIONS:
+        write_pvd(manifest_path, datasets)
+    else:
+        write_series(manifest_path, datasets)
+    return manifest_path
+
+
+def get_voxel_keys(points: np.ndarray, voxel_size: float) -> np.ndarray:
+    """ Returns the key of the voxel of the given size each point falls in. """
+    cells = np.floor((points - points.min(axis=0)) / voxel_size).astype(np.int64)
+    dimensions = cells.max(axis=0) + 2  # Room for the neighbours of the last cells
+    return (cells[:, 0] * dimensions[1] + cells[:, 1]) * dimensions[2] + cells[:, 2]
+
+
+def get_voxel_sample(points: np.ndarray, particles: int) -> np.ndarray:
+    """ Returns the indices of one point per voxel, with the voxel size refined until there are about the given number of them. """
+    extent = np.maximum(np.ptp(points, axis=0), np.finfo(np.float32).eps)
+    voxel_size = float(np.cbrt(np.prod(extent) / particles))
+    indices = np.arange(len(points))
+    for _ in range(PREVIEW_VOXEL_ITERATIONS):
+        _, indices = np.unique(get_voxel_keys(points, voxel_size), return_index=True)
+        if len(indices) <= particles:
+            break
+        voxel_size *= float(np.cbrt(len(indices) / particles))
+    if len(indices) > particles:
+        indices = indices[::-(-len(indices) // particles)]
+    return np.sort(indices)
+
+
+def get_surface_points(points: np.ndarray) -> np.ndarray:
+    """ Returns the indices of the points near the free surface: the ones on voxels with an empty voxel above.
+    Voxels are sized to hold about eight points each. """
+    voxel_size = 2 * float(np.cbrt(np.prod(np.maximum(np.ptp(points, axis=0), np.finfo(np.float32).eps)) / len(points)))
+    keys = get_voxel_keys(points, voxel_size)
+    return np.flatnonzero(~np.isin(keys + 1, keys))
+
+
+def get_preview_indices(points: np.ndarray, particles: int, method: str) -> np.ndarray:
+    """ Returns the indices of up to the given number of points to show on a preview, chosen with one of the PREVIEW_METHODS:
+    a uniform stride, one point per voxel (spatially uniform) or the points near the free surface (one per voxel if there are too many).
+    Returns None if all the points fit on the preview. """
+    if len(points) <= particles:
+        return None
+    if method == "stride":
+        return np.arange(0, len(points), -(-len(points) // particles))
+    if method == "voxel":
+        return get_voxel_sample(points, particles)
+    if method == "surface":
+        surface = get_surface_points(points)
+        return surface if len(surface) <= particles else surface[get_voxel_sample(points[surface], particles)]
+    raise ValueError("Unknown preview method {}. Valid methods are: {}".format(method, ", ".join(PREVIEW_METHODS)))
+
+
+def export_part_vtu(part_file: PartFile, file_path: str, arrays: list, mk: list = None, fields: dict = None, compress: bool = True,
+                    preview_path: str = None, preview_particles: int = 0, preview_method: str = "voxel", types: list = None) -> None:
+    """ Exports a part to a .vtu file with the given PART_ARRAYS, optionally only the particles of the given mk and
+    of the given types (i.e. fixed, moving, floating, fluid, as named on the part head regardless of the case).
+    fields are additional derived arrays {name: function(PartFile) -> np.ndarray}.
+    If preview_path is given a preview with up to preview_particles particles is written there too. If file_path is None
+    only the preview is written. """
+    getters = [PART_ARRAYS[array] for array in arrays] + list((fields or dict()).items())
+    mask = np.isin(part_file.get_mk(), mk) if mk else None
+    if types:
+        selected_types = [block_type for block_type in set(part_file.get_part_head().block_fields["type"]) if block_type.lower() in types]
+        type_mask = np.isin(part_file.get_type(), selected_types)
+        mask = type_mask if mask is None else mask & type_mask
+    points = part_file.get_pos() if mask is None else part_file.get_pos()[mask]
+    point_data: dict = dict()
+    for name, getter in getters:
+        values = getter(part_file)
+        point_data[name] = values if mask is None else values[mask]
+    if file_path:
+        write_vtu(file_path, points, point_data, compress)
+    if preview_path:
+        preview = get_preview_indices(points, preview_particles, preview_method)
+        if preview is not None:
+            points = points[preview]
+            point_data = {name: values[preview] for name, values in point_data.items()}
+        write_vtu(preview_path, points, point_data, compress)
+
+
+def export_vtu_series(out_folder_path: str, output_folder_path: str, file_name: str, arrays: list, mk: list = None, fields: dict = None,
+                      compress: bool = True, first_part: int = None, last_part: int = None, max_workers: int = 0, on_part=None,
+                      preview_particles: int = 0, preview_method: str = "voxel", full: bool = True, types: list = None, parts: list = None) -> list:
+    """ Exports the parts on the out folder to <file_name>_XXXX.vtu files and a <file_name>.pvd collection with their times.
+    Parts are exported in parallel by up to max_workers threads (0 uses all the cores). Each part is read from its memory
+    mapped file, so memory use depends on the size of the parts being exported at once, not on the length of the series.
+    If preview_particles is set, a <file_name>Preview series with up to that many particles per part is written too, decimated
+    with preview_method. full=False only writes the previews, for series whose full frames are written by other tool like PartVTK.
+    types limits the particles exported like on export_part_vtu, and parts the parts exported to the given part numbers.
+    on_part is called with the part number and its time once each part is written. Returns the [(part, time, file name)] written. """
+    makedirs(output_folder_path, exist_ok=True)
+    head_path = "{}/{}".format(out_folder_path, PART_HEAD_FILE_NAME)
+    part_head = PartHead(head_path) if path.isfile(head_path) else None
+    selected_parts = None if parts is None else set(parts)
+    part_files = [(part, file_path) for part, file_path in get_part_file_paths(out_folder_path)
+                  if (first_part is None or part >= first_part) and (last_part is None or part <= last_part)
+                  and (selected_parts is None or part in selected_parts)]
+
+    def export(part_entry):
+        """ Exports a single part, returning its time and output file name. """
+        part, file_path = part_entry
+        part_file = PartFile(file_path, part_head)
+        output_name = "{}_{:04d}.vtu".format(file_name, part)
+        preview_name = "{}{}_{:04d}.vtu".format(file_name, PREVIEW_FILE_SUFFIX, part)
+        export_part_vtu(part_file, "{}/{}".format(output_folder_path, output_name) if full else None, arrays, mk, fields, compress,
+                        "{}/{}".format(output_folder_path, preview_name) if preview_particles else None, preview_particles, preview_method, types)
+        if on_part:
+            on_part(part, part_file.get_time())
+        return part, part_file.get_time(), output_name if full else preview_name
+
+    with ThreadPoolExecutor(max_workers=max_workers or cpu_count()) as executor:
+        exported = list(executor.map(export, part_files))
+
+    if full:
+        write_pvd("{}/{}.pvd".format(output_folder_path, file_name), [(time or 0.0, output_name) for _, time, output_name in exported])
+    if preview_particles:
+        write_pvd("{}/{}{}.pvd".format(output_folder_path, file_name, PREVIEW_FILE_SUFFIX),
+                  [(time or 0.0, "{}{}_{:04d}.vtu".format(file_name, PREVIEW_FILE_SUFFIX, part)) for part, time, _ in exported])
+    return exported
+
+
+def check_part_vtu(part_file: PartFile, folder_path: str) -> int:
+    """ Checks the export of a part file: writes it to compressed and uncompressed .vtu files on the given folder and reads
+    them back, comparing the positions and arrays with the ones on the part. A preview with a quarter of the particles is
+    written too, that must have up to that many of the particles of the part. Returns the particles exported.
+    Raises ValueError if they do not match. """
+    expected = {"Points": part_file.get_pos(), "Idp": part_file.get_idp(), "Vel": part_file.get_vel(), "Rhop": part_file.get_rhop()}
+    for compress in (True, False):
+        file_path = "{}/Check_{}.vtu".format(folder_path, "compressed" if compress else "raw")
+        export_part_vtu(part_file, file_path, ["idp", "vel", "rhop"], compress=compress)
+        for name, values in expected.items():
+            if not np.array_equal(read_vtu_array(file_path, name), values):
+                raise ValueError("{} of {} does not match {} on {}".format(name, file_path, name, part_file.file_path))
+
+    preview_path = "{}/Check{}.vtu".format(folder_path, PREVIEW_FILE_SUFFIX)
+    preview_particles = max(1, len(part_file.get_idp()) // 4)
+    export_part_vtu(part_file, None, ["idp"], preview_path=preview_path, preview_particles=preview_particles)
+    preview_idp = read_vtu_array(preview_path, "Idp")
+    idp_order = np.argsort(part_file.get_idp())
+    positions = idp_order[np.clip(np.searchsorted(part_file.get_idp()[idp_order], preview_idp), 0, len(idp_order) - 1)]
+    if not 0 < len(preview_idp) <= preview_particles or not np.array_equal(part_file.get_idp()[positions], preview_idp) or not np.array_equal(
+            read_vtu_array(preview_path, "Points"), part_file.get_pos()[positions]):
+        raise ValueError("The preview of {} does not have up to {} of its particles".format(part_file.file_path, preview_particles))
+    return len(part_file.get_idp())
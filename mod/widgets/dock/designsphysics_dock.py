@@ -16,6 +16,7 @@ from mod.widgets.dock.dock_configuration_widget import DockConfigurationWidget
 from mod.widgets.dock.dock_dp_widget import DockDPWidget
 from mod.widgets.dock.dock_pre_processing_widget import DockPreProcessingWidget
 from mod.widgets.dock.dock_simulation_widget import DockSimulationWidget
+from mod.widgets.dock.dock_job_queue_widget import DockJobQueueWidget
 from mod.widgets.dock.dock_post_processing_widget import DockPostProcessingWidget
 from mod.widgets.dock.dock_object_list_table_widget import DockObjectListTableWidget
 
@@ -40,6 +41,7 @@ class DesignSPHysicsDock(QtGui.QDockWidget):
         self.dp_widget = DockDPWidget(parent=get_fc_main_window())
         self.pre_proccessing_widget = DockPreProcessingWidget(parent=get_fc_main_window())
         self.simulation_widget = DockSimulationWidget(parent=get_fc_main_window())
+        self.job_queue_widget = DockJobQueueWidget(parent=get_fc_main_window())
         self.post_processing_widget = DockPostProcessingWidget(parent=get_fc_main_window())
         self.object_list_widget = DockObjectListTableWidget(parent=get_fc_main_window())
 
@@ -53,6 +55,8 @@ class DesignSPHysicsDock(QtGui.QDockWidget):
         self.main_layout.addWidget(h_line_generator())
         self.main_layout.addWidget(self.simulation_widget)
         self.main_layout.addWidget(h_line_generator())
+        self.main_layout.addWidget(self.job_queue_widget)
+        self.main_layout.addWidget(h_line_generator())
         self.main_layout.addWidget(self.post_processing_widget)
         self.main_layout.addWidget(h_line_generator())
         self.main_layout.addWidget(self.object_list_widget)
@@ -72,6 +76,7 @@ class DesignSPHysicsDock(QtGui.QDockWidget):
         self.simulation_widget.simulation_complete.connect(self.adapt_to_simulation_done)
         self.simulation_widget.simulation_started.connect(self.adapt_to_simulation_start)
         self.simulation_widget.simulation_cancelled.connect(self.adapt_to_simulation_cancel)
+        self.job_queue_widget.show_job_requested.connect(self.simulation_widget.attach_run_dialog)
 
     def on_refresh(self):
         """ Reacts to a refresh signal emmited by the pre processing widget. """
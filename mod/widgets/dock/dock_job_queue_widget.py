@@ -0,0 +1,162 @@
+#!/usr/bin/env python3.7
+# -*- coding: utf-8 -*-
+"""DesignSPHysics Dock Job Queue Widget."""
+
+import time
+
+from PySide import QtGui, QtCore
+
+from mod.translation_tools import __
+from mod.gui_tools import get_job_state_label
+from mod.dialog_tools import warning_dialog, error_dialog
+from mod.job_scheduler import JobScheduler
+
+from mod.enums import JobState
+
+
+class DockJobQueueWidget(QtGui.QWidget):
+    """ Lists the queued, running and finished simulation jobs and allows to manage them. """
+
+    HEADERS = [__("Case"), __("Device"), __("Priority"), __("State"), __("Time")]
+
+    show_job_requested = QtCore.Signal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent=parent)
+
+        self.main_layout = QtGui.QVBoxLayout()
+        self.main_layout.setContentsMargins(0, 0, 0, 0)
+
+        self.title_label = QtGui.QLabel("<b>{}</b>".format(__("Job queue")))
+        self.title_label.setWordWrap(True)
+
+        self.jobs_table = QtGui.QTableWidget(0, len(self.HEADERS))
+        self.jobs_table.setHorizontalHeaderLabels(self.HEADERS)
+        self.jobs_table.verticalHeader().setVisible(False)
+        self.jobs_table.horizontalHeader().setResizeMode(0, QtGui.QHeaderView.Stretch)
+        self.jobs_table.setSelectionBehavior(QtGui.QAbstractItemView.SelectRows)
+        self.jobs_table.setSelectionMode(QtGui.QAbstractItemView.SingleSelection)
+        self.jobs_table.setEditTriggers(QtGui.QAbstractItemView.NoEditTriggers)
+
+        self.show_button = QtGui.QPushButton(__("Progress"))
+        self.show_button.setToolTip(__("Shows the simulation window for the selected job."))
+        self.pause_button = QtGui.QPushButton(__("Pause"))
+        self.pause_button.setToolTip(__("Pauses or resumes the selected job."))
+        self.cancel_button = QtGui.QPushButton(__("Cancel"))
+        self.cancel_button.setToolTip(__("Cancels the selected job."))
+        self.requeue_button = QtGui.QPushButton(__("Requeue"))
+        self.requeue_button.setToolTip(__("Queues again the selected interrupted, failed or cancelled job, resuming it or running it from the beginning."))
+        self.clear_button = QtGui.QPushButton(__("Clear"))
+        self.clear_button.setToolTip(__("Removes the jobs that are not queued or running from the list."))
+
+        self.button_layout = QtGui.QHBoxLayout()
+        self.button_layout.addWidget(self.show_button)
+        self.button_layout.addWidget(self.pause_button)
+        self.button_layout.addWidget(self.cancel_button)
+        self.button_layout.addWidget(self.requeue_button)
+        self.button_layout.addStretch(1)
+        self.button_layout.addWidget(self.clear_button)
+
+        self.main_layout.addWidget(self.title_label)
+        self.main_layout.addWidget(self.jobs_table)
+        self.main_layout.addLayout(self.button_layout)
+
+        self.setLayout(self.main_layout)
+
+        self.show_button.clicked.connect(self.on_show)
+        self.pause_button.clicked.connect(self.on_pause)
+        self.cancel_button.clicked.connect(self.on_cancel)
+        self.requeue_button.clicked.connect(self.on_requeue)
+        self.clear_button.clicked.connect(self.on_clear)
+        self.jobs_table.itemSelectionChanged.connect(self.update_buttons)
+        JobScheduler.the().job_changed.connect(self.refresh)
+
+        self.refresh()
+
+    def get_selected_job_id(self) -> str:
+        """ Returns the id of the job selected on the table, or None if there is no selection. """
+        selected_rows = self.jobs_table.selectionModel().selectedRows()
+        if not selected_rows:
+            return None
+        return self.jobs_table.item(selected_rows[0].row(), 0).data(QtCore.Qt.UserRole)
+
+    def refresh(self) -> None:
+        """ Fills the table with the current jobs, keeping the selection. """
+        selected_job_id = self.get_selected_job_id()
+        jobs = JobScheduler.the().get_jobs()
+        self.jobs_table.setRowCount(len(jobs))
+        for row, job in enumerate(jobs):
+            if job.started is None:
+                elapsed = "-"
+            else:
+                elapsed = time.strftime("%H:%M:%S", time.gmtime((job.finished or time.time()) - job.started))
+            case_item = QtGui.QTableWidgetItem(job.case_name)
+            case_item.setToolTip(job.case_path)
+            case_item.setData(QtCore.Qt.UserRole, job.id)
+            self.jobs_table.setItem(row, 0, case_item)
+            self.jobs_table.setItem(row, 1, QtGui.QTableWidgetItem(job.device))
+            self.jobs_table.setItem(row, 2, QtGui.QTableWidgetItem(str(job.priority)))
+            self.jobs_table.setItem(row, 3, QtGui.QTableWidgetItem(get_job_state_label(job.state)))
+            self.jobs_table.setItem(row, 4, QtGui.QTableWidgetItem(elapsed))
+            if job.id == selected_job_id:
+                self.jobs_table.selectRow(row)
+        self.update_buttons()
+
+    def update_buttons(self) -> None:
+        """ Enables the buttons that apply to the selected job. """
+        job = JobScheduler.the().get_job(self.get_selected_job_id()) if self.get_selected_job_id() else None
+        self.show_button.setEnabled(job is not None)
+        self.pause_button.setEnabled(job is not None and job.state in (JobState.QUEUED, JobState.RUNNING, JobState.PAUSED))
+        self.pause_button.setText(__("Resume") if job is not None and job.state == JobState.PAUSED else __("Pause"))
+        self.cancel_button.setEnabled(job is not None and job.is_active())
+        self.requeue_button.setEnabled(job is not None and job.state in (JobState.INTERRUPTED, JobState.FAILED, JobState.CANCELLED))
+
+    def on_show(self) -> None:
+        """ Requests a simulation window for the selected job. """
+        self.show_job_requested.emit(self.get_selected_job_id())
+
+    def on_pause(self) -> None:
+        """ Pauses or resumes the selected job. """
+        job = JobScheduler.the().get_job(self.get_selected_job_id())
+        if job.state == JobState.PAUSED:
+            JobScheduler.the().resume(job.id)
+        elif not JobScheduler.the().pause(job.id):
+            warning_dialog(__("Running simulations can only be paused on Linux."))
+
+    def on_cancel(self) -> None:
+        """ Cancels the selected job. """
+        JobScheduler.the().cancel(self.get_selected_job_id())
+
+    def on_requeue(self) -> None:
+        """ Asks whether to resume the selected job from its last part or to run it again from the beginning, and queues it again. """
+        job = JobScheduler.the().get_job(self.get_selected_job_id())
+        if JobScheduler.the().get_conflicting_job(job) is not None:
+            error_dialog(__("Another queued or running job is using the out folder of this case: {}").format(job.get_out_folder_path()))
+            return
+        last_part = JobScheduler.the().get_restart_part(job)
+
+        requeue_dialog = QtGui.QMessageBox()
+        requeue_dialog.setWindowTitle(__("Requeue job"))
+        requeue_dialog.setText(__("Job for case {} is {}.").format(job.case_name, get_job_state_label(job.state).lower()))
+        resume_button = None
+        if last_part is not None:
+            requeue_dialog.setInformativeText(__("It can resume from Part_{:04d}, keeping the existing outputs, or run again from the beginning, "
+                                                 "which deletes the parts on {}.").format(last_part, job.get_out_folder_path()))
+            resume_button = requeue_dialog.addButton(__("Resume from Part_{:04d}").format(last_part), QtGui.QMessageBox.AcceptRole)
+        else:
+            requeue_dialog.setInformativeText(__("There are no parts to resume from. Running it again deletes the outputs on {}.").format(job.get_out_folder_path()))
+        restart_button = requeue_dialog.addButton(__("Run from the beginning"), QtGui.QMessageBox.DestructiveRole)
+        requeue_dialog.addButton(QtGui.QMessageBox.Cancel)
+        requeue_dialog.exec_()
+
+        resume = resume_button is not None and requeue_dialog.clickedButton() == resume_button
+        if not resume and requeue_dialog.clickedButton() != restart_button:
+            return
+        if not JobScheduler.the().requeue(job.id, resume=resume):
+            error_dialog(__("The job could not be queued again."))
+
+    def on_clear(self) -> None:
+        """ Removes the jobs that are not active from the queue. """
+        for job in JobScheduler.the().get_jobs():
+            if not job.is_active():
+                JobScheduler.the().remove(job.id)
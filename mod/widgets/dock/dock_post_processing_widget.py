@@ -2,10 +2,18 @@
 # -*- coding: utf-8 -*-
 """DesignSPHysics Dock Post Processing Widget """
 
-from PySide import QtGui
+from os import path
+
+from PySide import QtGui, QtCore
 
 from mod.translation_tools import __
 from mod.freecad_tools import get_fc_main_window
+from mod.post_processing_scheduler import PostProcessingScheduler
+from mod.results_catalog_tools import get_results_catalog
+
+from mod.constants import POST_PROCESSING_FOLLOW_INTERVAL_MS
+
+from mod.dataobjects.case import Case
 
 from mod.widgets.postprocessing.partvtk_dialog import PartVTKDialog
 from mod.widgets.postprocessing.computeforces_dialog import ComputeForcesDialog
@@ -13,6 +21,7 @@ from mod.widgets.postprocessing.floatinginfo_dialog import FloatingInfoDialog
 from mod.widgets.postprocessing.measuretool_dialog import MeasureToolDialog
 from mod.widgets.postprocessing.isosurface_dialog import IsoSurfaceDialog
 from mod.widgets.postprocessing.flowtool_dialog import FlowToolDialog
+from mod.widgets.postprocessing.post_processing_queue_dialog import PostProcessingQueueDialog
 
 
 class DockPostProcessingWidget(QtGui.QWidget):
@@ -27,6 +36,8 @@ class DockPostProcessingWidget(QtGui.QWidget):
 
         self.title_label = QtGui.QLabel("<b>{}</b>".format(__("Post-processing")))
         self.title_label.setWordWrap(True)
+        self.results_label = QtGui.QLabel()
+        self.results_label.setWordWrap(True)
 
         self.first_row_layout = QtGui.QHBoxLayout()
         self.second_row_layout = QtGui.QHBoxLayout()
@@ -61,6 +72,7 @@ class DockPostProcessingWidget(QtGui.QWidget):
         self.add_processing_button.clicked.connect(self.clicked_add_processing_button)
 
         self.main_layout.addWidget(self.title_label)
+        self.main_layout.addWidget(self.results_label)
         # self.first_row_layout.addWidget(self.partvtk_button)
         # self.first_row_layout.addWidget(self.computeforces_button)
         self.first_row_layout.addWidget(self.isosurface_button)
@@ -90,15 +102,57 @@ class DockPostProcessingWidget(QtGui.QWidget):
 
         self.setLayout(self.main_layout)
 
-    def adapt_to_export_start(self) -> None:
-        """ Adapts the widget to post processing tool start. """
-        self.setWindowTitle("<b>{} ({})</b>".format(__("Post-processing"), __("Exporting")))
-        self.setEnabled(False)
-
-    def adapt_to_export_finished(self) -> None:
-        """ Adapts the widget to post processing tool finis. """
-        self.setEnabled(True)
-        self.setWindowTitle("<b>{}</b>".format(__("Post-processing")))
+        self.post_processing_queue_dialog: PostProcessingQueueDialog = None
+        PostProcessingScheduler.the().task_changed.connect(self.on_post_processing_task_changed)
+
+        # Changes on the out folder are coalesced, as a running simulation or tool writes on it continuously
+        self.out_folder_watcher = QtCore.QFileSystemWatcher(self)
+        self.results_timer = QtCore.QTimer(self)
+        self.results_timer.setSingleShot(True)
+        self.results_timer.setInterval(POST_PROCESSING_FOLLOW_INTERVAL_MS)
+        self.out_folder_watcher.directoryChanged.connect(lambda _: self.results_timer.start())
+        self.results_timer.timeout.connect(self.refresh_results_summary)
+
+    def changeEvent(self, event):
+        """ Refreshes the results shown when the widget gets enabled, as a simulation finished or a case was loaded. """
+        if event.type() == QtCore.QEvent.EnabledChange and self.isEnabled():
+            self.refresh_results_summary()
+        super().changeEvent(event)
+
+    def refresh_results_summary(self) -> None:
+        """ Updates the results catalog of the case and shows a summary of the parts available, watching the out folder for new ones. """
+        out_folder_path = Case.the().get_out_folder_path()
+        if self.out_folder_watcher.directories() and self.out_folder_watcher.directories() != [path.normpath(out_folder_path)]:
+            self.out_folder_watcher.removePaths(self.out_folder_watcher.directories())
+        if not path.isdir(out_folder_path):
+            self.results_label.setText(__("No results yet"))
+            return
+        if not self.out_folder_watcher.directories():
+            self.out_folder_watcher.addPath(path.normpath(out_folder_path))
+
+        catalog = get_results_catalog(out_folder_path)
+        parts = catalog.get_parts()
+        if not parts:
+            self.results_label.setText(__("No results yet"))
+            return
+        last_time = catalog.get_part(parts[-1])["time"]
+        self.results_label.setText(__("{} parts. Last: Part_{:04d} ({} s)").format(len(parts), parts[-1], "?" if last_time is None else "{:.4f}".format(last_time)))
+
+    def show_post_processing_queue(self) -> None:
+        """ Shows the progress of the post-processing tasks. """
+        if self.post_processing_queue_dialog is None:
+            self.post_processing_queue_dialog = PostProcessingQueueDialog(parent=get_fc_main_window())
+        self.post_processing_queue_dialog.show()
+        self.post_processing_queue_dialog.raise_()
+
+    def on_post_processing_task_changed(self) -> None:
+        """ Adapts the widget to the post processing tools running or not.
+        More tools can be queued while others are running, so the widget stays enabled. """
+        if PostProcessingScheduler.the().is_busy():
+            self.setWindowTitle("<b>{} ({})</b>".format(__("Post-processing"), __("Exporting")))
+        else:
+            self.setWindowTitle("<b>{}</b>".format(__("Post-processing")))
+            self.results_timer.start()
 
     def clicked_add_processing_button(self):
         if self.add_processing_button.isChecked():
@@ -4,7 +4,6 @@
 
 from os import path, walk
 import shutil
-from traceback import print_exc
 
 from PySide import QtCore, QtGui
 
@@ -12,8 +11,9 @@ from mod.translation_tools import __
 from mod.gui_tools import get_icon
 from mod.stdout_tools import error, debug
 from mod.dialog_tools import error_dialog, warning_dialog
-from mod.executable_tools import refocus_cwd, ensure_process_is_executable_or_fail
+from mod.executable_tools import refocus_cwd, ensure_process_is_executable_or_fail, get_executable_version, get_gencase_arguments
 from mod.file_tools import save_case, load_case
+from mod.gencase_cache_tools import get_gencase_cache_key, restore_gencase_result, store_gencase_result
 from mod.freecad_tools import document_count, prompt_close_all_documents, create_dsph_document, create_dsph_document_from_fcstd, add_fillbox_objects
 from mod.freecad_tools import get_fc_main_window, valid_document_environment, save_current_freecad_document, get_fc_object
 
@@ -23,10 +23,12 @@ from mod.enums import ObjectType, ObjectFillMode
 from mod.widgets.add_geo_dialog import AddGEODialog
 from mod.widgets.special_options_selector_dialog import SpecialOptionsSelectorDialog
 from mod.widgets.gencase_completed_dialog import GencaseCompletedDialog
+from mod.widgets.gencase_progress_dialog import GencaseProgressDialog
 from mod.widgets.mode_2d_config_dialog import Mode2DConfigDialog
 from mod.widgets.case_summary import CaseSummary
 
 from mod.dataobjects.case import Case
+from mod.dataobjects.application_settings import ApplicationSettings
 from mod.dataobjects.simulation_object import SimulationObject
 
 from mod.dialog_tools import ok_cancel_dialog, ok_discard_dialog
@@ -44,6 +46,8 @@ class DockPreProcessingWidget(QtGui.QWidget):
     def __init__(self, parent=None):
         super().__init__(parent=parent)
 
+        self.gencase_running: bool = False
+
         self.main_layout = QtGui.QVBoxLayout()
         self.main_layout.setContentsMargins(0, 0, 0, 0)
 
@@ -238,15 +242,15 @@ class DockPreProcessingWidget(QtGui.QWidget):
 
     def on_execute_gencase(self):
         """ Saves data into disk and uses GenCase to generate the case files."""
+        if self.gencase_running:
+            return
         self.on_save_case()
         if not Case.the().executable_paths.gencase:
             warning_dialog(__("GenCase executable is not set."))
             return
 
         gencase_full_path = path.abspath(Case.the().executable_paths.gencase)
-        arguments = ["{path}/{name}_Def".format(path=Case.the().path, name=Case.the().name),
-                     "{path}/{name}_out/{name}".format(path=Case.the().path, name=Case.the().name),
-                     "-save:+all"]
+        arguments = get_gencase_arguments(Case.the().path, Case.the().name)
         cmd_string = "{} {}".format(gencase_full_path, " ".join(arguments))
 
         # Decision dialog to remove data before running GenCase
@@ -254,40 +258,103 @@ class DockPreProcessingWidget(QtGui.QWidget):
         if execute_gencase == QtGui.QMessageBox.Cancel:
             return
         else:
+            # The previous case files are no longer valid: nothing can run with them until GenCase finishes
+            self.set_gencase_running(True)
+            Case.the().info.is_gencase_done = False
+            self.gencase_completed.emit(False)
             # Remove some folders before execute GenCase
             output_folder=str("{path}/{name}_out/".format(path=Case.the().path, name=Case.the().name))
             self.delete_sub_folder(output_folder,"Vtk")
             self.delete_root_folder(output_folder)
-            
+
+        # Reuse a previous GenCase result if nothing that affects it changed since then
+        cache_max_size_mb: int = ApplicationSettings.the().gencase_cache_max_size_mb
+        cache_key: str = None
+        if cache_max_size_mb > 0:
+            cache_key = get_gencase_cache_key(Case.the().path, Case.the().name, get_executable_version(gencase_full_path))
+            cached_result: dict = restore_gencase_result(cache_key, output_folder)
+            if cached_result:
+                self.set_gencase_running(False)
+                self.on_gencase_success(cached_result["particle_number"], cached_result["output"], cmd_string)
+                return
+
         refocus_cwd()
         process = QtCore.QProcess(get_fc_main_window())
         process.setWorkingDirectory(Case.the().path)
+        progress_dialog = GencaseProgressDialog(case_name=Case.the().name, parent=get_fc_main_window())
+        output_chunks: list = list()
+
+        def on_gencase_output():
+            """ Reads the output produced by GenCase since the last call and shows it in the progress dialog. """
+            data = process.readAllStandardOutput().data()
+            try:
+                chunk = str(data, encoding='utf-8')
+            except UnicodeDecodeError:
+                chunk = str(data, encoding='latin1')
+            output_chunks.append(chunk)
+            progress_dialog.append_output(chunk)
+
+        def on_cancel():
+            """ Stops the GenCase execution. """
+            debug("Cancelling GenCase execution")
+            progress_dialog.was_cancelled = True
+            process.kill()
+
+        def on_gencase_finished(exit_code, exit_status):
+            """ Handles the GenCase process termination. """
+            on_gencase_output()
+            progress_dialog.flush_output()
+            progress_dialog.hide()
+            output = "".join(output_chunks)
+            self.set_gencase_running(False)
+
+            if exit_status == QtCore.QProcess.CrashExit:
+                Case.the().info.is_gencase_done = False
+                if not progress_dialog.was_cancelled:
+                    error_dialog(__("GenCase stopped unexpectedly. View details for more info."), output)
+            elif exit_code:
+                Case.the().info.is_gencase_done = False
+                error_dialog(__("Error executing GenCase. Did you add objects to the case?. Another reason could be memory issues. View details for more info."), output)
+            elif progress_dialog.total_particles is not None:
+                if cache_key:
+                    store_gencase_result(cache_key, output_folder, progress_dialog.total_particles, output, cache_max_size_mb)
+                self.on_gencase_success(progress_dialog.total_particles, output, cmd_string)
+                return
+            else:
+                error("GenCase finished without reporting the total number of particles")
+                Case.the().info.is_gencase_done = False
+                Case.the().info.needs_to_run_gencase = True
+
+            # Refresh widget enable/disable status as GenCase finishes
+            self.gencase_completed.emit(Case.the().info.is_gencase_done)
+
+        process.readyReadStandardOutput.connect(on_gencase_output)
+        process.finished.connect(on_gencase_finished)
+        progress_dialog.cancelled.connect(on_cancel)
+
         ensure_process_is_executable_or_fail(gencase_full_path)
         process.start(gencase_full_path, arguments)
         debug("Executing -> {}".format(cmd_string))
-        process.waitForFinished()
 
-        try:
-            output = str(process.readAllStandardOutput().data(), encoding='utf-8')
-        except UnicodeDecodeError:
-            output = str(process.readAllStandardOutput().data(), encoding='latin1')
+        if not process.waitForStarted():
+            self.set_gencase_running(False)
+            error_dialog(__("Error on GenCase start. Check that the GenCase executable is correctly set."))
+            return
 
-        if process.exitCode():
-            Case.the().info.is_gencase_done = False
-            error_dialog(__("Error executing GenCase. Did you add objects to the case?. Another reason could be memory issues. View details for more info."), output)
-        else:
-            try:
-                total_particles_text = output[output.index("Total particles: "):output.index(" (bound=")]
-                total_particles = int(total_particles_text[total_particles_text.index(": ") + 2:])
-                Case.the().info.particle_number = total_particles
-                GencaseCompletedDialog(particle_count=total_particles, detail_text=output, cmd_string=cmd_string, parent=get_fc_main_window()).show()
-                Case.the().info.is_gencase_done = True
-                self.on_save_case()
-                Case.the().info.needs_to_run_gencase = False
-            except ValueError:
-                print_exc()
-                Case.the().info.is_gencase_done = False
-                Case.the().info.needs_to_run_gencase = True
+        progress_dialog.show()
+
+    def set_gencase_running(self, running: bool) -> None:
+        """ Disables running GenCase again while it is running. """
+        self.gencase_running = running
+        self.gencase_button.setEnabled(not running)
+
+    def on_gencase_success(self, total_particles: int, output: str, cmd_string: str):
+        """ Updates the case and the interface after GenCase generated the case files. """
+        Case.the().info.particle_number = total_particles
+        GencaseCompletedDialog(particle_count=total_particles, detail_text=output, cmd_string=cmd_string, parent=get_fc_main_window()).show()
+        Case.the().info.is_gencase_done = True
+        self.on_save_case()
+        Case.the().info.needs_to_run_gencase = False
 
         # Refresh widget enable/disable status as GenCase finishes
         self.gencase_completed.emit(Case.the().info.is_gencase_done)
@@ -408,6 +475,7 @@ class DockPreProcessingWidget(QtGui.QWidget):
         for x in [self.save_button, self.add_fillbox_button, self.add_geometry_button, self.import_xml_button,
                   self.case_summary_button, self.toggle_2d_mode_button, self.special_button, self.gencase_button, self.force_button]:
             x.setEnabled(True)
+        self.gencase_button.setEnabled(not self.gencase_running)
 
     def on_force_button(self):
         """ Triggers a signal implying that the force button was pressed. """
@@ -2,8 +2,7 @@
 # -*- coding: utf-8 -*-
 """DesignSPHysics Dock Execution Widget """
 
-import os
-from sys import platform
+from os import path, cpu_count
 
 from PySide import QtGui, QtCore
 
@@ -12,12 +11,17 @@ from mod.gui_tools import get_icon
 from mod.freecad_tools import get_fc_main_window
 from mod.stdout_tools import log
 from mod.dialog_tools import error_dialog, warning_dialog
-from mod.executable_tools import refocus_cwd, ensure_process_is_executable_or_fail
+from mod.executable_tools import refocus_cwd
 from mod.file_tools import save_case
+from mod.job_scheduler import JobScheduler
+
+from mod.enums import JobState
 
 from mod.dataobjects.case import Case
+from mod.dataobjects.simulation_job import SimulationJob
 
 from mod.widgets.run_dialog import RunDialog
+from mod.widgets.job_run_monitor import JobRunMonitor
 from mod.widgets.run_additional_parameters_dialog import RunAdditionalParametersDialog
 
 
@@ -31,6 +35,8 @@ class DockSimulationWidget(QtGui.QWidget):
     def __init__(self, parent=None):
         super().__init__(parent=parent)
 
+        self.simulation_jobs: dict = dict()  # {job_id: SimulationJob} Jobs of the case pending to finish
+
         # Execution section scaffolding
         self.main_layout = QtGui.QVBoxLayout()
         self.main_layout.setContentsMargins(0, 0, 0, 0)
@@ -57,153 +63,148 @@ class DockSimulationWidget(QtGui.QWidget):
         self.additional_parameters_button.setToolTip(__("Sets simulation additional parameters for execution."))
         self.additional_parameters_button.clicked.connect(self.on_additional_parameters)
 
+        # Job queue options
+        self.queue_button = QtGui.QPushButton(__("Add to queue"))
+        self.queue_button.setToolTip(__("Adds the case simulation to the job queue. It will start\n"
+                                        "when the simulations before it finish."))
+        self.queue_button.clicked.connect(self.on_ex_queue)
+
+        self.threads_input = QtGui.QSpinBox()
+        self.threads_input.setRange(0, cpu_count())
+        self.threads_input.setSpecialValueText(__("All threads"))
+        self.threads_input.setPrefix(__("Threads: "))
+        self.threads_input.setToolTip(__("Number of CPU threads the simulation can use. Only used on CPU simulations."))
+
+        self.priority_input = QtGui.QSpinBox()
+        self.priority_input.setRange(-100, 100)
+        self.priority_input.setPrefix(__("Priority: "))
+        self.priority_input.setToolTip(__("Queued simulations with higher priority start first."))
+
         self.button_layout = QtGui.QHBoxLayout()
         self.button_layout.addWidget(self.execute_button)
         self.button_layout.addWidget(self.device_selector)
         self.button_layout.addWidget(self.additional_parameters_button)
 
+        self.queue_layout = QtGui.QHBoxLayout()
+        self.queue_layout.addWidget(self.queue_button)
+        self.queue_layout.addWidget(self.threads_input)
+        self.queue_layout.addWidget(self.priority_input)
+
         self.main_layout.addWidget(self.title_label)
         self.main_layout.addLayout(self.button_layout)
+        self.main_layout.addLayout(self.queue_layout)
 
         self.setLayout(self.main_layout)
 
+        JobScheduler.the().job_finished.connect(self.on_job_finished)
+
     def on_ex_simulate(self):
         """ Defines what happens on simulation button press.
             It shows the run window and starts a background process with dualsphysics running. Updates the window with useful info."""
+        self.submit_simulation(run_now=True)
+
+    def on_ex_queue(self):
+        """ Defines what happens on add to queue button press. The simulation is added to the job queue to be run when possible. """
+        self.submit_simulation(run_now=False)
 
+    def submit_simulation(self, run_now: bool) -> None:
+        """ Submits a simulation of the current case to the job queue. If run_now is set,
+            it goes before any other queued job and a run window shows its progress. """
         refocus_cwd()
 
         if Case.the().info.needs_to_run_gencase:
             # Warning window about save_case
             warning_dialog("You should run GenCase again. Otherwise, the obtained results may not be as expected")
 
-        static_params_exe = [Case.the().get_out_xml_file_path(),
-                             Case.the().get_out_folder_path(),
-                             "-{device}".format(device=self.device_selector.currentText().lower()),
-                             "-svres"]
-
         additional_parameters = list()
         if Case.the().info.run_additional_parameters:
             additional_parameters = Case.the().info.run_additional_parameters.split(" ")
 
-        final_params_ex = static_params_exe + additional_parameters
-        cmd_string = "{} {}".format(Case.the().executable_paths.dsphysics, " ".join(final_params_ex))
-        # print("final_params_ex : ", cmd_string)
+        job = SimulationJob(case_name=Case.the().name, case_path=Case.the().path, executable=Case.the().executable_paths.dsphysics,
+                            device=self.device_selector.currentText(), additional_parameters=additional_parameters,
+                            threads=self.threads_input.value(), priority=self.priority_input.value())
+        job.particle_number = Case.the().info.particle_number
+        job.timemax = Case.the().execution_parameters.timemax
+
+        if run_now:
+            # The job goes before anything waiting on the queue
+            job.priority = max([j.priority for j in JobScheduler.the().get_jobs()] + [job.priority]) + 1
 
-        run_dialog = RunDialog(case_name=Case.the().name, processor=self.device_selector.currentText(), number_of_particles=Case.the().info.particle_number, cmd_string=cmd_string, parent=get_fc_main_window())
-        run_dialog.set_value(0)
-        run_dialog.run_update(0, 0, None)
+        simulation_was_done = Case.the().info.is_simulation_done
         Case.the().info.is_simulation_done = False
+        self.simulation_jobs[job.id] = job
+        if not JobScheduler.the().submit(job):
+            self.simulation_jobs.pop(job.id)
+            Case.the().info.is_simulation_done = simulation_was_done
+            error_dialog(__("Another queued or running job is already using the out folder of this case: {}\n"
+                            "Wait for it to finish or cancel it before running the simulation again.").format(job.get_out_folder_path()))
+            return
 
-        run_fs_watcher = QtCore.QFileSystemWatcher()
+        if not run_now:
+            return
 
         self.simulation_started.emit()
 
-        # Cancel button handler
-        def on_cancel():
-            log(__("Stopping simulation"))
-            if process:
-                process.kill()
-            run_dialog.hide_all()
-            Case.the().info.is_simulation_done = True
-            self.simulation_cancelled.emit()
-
-        run_dialog.cancelled.connect(on_cancel)
-
-        # Launch simulation and watch filesystem to monitor simulation
-        filelist = [f for f in os.listdir(Case.the().path + "/" + Case.the().name + "_out/") if f.startswith("Part")]
-        for f in filelist:
-            os.remove(Case.the().path + "/" + Case.the().name + "_out/" + f)
-
-        def on_dsph_sim_finished(exit_code):
-            """ Simulation finish handler. Defines what happens when the process finishes."""
-
-            # Reads output from the .out file and completes the progress bar
-            output = ""
-            with open(Case.the().path + "/" + Case.the().name + "_out/Run.out", "r", encoding="utf-8") as run_file:
+        if job.state == JobState.FAILED:
+            error_dialog("Error on simulation start. Check that the DualSPHysics executable is correctly set.")
+            return
+
+        self.attach_run_dialog(job.id)
+
+    def attach_run_dialog(self, job_id: str) -> None:
+        """ Shows a run dialog following the progress of a job from the job queue. """
+        monitor = JobRunMonitor(job_id, parent=self)
+        if job_id in self.simulation_jobs:
+            monitor.run_dialog.cancelled.connect(lambda: self.on_simulation_cancelled(job_id))
+            monitor.finished.connect(lambda exit_code, output: self.on_simulation_finished(job_id, exit_code, output, monitor.run_dialog))
+        monitor.show()
+
+    def on_simulation_cancelled(self, job_id: str) -> None:
+        """ Restores the case state after a simulation of the case is cancelled. """
+        log(__("Stopping simulation"))
+        self.simulation_jobs.pop(job_id, None)
+        Case.the().info.is_simulation_done = True
+        self.simulation_cancelled.emit()
+
+    def on_job_finished(self, job_id: str, exit_code: int) -> None:
+        """ Updates the case state when a job of the case ran from the queue finishes without a run dialog following it. """
+        if job_id not in self.simulation_jobs:
+            return
+        if JobScheduler.the().get_job(job_id).state == JobState.CANCELLED:
+            self.on_simulation_cancelled(job_id)
+            return
+        # Give the run dialogs following the job the chance to handle it
+        QtCore.QTimer.singleShot(0, lambda: self.on_simulation_finished(job_id, exit_code, None, None))
+
+    def on_simulation_finished(self, job_id: str, exit_code: int, output: str, run_dialog: RunDialog) -> None:
+        """ Simulation finish handler. Defines what happens when a simulation of the case finishes."""
+        job = self.simulation_jobs.pop(job_id, None)
+        if job is None or job.state == JobState.CANCELLED:
+            return
+        if Case.the().path != job.case_path or Case.the().name != job.case_name:
+            # Other case was opened since then
+            return
+
+        if output is None and path.isfile(job.get_run_log_path()):
+            with open(job.get_run_log_path(), "r", encoding="utf-8") as run_file:
                 output = "".join(run_file.readlines())
 
-            run_dialog.set_detail_text(str(output))
-            run_dialog.run_complete()
-
-            run_fs_watcher.removePath(Case.the().path + "/" + Case.the().name + "_out/")
-
-            if exit_code == 0:
-                # Simulation went correctly
-                Case.the().info.is_simulation_done = True
-                Case.the().info.needs_to_run_gencase = False
-                self.simulation_complete.emit(True)
-            else:
-                # In case of an error
-                Case.the().info.needs_to_run_gencase = True
-                if "exception" in str(output).lower():
-                    log("There was an error on the execution. Opening an error dialog for that.")
-                    run_dialog.hide()
-                    self.simulation_complete.emit(False)
-                    error_dialog(__("An error occurred during execution. Make sure that parameters exist and are properly defined. "
-                                    "You can also check your execution device (update the driver of your GPU). Read the details for more information."), str(output))
-            save_case(Case.the().path, Case.the())
-
-        # Launches a QProcess in background
-        process = QtCore.QProcess(get_fc_main_window())
-        process.finished.connect(on_dsph_sim_finished)
-
-        ensure_process_is_executable_or_fail(Case.the().executable_paths.dsphysics)
-        if platform in ("linux", "linux2"):
-            os.environ["LD_LIBRARY_PATH"] = os.path.dirname(Case.the().executable_paths.dsphysics)
-        process.start(Case.the().executable_paths.dsphysics, final_params_ex)
-
-        def on_fs_change():
-            """ Executed each time the filesystem changes. This updates the percentage of the simulation and its details."""
-            run_file_data = ""
-            with open(Case.the().path + "/" + Case.the().name + "_out/Run.out", "r", encoding="utf-8") as run_file:
-                run_file_data = run_file.readlines()
-
-            # Fill details window
-            run_dialog.set_detail_text("".join(run_file_data))
-
-            # Set percentage scale based on timemax
-            for l in run_file_data:
-                if Case.the().execution_parameters.timemax == -1:
-                    if "TimeMax=" in l:
-                        Case.the().execution_parameters.timemax = float(l.split("=")[1])
-
-            current_value: float = 0.0
-            totalpartsout: int = 0
-            last_estimated_time = None
-
-            # Update execution metrics
-            last_part_lines = list(filter(lambda x: "Part_" in x and "stored" not in x and "      " in x, run_file_data))
-            if last_part_lines:
-                current_value = (float(last_part_lines[-1].split(None)[1]) * float(100)) / float(Case.the().execution_parameters.timemax)
-            else:
-                current_value = None
-
-            # Update particles out
-            last_particles_out_lines = list(filter(lambda x: "total out: " in x, run_file_data))
-            if last_particles_out_lines:
-                totalpartsout = int(last_particles_out_lines[-1].split("(total out: ")[1].split(")")[0])
-
-            try:
-                last_estimated_time = str(" ".join(last_part_lines[-1].split(None)[-2:]))
-            except IndexError:
-                last_estimated_time = None
-
-            # Update run dialog
-            run_dialog.run_update(current_value, totalpartsout, last_estimated_time)
-
-        # Set filesystem watcher to the out directory.
-        run_fs_watcher.addPath(Case.the().path + "/" + Case.the().name + "_out/")
-        run_fs_watcher.directoryChanged.connect(on_fs_change)
-
-        # Handle error on simulation start
-        if process.state() == QtCore.QProcess.NotRunning:
-            # Probably error happened.
-            run_fs_watcher.removePath(Case.the().path + "/" + Case.the().name + "_out/")
-            process = None
-            error_dialog("Error on simulation start. Check that the DualSPHysics executable is correctly set.")
+        if exit_code == 0:
+            # Simulation went correctly
+            Case.the().info.is_simulation_done = True
+            Case.the().info.needs_to_run_gencase = False
+            self.simulation_complete.emit(True)
         else:
-            run_dialog.show()
+            # In case of an error
+            Case.the().info.needs_to_run_gencase = True
+            if "exception" in str(output).lower():
+                log("There was an error on the execution. Opening an error dialog for that.")
+                if run_dialog:
+                    run_dialog.hide()
+                self.simulation_complete.emit(False)
+                error_dialog(__("An error occurred during execution. Make sure that parameters exist and are properly defined. "
+                                "You can also check your execution device (update the driver of your GPU). Read the details for more information."), str(output))
+        save_case(Case.the().path, Case.the())
 
     def on_additional_parameters(self):
         """ Handles additional parameters button for execution """
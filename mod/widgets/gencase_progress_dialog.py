@@ -0,0 +1,122 @@
+#!/usr/bin/env python3.7
+# -*- coding: utf-8 -*-
+"""DesignSPHysics GenCase Progress Dialog."""
+
+import re
+
+from PySide import QtCore, QtGui
+
+from mod.translation_tools import __
+from mod.gui_tools import h_line_generator
+
+from mod.constants import GENCASE_TOTAL_PARTICLES_REGEX
+
+
+class GencaseProgressDialog(QtGui.QDialog):
+    """ Shows the live output of a running GenCase process, with the current stage and particle counts. """
+
+    STAGE_TEMPLATE = __("Current stage: {}")
+    PARTICLES_TEMPLATE = __("Total particles: {} (bound: {}, fluid: {})")
+
+    TOTAL_PARTICLES_REGEX = GENCASE_TOTAL_PARTICLES_REGEX
+    BOUND_PARTICLES_REGEX = re.compile(r"\(bound=(\d+)")
+    FLUID_PARTICLES_REGEX = re.compile(r"fluid=(\d+)")
+
+    MIN_WIDTH = 500
+
+    cancelled = QtCore.Signal()
+
+    def __init__(self, case_name: str, parent=None):
+        super().__init__(parent=parent)
+
+        self.total_particles: int = None
+        self.bound_particles: int = None
+        self.fluid_particles: int = None
+        self.pending_line: str = ""
+        self.was_cancelled: bool = False
+
+        self.setModal(False)
+        self.setWindowTitle(__("Running GenCase: {}").format(case_name))
+        self.main_layout = QtGui.QVBoxLayout()
+
+        self.stage_label = QtGui.QLabel(self.STAGE_TEMPLATE.format(__("Starting...")))
+        self.stage_label.setWordWrap(True)
+        self.particles_label = QtGui.QLabel(self.PARTICLES_TEMPLATE.format("-", "-", "-"))
+
+        # GenCase does not report a percentage, so the progress bar shows activity only
+        self.progbar = QtGui.QProgressBar()
+        self.progbar.setRange(0, 0)
+        self.progbar.setTextVisible(False)
+
+        self.button_layout = QtGui.QHBoxLayout()
+        self.details_button = QtGui.QPushButton(__("Details"))
+        self.cancel_button = QtGui.QPushButton(__("Cancel"))
+        self.button_layout.addStretch(1)
+        self.button_layout.addWidget(self.details_button)
+        self.button_layout.addWidget(self.cancel_button)
+
+        self.details_text = QtGui.QTextEdit()
+        self.details_text.setReadOnly(True)
+        self.details_text.hide()
+
+        self.main_layout.addWidget(self.stage_label)
+        self.main_layout.addWidget(self.particles_label)
+        self.main_layout.addWidget(self.progbar)
+        self.main_layout.addLayout(self.button_layout)
+        self.main_layout.addWidget(h_line_generator())
+        self.main_layout.addWidget(self.details_text)
+
+        self.cancel_button.clicked.connect(self.cancelled.emit)
+        self.details_button.clicked.connect(self.toggle_details)
+
+        self.setLayout(self.main_layout)
+        self.setMinimumWidth(self.MIN_WIDTH)
+        self.adjustSize()
+
+    def append_output(self, text: str) -> None:
+        """ Adds a new chunk of GenCase output, updating the stage and particle counts with the complete lines received. """
+        self.details_text.moveCursor(QtGui.QTextCursor.End)
+        self.details_text.insertPlainText(text)
+        self.details_text.moveCursor(QtGui.QTextCursor.End)
+
+        lines = (self.pending_line + text).split("\n")
+        self.pending_line = lines.pop()
+        for line in lines:
+            self.parse_line(line.strip())
+
+    def flush_output(self) -> None:
+        """ Parses the last line received, in case the output did not end with a line break. """
+        self.parse_line(self.pending_line.strip())
+        self.pending_line = ""
+
+    def parse_line(self, line: str) -> None:
+        """ Updates the dialog information from a single line of GenCase output. """
+        if not line:
+            return
+
+        total_match = self.TOTAL_PARTICLES_REGEX.search(line)
+        if total_match:
+            self.total_particles = int(total_match.group(1))
+            bound_match = self.BOUND_PARTICLES_REGEX.search(line)
+            fluid_match = self.FLUID_PARTICLES_REGEX.search(line)
+            self.bound_particles = int(bound_match.group(1)) if bound_match else None
+            self.fluid_particles = int(fluid_match.group(1)) if fluid_match else None
+            self.particles_label.setText(self.PARTICLES_TEMPLATE.format(
+                self.total_particles,
+                self.bound_particles if self.bound_particles is not None else "-",
+                self.fluid_particles if self.fluid_particles is not None else "-"
+            ))
+            return
+
+        if not line.startswith("*") and not line.startswith("-"):
+            self.stage_label.setText(self.STAGE_TEMPLATE.format(line))
+
+    def reject(self) -> None:
+        """ Closing the dialog cancels the GenCase execution. """
+        self.cancelled.emit()
+        super().reject()
+
+    def toggle_details(self) -> None:
+        """ Toggles the output details panel. """
+        self.details_text.setVisible(not self.details_text.isVisible())
+        self.adjustSize()
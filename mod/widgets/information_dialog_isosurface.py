@@ -2,20 +2,13 @@
 # -*- coding: utf-8 -*-
 """DesignSPHysics General Information Dialog"""
 
-from PySide import QtGui, QtCore
-import os
-# from threading
-import subprocess
+from PySide import QtGui
 
 from mod.gui_tools import h_line_generator
 from mod.translation_tools import __
 
 from mod.enums import InformationDetailsMode
 
-
-import ctypes
-
-# from mod.freecad_tools import get_fc_main_window
 from mod.widgets.simulation_visual_dialog import SimulationVisualDialog
 
 class InformationIsoSurfaceDialog(QtGui.QDialog):
@@ -94,39 +87,6 @@ class InformationIsoSurfaceDialog(QtGui.QDialog):
         """ Reacts to the ok button being pressed. """
         self.accept()
 
-    def simulation_visualization_def(self):
-        PARAVIEWPATH = "C:/Users/mgkang.DI-SOLUTION/Desktop/KANG/PYcharm_project/" \
-                       "git/FreeCad/DesignSPHysics-master/paraview_build/bin/pvpython.exe"
-        sorce_path = "C:/Users/mgkang.DI-SOLUTION/Desktop/KANG/PYcharm_project/git/FreeCad/DesignSPHysics-master/mod/" \
-                     "widgets/paraview_visualization.py"
-        # abs = os.path.abspath(PARAVIEWPATH)
-        #
-        # command = [abs, sorce_path]
-        #
-        # proc = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, stdin=subprocess.PIPE)
-        # print(proc.stdout)
-
-        # sorce_path = "../../mod/widgets/paraview_visualization.py"
-        # print("sorce_path : ", sorce_path)
-
-        command = "pvpython" + " " + sorce_path
-        print("Command : ", command)
-
-        proc = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, stdin=subprocess.PIPE)
-        out, err = proc.communicate(input=bytes(self.input_text, encoding='utf-8'))
-        print("out : ", out.decode('utf-8'))
-        print("err : ", err.decode('utf-8'))
-        #
-        # ctypes.windll.shell32.ShellExecuteA(0, 'open', PARAVIEWPATH, sorce_path, None, 1)
-        # os.system(PARAVIEWPATH + " " + sorce_path)
-
-
-        # p = QtCore.QProcess
-        # p.start(abs, ["paraview_visualization.py"])
-
-        # proc = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, stdin=subprocess.PIPE,
-        #                         shell=True)
-        # out, err = proc.communicate(input=bytes(self.input_text, encoding='utf-8'))
-        # print("out_output : ", out.decode('utf-8'))
-        # print("err_output : ", err.decode('euc-kr'))  # 왜 한글로 나오지
-
+    def simulation_visualization_def(self) -> None:
+        """ Shows the exported files on the visualization server. """
+        SimulationVisualDialog(self.input_text)
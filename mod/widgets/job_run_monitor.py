@@ -0,0 +1,131 @@
+#!/usr/bin/env python3.7
+# -*- coding: utf-8 -*-
+"""DesignSPHysics Job Run Monitor"""
+
+from os import path
+
+from PySide import QtCore
+
+from mod.freecad_tools import get_fc_main_window
+from mod.run_log_tools import RunLogFollower
+from mod.job_scheduler import JobScheduler
+
+from mod.constants import TELEMETRY_FILE_NAME
+from mod.enums import JobState
+
+from mod.widgets.run_dialog import RunDialog
+
+
+class JobRunMonitor(QtCore.QObject):
+    """ Follows the run log of a job from the job queue, showing its progress on a RunDialog. """
+
+    RUN_LOG_UPDATE_INTERVAL_MS = 1000
+
+    finished = QtCore.Signal(int, str)
+
+    def __init__(self, job_id: str, parent=None):
+        super().__init__(parent=parent)
+
+        self.job = JobScheduler.the().get_job(job_id)
+        self.run_log = RunLogFollower(self.job.get_run_log_path())
+        self.run_dialog = RunDialog(case_name=self.job.case_name, processor=self.job.device, number_of_particles=self.job.particle_number,
+                                    cmd_string=self.job.get_cmd_string(), parent=get_fc_main_window())
+        self.run_dialog.set_value(0)
+        self.run_dialog.run_update(0, 0, None)
+
+        self.run_fs_watcher = QtCore.QFileSystemWatcher()
+
+        # Coalesces the file changes into one update each RUN_LOG_UPDATE_INTERVAL_MS at most
+        self.run_update_timer = QtCore.QTimer(self)
+        self.run_update_timer.setSingleShot(True)
+        self.run_update_timer.setInterval(self.RUN_LOG_UPDATE_INTERVAL_MS)
+        self.run_update_timer.timeout.connect(self.on_run_log_update)
+
+        self.run_fs_watcher.fileChanged.connect(self.on_fs_change)
+        self.run_fs_watcher.directoryChanged.connect(self.on_fs_change)
+        self.run_dialog.cancelled.connect(self.on_cancel)
+
+        if self.job.is_active():
+            JobScheduler.the().job_finished.connect(self.on_job_finished)
+            self.watch()
+        else:
+            self.complete()
+
+    def watch(self) -> None:
+        """ Watches the out directory to know when the run log is created, and the run log itself. """
+        if path.isdir(self.job.get_out_folder_path()):
+            self.run_fs_watcher.addPath(self.job.get_out_folder_path())
+        if path.isfile(self.run_log.file_path):
+            self.run_fs_watcher.addPath(self.run_log.file_path)
+        self.on_run_log_update()
+
+    def unwatch(self) -> None:
+        """ Stops watching the filesystem for changes. """
+        self.run_update_timer.stop()
+        if self.run_fs_watcher.files():
+            self.run_fs_watcher.removePaths(self.run_fs_watcher.files())
+        if self.run_fs_watcher.directories():
+            self.run_fs_watcher.removePaths(self.run_fs_watcher.directories())
+
+    def get_timemax(self) -> float:
+        """ Returns the simulation time of the job, read from the run log if it was not known when submitting it. """
+        if self.job.timemax == -1 and self.run_log.timemax is not None:
+            return self.run_log.timemax
+        return self.job.timemax
+
+    def on_fs_change(self) -> None:
+        """ Executed each time the run log or the out directory changes. Schedules an update of the run dialog. """
+        if path.isfile(self.run_log.file_path) and self.run_log.file_path not in self.run_fs_watcher.files():
+            # The run log was created or replaced. Watch it for appended lines.
+            self.run_fs_watcher.addPath(self.run_log.file_path)
+        if not self.run_update_timer.isActive():
+            self.run_update_timer.start()
+
+    def on_run_log_update(self) -> None:
+        """ Reads the lines appended to the run log since the last update. This updates the percentage of the simulation and its details."""
+        new_lines = self.run_log.read_new_lines()
+        if not new_lines:
+            return
+
+        # Fill details window
+        self.run_dialog.append_detail_text("".join(new_lines))
+
+        # Update run dialog
+        self.run_dialog.run_update(self.run_log.get_percentage(self.get_timemax()), self.run_log.total_particles_out, self.run_log.last_estimated_time)
+        sim_seconds_per_hour, steps_per_second = self.run_log.telemetry.get_throughput()
+        self.run_dialog.telemetry_update(sim_seconds_per_hour, steps_per_second, self.run_log.telemetry.get_mean_dt(),
+                                         self.run_log.telemetry.get_remaining_seconds(self.get_timemax()))
+
+    def on_cancel(self) -> None:
+        """ Cancels the job, or just closes the dialog if the job is not active anymore. """
+        if self.job.is_active():
+            JobScheduler.the().cancel(self.job.id)
+        self.run_dialog.hide_all()
+
+    def on_job_finished(self, job_id: str, exit_code: int) -> None:
+        """ Completes the dialog when the monitored job finishes. """
+        if job_id != self.job.id:
+            return
+        JobScheduler.the().job_finished.disconnect(self.on_job_finished)
+        self.unwatch()
+        self.run_log.read_new_lines()
+        if self.run_log.telemetry.size:
+            self.run_log.telemetry.save(self.job.get_out_folder_path() + TELEMETRY_FILE_NAME)
+        output = self.complete()
+        self.finished.emit(exit_code, output)
+
+    def complete(self) -> str:
+        """ Shows the whole run log on the dialog, marking the run as complete. Returns the run log contents. """
+        output = ""
+        if path.isfile(self.run_log.file_path):
+            with open(self.run_log.file_path, "r", encoding="utf-8") as run_file:
+                output = "".join(run_file.readlines())
+
+        self.run_dialog.set_detail_text(str(output))
+        if self.job.state != JobState.CANCELLED:
+            self.run_dialog.run_complete()
+        return output
+
+    def show(self) -> None:
+        """ Shows the run dialog. """
+        self.run_dialog.show()
@@ -1,170 +1,203 @@
-import os, sys
-
-PARAVIEWPATH = "C:/Users/mgkang.DI-SOLUTION/Desktop/KANG/PYcharm_project/" \
-               "git/FreeCad/DesignSPHysics-master/paraview_build/bin"
-PARAVIEW_LIB = "C:/Users/mgkang.DI-SOLUTION/Desktop/KANG/PYcharm_project/" \
-               "git/FreeCad/DesignSPHysics-master/paraview_build/bin/Lib"
-PARAVIEW_SITE_PACKAGES = "C:/Users/mgkang.DI-SOLUTION/Desktop/KANG/PYcharm_project/" \
-                         "git/FreeCad/DesignSPHysics-master/paraview_build/bin/Lib/site-packages"
-sys.path.append(PARAVIEWPATH)
-sys.path.append(PARAVIEW_LIB)
-sys.path.append(PARAVIEW_SITE_PACKAGES)
-
-from paraview.simple import *
-import argparse
-import glob
-from PyQt5.QtWidgets import *
-from PyQt5.QtGui import *
-from vtkmodules.qt.QVTKRenderWindowInteractor import QVTKRenderWindowInteractor
-
-import time
-
-def add_vtk(input_text):
-    split_list = input_text.split("!!")
-    case_path = split_list[0]
-    case_name = split_list[1]
-    options_file_name = split_list[2]
-
-    # renderView = GetActiveViewOrCreate('RenderView')
-    renderView = CreateRenderView('RenderView')
-    renderView.ViewSize = [1280, 400]
-    renderView.OrientationAxesVisibility = 0
-
-    # renderWidget = QVTKRenderWindowInteractor(rw=renderView.GetRenderWindow(), iren=renderView.GetInteractor())
-    # renderWidget.Initialize()
-
-    # Create a list of names of all the files in the file series.
-    file_list = glob.glob(case_path + "/" + case_name + "_out/" + options_file_name + "_*.vtk")
-
-    reader = OpenDataFile(file_list)
-
-    layout = GetLayoutByName("LAYOUT")
-    AssignViewToLayout(view=renderView, layout=layout, hint=0)
-    SetActiveView(renderView)
-
-    view_display = Show(reader, renderView)
-    view_display.SetScalarBarVisibility(renderView, True)
-
-    # renderView.CameraParallelScale = 50
-    # renderView.CameraPosition =[-20, -5, -5]
-
-    # c = GetActiveCamera()
-    # c.Elevation(-45)
-    #
-    scene = GetAnimationScene()
-    scene.NumberOfFrames = len(file_list)
-    # # scene.GoToNext()
-    scene.PlayMode = 'Sequence'
-    #
-    # scene.Play()
-
-    scene.Play()
-    # Render()
-
-    # scene.GoToFirst()
-    # time.sleep(3)
-
-    # track = GetAnimationTrack('Origin', index=2, proxy=reader)
-    # Render()
-    try:
-        while True:
-            scene.Play()
-    except KeyboardInterrupt:
-        pass
-
-
-def read_args():
-    paraser = argparse.ArgumentParser()
-    paraser.add_argument("-i", "--input_text", type=str)
-    args = paraser.parse_args()
-    print("args : ", args)
-    input_text = args.input_text
-    return input_text
-
-
-def visualization_main():
-    # print("stdin.read : ", sys.stdin.readline())
-    # input_text = sys.stdin.readline()
-
-    # test
-    input_text = read_args()
-
-    # print("input_text !!!! : ", input_text)
-    add_vtk(input_text=input_text)
-
-class Paraview_dialog(QWidget):
-    def __init__(self):
-        super().__init__()
-        self.input_text = sys.stdin.readline()
-        # self.initUI(self.input_text)
-
-        self.main_view_layout = QVBoxLayout()
-        self.setWindowTitle("ParaView Visualization")
-        self.setGeometry(200, 200, 1080, 800)
-
-        self.button_layout = QHBoxLayout()
-
-        self.render_view = CreateRenderView()
-        self.render_widget = QVTKRenderWindowInteractor(rw=self.render_view.GetRenderWindow(),
-                                                        iren=self.render_view.GetInteractor())
-        self.render_widget.Initialize()
-
-        # self.render_layout.addWidget(self.render_widget)
-        self.go_to_first_button = QPushButton("Go To First")
-        self.play_button = QPushButton("Play")
-        self.button_layout.addWidget(self.go_to_first_button)
-        self.button_layout.addWidget(self.play_button)
+#!/usr/bin/env pvpython
+# -*- coding: utf-8 -*-
 
-        self.main_view_layout.addWidget(self.render_widget)
-        self.main_view_layout.addLayout(self.button_layout)
+""" DesignSPHysics visualization server.
 
-        self.go_to_first_button.clicked.connect(self.go_to_first_button_clicked)
-        self.play_button.clicked.connect(self.play_button_clicked)
+Long lived ParaView process showing simulation results on its own render
+window. It is started once by DesignSPHysics (see visualization_service)
+and driven through JSON requests, one per line, on its standard input:
 
-        split_list = self.input_text.split("!!")
-        case_path = split_list[0]
-        case_name = split_list[1]
-        options_file_name = split_list[2]
+    {"id": 1, "method": "load", "params": {"file_path": "/case_out/IsoFile.vtk.series"}}
 
-        self.file_list = glob.glob(case_path + "/" + case_name + "_out/" + options_file_name + "_*.vtk")
+Each request gets a JSON response line on the standard output with the same
+id and either a "result" or an "error". Playback is driven by a render
+window timer that only exists while playing, and the frames shown are
+notified as {"event": "frame", ...} lines. Series loaded with a decimated
+preview series show the preview while playing and the full frame when
+paused.
 
-        self.reader = OpenDataFile(self.file_list)
+Must be run with the pvpython bundled with ParaView:
 
-        # layout = GetLayoutByName("LAYOUT")
-        # AssignViewToLayout(view=renderView, layout=layout, hint=0)
-        # SetActiveView(renderView)
+    pvpython paraview_visualization.py
 
-        self.scene = GetAnimationScene()
-        self.scene.NumberOfFrames = len(self.file_list)
-        self.scene.PlayMode = 'Sequence'
+"""
 
-        c = GetActiveCamera()
-        c.Elevation(-45)
+import sys
+import json
+import queue
+import threading
 
-        view_display = Show(self.reader, self.render_view)
-        # self.render_widget.show()
+from paraview import simple
+from vtkmodules.vtkRenderingCore import vtkRenderWindowInteractor
+from vtkmodules.vtkInteractionStyle import vtkInteractorStyleTrackballCamera
 
-        # self.main_view_layout.addLayout(self.render_layout)
+REQUEST_POLL_MS = 30
+DEFAULT_FPS = 10
 
-        self.setLayout(self.main_view_layout)
-        # self.show()
-        # scene.Play()
 
-    def go_to_first_button_clicked(self):
-        self.scene.GoToFisrt()
+class VisualizationServer():
+    """ Serves the requests of DesignSPHysics on a single ParaView render view. """
 
-    def play_button_clicked(self):
-        self.scene.Play()
-
-
-if __name__ == '__main__':
-    # input_text = sys.stdin.readline()
-    app = QApplication(sys.argv)
-    main_dialog = Paraview_dialog()
-    main_dialog.show()
-    # main_dialog.scene.Play()
-    app.exec_()
-
-# app = QtWidgets.QApplication(sys.argv)
-# visualization_main()
-# sys.exit(app.exec())
+    def __init__(self):
+        self.requests: queue.Queue = queue.Queue()
+        self.stdout_lock = threading.Lock()
+        self.reader = None
+        self.display = None
+        self.preview_reader = None
+        self.preview_display = None
+        self.times: list = list()
+        self.frame: int = 0
+        self.play_timer: int = None
+
+        self.view = simple.CreateRenderView()
+        self.view.ViewSize = [1280, 800]
+        self.render_window = self.view.GetRenderWindow()
+        self.render_window.SetWindowName("DesignSPHysics - Simulation Visualization")
+        self.interactor = self.render_window.GetInteractor() or vtkRenderWindowInteractor()
+        self.interactor.SetRenderWindow(self.render_window)
+        self.interactor.SetInteractorStyle(vtkInteractorStyleTrackballCamera())
+        self.interactor.Initialize()
+        self.interactor.AddObserver("TimerEvent", self.on_timer)
+        self.request_timer: int = self.interactor.CreateRepeatingTimer(REQUEST_POLL_MS)
+
+        self.methods: dict = {
+            "load": self.load,
+            "color_by": self.color_by,
+            "set_frame": self.set_frame,
+            "step": self.step,
+            "play": self.play,
+            "pause": self.pause,
+            "reset_camera": self.reset_camera,
+            "quit": self.quit
+        }
+
+    def send(self, message: dict) -> None:
+        """ Writes a message to DesignSPHysics as a JSON line. """
+        with self.stdout_lock:
+            sys.stdout.write(json.dumps(message) + "\n")
+            sys.stdout.flush()
+
+    def read_requests(self) -> None:
+        """ Queues the requests read from the standard input. Runs on its own thread, as reading blocks. """
+        for line in sys.stdin:
+            if line.strip():
+                self.requests.put(line)
+        self.requests.put(json.dumps({"id": None, "method": "quit"}))
+
+    def on_timer(self, interactor, _) -> None:
+        """ Serves the queued requests or advances the playback, depending on the timer that fired. """
+        timer_id = interactor.GetTimerEventId()
+        if timer_id == self.request_timer:
+            while not self.requests.empty():
+                self.serve(self.requests.get())
+        elif timer_id == self.play_timer:
+            self.set_frame((self.frame + 1) % max(1, len(self.times)))
+
+    def serve(self, line: str) -> None:
+        """ Runs a request and responds with its result or error. """
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get("id", None)
+            result = self.methods[request["method"]](**request.get("params", dict()))
+            self.send({"id": request_id, "result": result})
+        except Exception as e:  # Any error must reach DesignSPHysics instead of ending the server
+            self.send({"id": request_id, "error": "{}: {}".format(type(e).__name__, e)})
+
+    def get_point_arrays(self) -> list:
+        """ Returns the names of the point arrays of the loaded series. """
+        return list(self.reader.PointData.keys()) if self.reader is not None else list()
+
+    def load(self, file_path: str, preview_file_path: str = None) -> dict:
+        """ Shows a series from its manifest (.pvd or .series), replacing the one shown before.
+        Only the file of the frame being shown is read. preview_file_path is the manifest of its preview series, if any. """
+        self.pause()
+        for reader in (self.reader, self.preview_reader):
+            if reader is not None:
+                simple.Delete(reader)
+        self.reader = simple.OpenDataFile(file_path)
+        self.preview_reader = simple.OpenDataFile(preview_file_path) if preview_file_path else None
+        timestep_values = self.reader.TimestepValues
+        self.times = list(timestep_values) if hasattr(timestep_values, "__len__") else [timestep_values]
+        simple.GetAnimationScene().UpdateAnimationUsingDataTimeSteps()
+        self.display = simple.Show(self.reader, self.view)
+        self.preview_display = simple.Show(self.preview_reader, self.view) if self.preview_reader is not None else None
+        self.show_preview(False)
+        self.view.ResetCamera()
+        self.set_frame(0)
+        return {"frames": len(self.times), "times": self.times, "arrays": self.get_point_arrays(), "preview": self.preview_reader is not None}
+
+    def show_preview(self, preview: bool) -> None:
+        """ Shows the preview series instead of the full one, or the other way around. Hidden series are not updated. """
+        if self.preview_display is None:
+            return
+        self.preview_display.Visibility = int(preview)
+        self.display.Visibility = int(not preview)
+
+    def color_by(self, array: str = None) -> dict:
+        """ Colors the series by a point array, or with a solid color if no array is given. """
+        for display in (self.display, self.preview_display):
+            if display is None:
+                continue
+            if array:
+                simple.ColorBy(display, ("POINTS", array))
+                display.RescaleTransferFunctionToDataRange(True, False)
+            else:
+                simple.ColorBy(display, None)
+        if array:
+            self.display.SetScalarBarVisibility(self.view, True)
+        simple.Render(self.view)
+        return {"array": array}
+
+    def set_frame(self, frame: int) -> dict:
+        """ Shows a frame of the series. """
+        self.frame = max(0, min(frame, len(self.times) - 1))
+        if self.times:
+            simple.GetAnimationScene().AnimationTime = self.times[self.frame]
+        simple.Render(self.view)
+        result = {"frame": self.frame, "time": self.times[self.frame] if self.times else 0.0}
+        self.send(dict(result, event="frame"))
+        return result
+
+    def step(self, delta: int = 1) -> dict:
+        """ Moves the given number of frames forward or backward. """
+        return self.set_frame(self.frame + delta)
+
+    def play(self, fps: float = DEFAULT_FPS) -> dict:
+        """ Starts playing the series in a loop. """
+        self.pause()
+        self.show_preview(True)
+        self.play_timer = self.interactor.CreateRepeatingTimer(max(1, int(1000 / fps)))
+        return {"playing": True}
+
+    def pause(self) -> dict:
+        """ Stops the playback, leaving the current frame shown at full resolution. """
+        if self.play_timer is not None:
+            self.interactor.DestroyTimer(self.play_timer)
+            self.play_timer = None
+            self.show_preview(False)
+            simple.Render(self.view)
+        return {"playing": False}
+
+    def reset_camera(self) -> dict:
+        """ Fits the camera to the series shown. """
+        self.view.ResetCamera()
+        simple.Render(self.view)
+        return dict()
+
+    def quit(self) -> dict:
+        """ Closes the render window, ending the server. """
+        self.pause()
+        self.interactor.TerminateApp()
+        return dict()
+
+    def run(self) -> None:
+        """ Serves requests until the window is closed or DesignSPHysics asks to quit. """
+        threading.Thread(target=self.read_requests, daemon=True).start()
+        simple.Render(self.view)
+        self.send({"event": "ready"})
+        self.interactor.Start()
+
+
+if __name__ == "__main__":
+    VisualizationServer().run()
@@ -9,6 +9,8 @@ from mod.post_processing_tools import computeforces_export
 
 from mod.dataobjects.case import Case
 
+from mod.widgets.postprocessing.part_selection_widget import PartSelectionWidget
+
 class ComputeForcesDialog(QtGui.QDialog):
     """ DesignSPHysics ComputeForces Config and Execution Dialog. """
 
@@ -20,6 +22,7 @@ class ComputeForcesDialog(QtGui.QDialog):
         self.setModal(False)
         self.setWindowTitle(__("ComputeForces Tool"))
         self.compforces_tool_layout = QtGui.QVBoxLayout()
+        self.part_selection = PartSelectionWidget(Case.the().get_out_folder_path())
 
         self.cfces_format_layout = QtGui.QHBoxLayout()
         self.cfces_onlyprocess_layout = QtGui.QHBoxLayout()
@@ -65,6 +68,7 @@ class ComputeForcesDialog(QtGui.QDialog):
         self.compforces_tool_layout.addLayout(self.cfces_filename_layout)
         self.compforces_tool_layout.addLayout(self.cfces_additional_parameters_layout)
         self.compforces_tool_layout.addStretch(1)
+        self.compforces_tool_layout.addWidget(self.part_selection)
         self.compforces_tool_layout.addLayout(self.cfces_buttons_layout)
 
         self.setLayout(self.compforces_tool_layout)
@@ -93,6 +97,7 @@ class ComputeForcesDialog(QtGui.QDialog):
         export_parameters["onlyprocess"] = self.cfces_onlyprocess_text.text()
         export_parameters["filename"] = self.cfces_filename_text.text()
         export_parameters["additional_parameters"] = self.cfces_additional_parameters_text.text()
+        export_parameters["part_window"] = self.part_selection.get_part_window()
         computeforces_export(export_parameters, Case.the(), self.post_processing_widget)
         self.accept()
 
@@ -9,6 +9,8 @@ from mod.post_processing_tools import floatinginfo_export
 
 from mod.dataobjects.case import Case
 
+from mod.widgets.postprocessing.part_selection_widget import PartSelectionWidget
+
 
 class FloatingInfoDialog(QtGui.QDialog):
     """ FloatingInfo configuration and execution Dialog. """
@@ -21,6 +23,7 @@ class FloatingInfoDialog(QtGui.QDialog):
         self.setModal(False)
         self.setWindowTitle(__("FloatingInfo Tool"))
         self.floatinfo_tool_layout = QtGui.QVBoxLayout()
+        self.part_selection = PartSelectionWidget(Case.the().get_out_folder_path())
 
         self.finfo_onlyprocess_layout = QtGui.QHBoxLayout()
         self.finfo_filename_layout = QtGui.QHBoxLayout()
@@ -53,6 +56,7 @@ class FloatingInfoDialog(QtGui.QDialog):
         self.floatinfo_tool_layout.addLayout(self.finfo_filename_layout)
         self.floatinfo_tool_layout.addLayout(self.finfo_additional_parameters_layout)
         self.floatinfo_tool_layout.addStretch(1)
+        self.floatinfo_tool_layout.addWidget(self.part_selection)
         self.floatinfo_tool_layout.addLayout(self.finfo_buttons_layout)
 
         self.setLayout(self.floatinfo_tool_layout)
@@ -73,6 +77,7 @@ class FloatingInfoDialog(QtGui.QDialog):
         export_parameters["filename"] = self.finfo_filename_text.text()
         export_parameters["additional_parameters"] = self.finfo_additional_parameters_text.text()
 
+        export_parameters["part_window"] = self.part_selection.get_part_window()
         floatinginfo_export(export_parameters, Case.the(), self.post_processing_widget)
 
         self.accept()
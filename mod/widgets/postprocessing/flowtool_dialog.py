@@ -5,11 +5,12 @@
 from PySide import QtGui
 
 from mod.translation_tools import __
-from mod.file_tools import create_flowtool_boxes
 from mod.post_processing_tools import flowtool_export
 from mod.freecad_tools import get_fc_main_window
 
 from mod.dataobjects.case import Case
+
+from mod.widgets.postprocessing.part_selection_widget import PartSelectionWidget
 from mod.dataobjects.flow_tool_box import FlowToolBox
 
 from mod.widgets.postprocessing.flowtool_box_edit_dialog import FlowToolBoxEditDialog
@@ -26,6 +27,7 @@ class FlowToolDialog(QtGui.QDialog):
         self.setModal(False)
         self.setWindowTitle(__("FlowTool Tool"))
         self.flowtool_tool_layout = QtGui.QVBoxLayout()
+        self.part_selection = PartSelectionWidget(Case.the().get_out_folder_path())
 
         self.fltool_boxlist_groupbox = QtGui.QGroupBox(__("List of boxes"))
         self.fltool_csvname_layout = QtGui.QHBoxLayout()
@@ -73,6 +75,7 @@ class FlowToolDialog(QtGui.QDialog):
         self.flowtool_tool_layout.addLayout(self.fltool_csvname_layout)
         self.flowtool_tool_layout.addLayout(self.fltool_vtkname_layout)
         self.flowtool_tool_layout.addLayout(self.fltool_parameters_layout)
+        self.flowtool_tool_layout.addWidget(self.part_selection)
         self.flowtool_tool_layout.addLayout(self.fltool_buttons_layout)
 
         self.setLayout(self.flowtool_tool_layout)
@@ -147,7 +150,6 @@ class FlowToolDialog(QtGui.QDialog):
         else:
             export_parameters["additional_parameters"] = ""
 
-        create_flowtool_boxes(Case.the().path + "/" + "fileboxes.txt", Case.the().flowtool_boxes)
-
+        export_parameters["part_window"] = self.part_selection.get_part_window()
         flowtool_export(export_parameters, Case.the(), self.post_processing_widget)
         self.accept()
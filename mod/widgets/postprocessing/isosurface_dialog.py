@@ -9,6 +9,8 @@ from mod.post_processing_tools import isosurface_export
 
 from mod.dataobjects.case import Case
 
+from mod.widgets.postprocessing.part_selection_widget import PartSelectionWidget
+
 
 class IsoSurfaceDialog(QtGui.QDialog):
     """ DesignSPHysics IsoSurface Config and Execution Dialog. """
@@ -21,6 +23,7 @@ class IsoSurfaceDialog(QtGui.QDialog):
         self.setModal(False)
         self.setWindowTitle(__("IsoSurface Tool"))
         self.isosurface_tool_layout = QtGui.QVBoxLayout()
+        self.part_selection = PartSelectionWidget(Case.the().get_out_folder_path())
 
         self.isosfc_filename_layout = QtGui.QHBoxLayout()
         self.isosfc_parameters_layout = QtGui.QHBoxLayout()
@@ -57,6 +60,7 @@ class IsoSurfaceDialog(QtGui.QDialog):
         self.isosurface_tool_layout.addLayout(self.isosfc_parameters_layout)
         self.isosurface_tool_layout.addWidget(self.isosfc_open_at_end)
         self.isosurface_tool_layout.addStretch(1)
+        self.isosurface_tool_layout.addWidget(self.part_selection)
         self.isosurface_tool_layout.addLayout(self.isosfc_buttons_layout)
 
         self.setLayout(self.isosurface_tool_layout)
@@ -90,5 +94,6 @@ class IsoSurfaceDialog(QtGui.QDialog):
 
         export_parameters["open_paraview"] = self.isosfc_open_at_end.isChecked()
 
+        export_parameters["part_window"] = self.part_selection.get_part_window()
         isosurface_export(export_parameters, Case.the(), self.post_procesing_widget)
         self.accept()
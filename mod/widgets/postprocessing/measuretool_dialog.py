@@ -6,11 +6,14 @@ from PySide import QtGui, QtCore
 
 from mod.translation_tools import __
 from mod.post_processing_tools import measuretool_export
+from mod.post_processing_follower import PostProcessingFollower
 from mod.freecad_tools import get_fc_main_window
 from mod.dialog_tools import error_dialog
 
 from mod.dataobjects.case import Case
 
+from mod.widgets.postprocessing.part_selection_widget import PartSelectionWidget
+
 from mod.widgets.postprocessing.measuretool_grid_dialog import MeasureToolGridDialog
 from mod.widgets.postprocessing.measuretool_points_dialog import MeasureToolPointsDialog
 
@@ -26,6 +29,7 @@ class MeasureToolDialog(QtGui.QDialog):
         self.setModal(False)
         self.setWindowTitle(__("MeasureTool"))
         self.measuretool_tool_layout = QtGui.QVBoxLayout()
+        self.part_selection = PartSelectionWidget(Case.the().get_out_folder_path())
 
         self.mtool_format_layout = QtGui.QHBoxLayout()
         self.mtool_types_groupbox = QtGui.QGroupBox(__("Variables to export"))
@@ -86,6 +90,12 @@ class MeasureToolDialog(QtGui.QDialog):
         self.mtool_parameters_layout.addWidget(self.mtool_parameters_label)
         self.mtool_parameters_layout.addWidget(self.mtool_parameters_text)
 
+        self.mtool_incremental = QtGui.QCheckBox(__("Only process new or modified parts"))
+        self.mtool_incremental.setCheckState(QtCore.Qt.Checked)
+        self.mtool_follow = QtGui.QCheckBox(__("Keep following the simulation"))
+        self.mtool_follow.setToolTip(__("Exports the new parts as the simulation writes them, until it is stopped on the post-processing window."))
+        self.on_mtool_export_format_change(self.outformat_combobox.currentIndex())
+
         self.mtool_export_button = QtGui.QPushButton(__("Export"))
         self.mtool_cancel_button = QtGui.QPushButton(__("Cancel"))
         self.mtool_buttons_layout.addWidget(self.mtool_export_button)
@@ -98,6 +108,9 @@ class MeasureToolDialog(QtGui.QDialog):
         self.measuretool_tool_layout.addLayout(self.mtool_set_points_layout)
         self.measuretool_tool_layout.addLayout(self.mtool_filename_layout)
         self.measuretool_tool_layout.addLayout(self.mtool_parameters_layout)
+        self.measuretool_tool_layout.addWidget(self.mtool_incremental)
+        self.measuretool_tool_layout.addWidget(self.mtool_follow)
+        self.measuretool_tool_layout.addWidget(self.part_selection)
         self.measuretool_tool_layout.addLayout(self.mtool_buttons_layout)
 
         self.setLayout(self.measuretool_tool_layout)
@@ -114,6 +127,8 @@ class MeasureToolDialog(QtGui.QDialog):
         self.mtool_types_chk_kcorr.stateChanged.connect(self.on_mtool_measure_single_change)
         self.mtool_set_points.clicked.connect(self.on_mtool_set_points)
         self.mtool_set_grid.clicked.connect(self.on_mtool_set_grid)
+        self.outformat_combobox.currentIndexChanged.connect(self.on_mtool_export_format_change)
+        self.mtool_follow.stateChanged.connect(self.on_mtool_follow_change)
         self.mtool_export_button.clicked.connect(self.on_mtool_export)
         self.mtool_cancel_button.clicked.connect(self.on_mtool_cancel)
         self.exec_()
@@ -170,9 +185,25 @@ class MeasureToolDialog(QtGui.QDialog):
                 __("Please define either list of points or a grid of points to continue. MeasureTool won't be executed.")
             )
         else:
+            export_parameters["incremental"] = self.mtool_incremental.isChecked() and self.mtool_incremental.isEnabled()
+            export_parameters["part_window"] = self.part_selection.get_part_window()
             measuretool_export(export_parameters, Case.the(), self.post_processing_widget)
+            if self.mtool_follow.isChecked() and self.mtool_follow.isEnabled():
+                PostProcessingFollower("MeasureTool", Case.the(), measuretool_export, export_parameters, self.post_processing_widget)
             self.accept()
 
+    def on_mtool_export_format_change(self, index):
+        """ Only CSV exports can process new or modified parts, as the results of all parts are written on the same files """
+        is_csv = self.outformat_combobox.itemText(index).lower() == "csv"
+        self.mtool_follow.setEnabled(is_csv)
+        self.mtool_incremental.setEnabled(is_csv and not self.mtool_follow.isChecked())
+
+    def on_mtool_follow_change(self, state):
+        """ Following the simulation always processes only the new or modified parts """
+        if state == QtCore.Qt.Checked:
+            self.mtool_incremental.setCheckState(QtCore.Qt.Checked)
+        self.mtool_incremental.setEnabled(state != QtCore.Qt.Checked)
+
     def on_mtool_measure_all_change(self, state):
         """ "All" checkbox behaviour"""
         if state == QtCore.Qt.Checked:
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3.7
+# -*- coding: utf-8 -*-
+"""DesignSPHysics Post-Processing Part Selection Widget."""
+
+import math
+
+import numpy as np
+
+from PySide import QtGui
+
+from mod.translation_tools import __
+from mod.results_catalog_tools import get_results_catalog
+
+
+class PartSelectionWidget(QtGui.QGroupBox):
+    """ Selects the parts a post-processing tool processes: a window of simulation time and a stride, resolved to part numbers with the results catalog. """
+
+    def __init__(self, out_folder_path, parent=None):
+        super().__init__(__("Parts to process"), parent=parent)
+
+        self.catalog = get_results_catalog(out_folder_path)
+        self.time_index = self.catalog.get_time_index()
+        known_times = self.time_index["time"][~np.isnan(self.time_index["time"])]
+        self.min_time: float = float(known_times.min()) if len(known_times) else 0.0
+        self.max_time: float = float(known_times.max()) if len(known_times) else 0.0
+        # Times are shown rounded on the inputs: the window is widened so the parts on its limits are not left out
+        self.tolerance: float = 0.5 * math.pow(10, -4)
+
+        self.main_layout = QtGui.QVBoxLayout()
+        self.time_layout = QtGui.QHBoxLayout()
+        self.stride_layout = QtGui.QHBoxLayout()
+
+        self.start_time_label = QtGui.QLabel(__("From (s)"))
+        self.start_time_input = QtGui.QDoubleSpinBox()
+        self.end_time_label = QtGui.QLabel(__("to (s)"))
+        self.end_time_input = QtGui.QDoubleSpinBox()
+        for time_input, value in ((self.start_time_input, self.min_time), (self.end_time_input, self.max_time)):
+            time_input.setDecimals(4)
+            time_input.setRange(self.min_time, self.max_time)
+            time_input.setSingleStep(max((self.max_time - self.min_time) / 100, 0.0001))
+            time_input.setValue(value)
+        self.time_layout.addWidget(self.start_time_label)
+        self.time_layout.addWidget(self.start_time_input)
+        self.time_layout.addWidget(self.end_time_label)
+        self.time_layout.addWidget(self.end_time_input)
+
+        self.stride_label = QtGui.QLabel(__("Every"))
+        self.stride_input = QtGui.QSpinBox()
+        self.stride_input.setRange(1, max(1, len(self.time_index)))
+        self.stride_suffix_label = QtGui.QLabel(__("part(s)"))
+        self.stride_layout.addWidget(self.stride_label)
+        self.stride_layout.addWidget(self.stride_input)
+        self.stride_layout.addWidget(self.stride_suffix_label)
+        self.stride_layout.addStretch(1)
+
+        self.summary_label = QtGui.QLabel()
+
+        self.main_layout.addLayout(self.time_layout)
+        self.main_layout.addLayout(self.stride_layout)
+        self.main_layout.addWidget(self.summary_label)
+        self.setLayout(self.main_layout)
+
+        self.start_time_input.valueChanged.connect(self.on_selection_changed)
+        self.end_time_input.valueChanged.connect(self.on_selection_changed)
+        self.stride_input.valueChanged.connect(self.on_selection_changed)
+        self.on_selection_changed()
+
+    def is_whole_simulation(self) -> bool:
+        """ Returns whether the selection covers all the parts. """
+        return (self.stride_input.value() == 1 and self.start_time_input.value() - self.tolerance <= self.min_time
+                and self.end_time_input.value() + self.tolerance >= self.max_time)
+
+    def get_part_window(self) -> dict:
+        """ Returns the selection as {"start_time", "end_time", "stride"}, or None to process all the parts.
+        The end time is None when the selection reaches the last part, so parts written later are included too. """
+        if self.is_whole_simulation():
+            return None
+        return {"start_time": self.start_time_input.value() - self.tolerance,
+                "end_time": None if self.end_time_input.value() + self.tolerance >= self.max_time else self.end_time_input.value() + self.tolerance,
+                "stride": self.stride_input.value()}
+
+    def get_selected_parts(self) -> list:
+        """ Returns the part numbers currently selected, or None to process all of them. """
+        part_window = self.get_part_window()
+        if part_window is None:
+            return None
+        return self.catalog.get_parts_in_window(part_window["start_time"], part_window["end_time"], part_window["stride"])
+
+    def on_selection_changed(self) -> None:
+        """ Shows the parts the current selection resolves to. """
+        if self.end_time_input.value() < self.start_time_input.value():
+            self.end_time_input.setValue(self.start_time_input.value())
+        parts = self.get_selected_parts()
+        if parts is None:
+            self.summary_label.setText(__("All the parts ({})").format(len(self.time_index)))
+        elif not parts:
+            self.summary_label.setText(__("No parts in the selected time window"))
+        else:
+            self.summary_label.setText(__("{} of {} parts, from Part_{:04d} to Part_{:04d}").format(len(parts), len(self.time_index), parts[0], parts[-1]))
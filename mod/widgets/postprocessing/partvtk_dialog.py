@@ -6,9 +6,14 @@ from PySide import QtGui, QtCore
 
 from mod.translation_tools import __
 from mod.post_processing_tools import partvtk_export
+from mod.post_processing_follower import PostProcessingFollower
+
+from mod.constants import PREVIEW_DEFAULT_PARTICLES
 
 from mod.dataobjects.case import Case
 
+from mod.widgets.postprocessing.part_selection_widget import PartSelectionWidget
+
 
 class PartVTKDialog(QtGui.QDialog):
     """ A PartVTK Configuration and Exeuction Dialog. """
@@ -23,11 +28,13 @@ class PartVTKDialog(QtGui.QDialog):
         self.setModal(False)
         self.setWindowTitle(__("PartVTK Tool"))
         self.partvtk_tool_layout = QtGui.QVBoxLayout()
+        self.part_selection = PartSelectionWidget(Case.the().get_out_folder_path())
 
         self.pvtk_format_layout = QtGui.QHBoxLayout()
         self.pvtk_types_groupbox = QtGui.QGroupBox(__("Types to export"))
         self.pvtk_filename_layout = QtGui.QHBoxLayout()
         self.pvtk_parameters_layout = QtGui.QHBoxLayout()
+        self.pvtk_preview_layout = QtGui.QHBoxLayout()
         self.pvtk_buttons_layout = QtGui.QHBoxLayout()
 
         self.outformat_label = QtGui.QLabel(__("Output format"))
@@ -67,9 +74,25 @@ class PartVTKDialog(QtGui.QDialog):
         self.pvtk_parameters_layout.addWidget(self.pvtk_parameters_label)
         self.pvtk_parameters_layout.addWidget(self.pvtk_parameters_text)
 
+        self.pvtk_preview_label = QtGui.QLabel(__("Preview particles"))
+        self.pvtk_preview_input = QtGui.QSpinBox()
+        self.pvtk_preview_input.setRange(0, 100000000)
+        self.pvtk_preview_input.setSingleStep(PREVIEW_DEFAULT_PARTICLES // 4)
+        self.pvtk_preview_input.setSpecialValueText(__("No previews"))
+        self.pvtk_preview_input.setToolTip(__("Also writes decimated frames with up to this number of particles, of the same types,\n"
+                                              "that the visualization shows while playing. Only for VTK exports."))
+        self.pvtk_preview_layout.addWidget(self.pvtk_preview_label)
+        self.pvtk_preview_layout.addStretch(1)
+        self.pvtk_preview_layout.addWidget(self.pvtk_preview_input)
+
         self.pvtk_open_at_end = QtGui.QCheckBox("Open with ParaView")
         self.pvtk_open_at_end.setEnabled(Case.the().executable_paths.paraview != "")
 
+        self.pvtk_incremental = QtGui.QCheckBox(__("Only process new or modified parts"))
+        self.pvtk_incremental.setCheckState(QtCore.Qt.Checked)
+        self.pvtk_follow = QtGui.QCheckBox(__("Keep following the simulation"))
+        self.pvtk_follow.setToolTip(__("Exports the new parts as the simulation writes them, until it is stopped on the post-processing window."))
+
         self.pvtk_export_button = QtGui.QPushButton(__("Export"))
         self.pvtk_cancel_button = QtGui.QPushButton(__("Cancel"))
         self.pvtk_buttons_layout.addWidget(self.pvtk_export_button)
@@ -80,7 +103,11 @@ class PartVTKDialog(QtGui.QDialog):
         self.partvtk_tool_layout.addStretch(1)
         self.partvtk_tool_layout.addLayout(self.pvtk_filename_layout)
         self.partvtk_tool_layout.addLayout(self.pvtk_parameters_layout)
+        self.partvtk_tool_layout.addLayout(self.pvtk_preview_layout)
         self.partvtk_tool_layout.addWidget(self.pvtk_open_at_end)
+        self.partvtk_tool_layout.addWidget(self.pvtk_incremental)
+        self.partvtk_tool_layout.addWidget(self.pvtk_follow)
+        self.partvtk_tool_layout.addWidget(self.part_selection)
         self.partvtk_tool_layout.addLayout(self.pvtk_buttons_layout)
 
         self.setLayout(self.partvtk_tool_layout)
@@ -92,6 +119,7 @@ class PartVTKDialog(QtGui.QDialog):
         self.pvtk_types_chk_fixed.stateChanged.connect(self.on_pvtk_type_fixed_change)
         self.pvtk_types_chk_moving.stateChanged.connect(self.on_pvtk_type_moving_change)
         self.pvtk_types_chk_floating.stateChanged.connect(self.on_pvtk_type_floating_change)
+        self.pvtk_follow.stateChanged.connect(self.on_pvtk_follow_change)
         self.pvtk_export_button.clicked.connect(self.on_pvtk_export)
         self.pvtk_cancel_button.clicked.connect(self.on_pvtk_cancel)
         self.exec_()
@@ -135,9 +163,21 @@ class PartVTKDialog(QtGui.QDialog):
         else:
             export_parameters["additional_parameters"] = ""
 
+        export_parameters["incremental"] = self.pvtk_incremental.isChecked()
+        export_parameters["preview_particles"] = self.pvtk_preview_input.value() if self.pvtk_preview_input.isEnabled() else 0
+
+        export_parameters["part_window"] = self.part_selection.get_part_window()
         partvtk_export(export_parameters, Case.the(), self.post_processing_widget)
+        if self.pvtk_follow.isChecked():
+            PostProcessingFollower("PartVTK", Case.the(), partvtk_export, export_parameters, self.post_processing_widget)
         self.accept()
 
+    def on_pvtk_follow_change(self, state):
+        """ Following the simulation always processes only the new or modified parts """
+        if state == QtCore.Qt.Checked:
+            self.pvtk_incremental.setCheckState(QtCore.Qt.Checked)
+        self.pvtk_incremental.setEnabled(state != QtCore.Qt.Checked)
+
     def on_pvtk_type_all_change(self, state):
         """ "All" type selection handler """
         if state == QtCore.Qt.Checked:
@@ -187,6 +227,7 @@ class PartVTKDialog(QtGui.QDialog):
 
     def on_pvtk_export_format_change(self, _):
         """ Export format combobox handler"""
+        self.pvtk_preview_input.setEnabled("vtk" in self.outformat_combobox.currentText().lower())
         if "vtk" in self.outformat_combobox.currentText().lower() and Case.the().executable_paths.paraview != "":
             self.pvtk_open_at_end.setEnabled(True)
         else:
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3.7
+# -*- coding: utf-8 -*-
+"""DesignSPHysics Post-Processing Queue Dialog."""
+
+from PySide import QtGui, QtCore
+
+from mod.translation_tools import __
+from mod.gui_tools import get_job_state_label
+from mod.post_processing_scheduler import PostProcessingScheduler
+
+from mod.enums import JobState
+
+
+class PostProcessingQueueDialog(QtGui.QDialog):
+    """ Shows the progress of all the post-processing tasks, queued, running or finished, on a single window. """
+
+    HEADERS = [__("Tool"), __("State"), __("Progress")]
+
+    def __init__(self, parent=None):
+        super().__init__(parent=parent)
+
+        self.setModal(False)
+        self.setMinimumSize(500, 250)
+        self.setWindowTitle(__("Post-processing"))
+        self.main_layout = QtGui.QVBoxLayout()
+
+        self.tasks_table = QtGui.QTableWidget(0, len(self.HEADERS))
+        self.tasks_table.setHorizontalHeaderLabels(self.HEADERS)
+        self.tasks_table.verticalHeader().setVisible(False)
+        self.tasks_table.horizontalHeader().setResizeMode(2, QtGui.QHeaderView.Stretch)
+        self.tasks_table.setSelectionBehavior(QtGui.QAbstractItemView.SelectRows)
+        self.tasks_table.setSelectionMode(QtGui.QAbstractItemView.SingleSelection)
+        self.tasks_table.setEditTriggers(QtGui.QAbstractItemView.NoEditTriggers)
+
+        self.total_progress_bar = QtGui.QProgressBar()
+        self.total_progress_bar.setRange(0, 100)
+
+        self.details_text = QtGui.QTextEdit()
+        self.details_text.setReadOnly(True)
+        self.details_text.hide()
+
+        self.details_button = QtGui.QPushButton(__("Details"))
+        self.details_button.setCheckable(True)
+        self.cancel_button = QtGui.QPushButton(__("Cancel"))
+        self.cancel_button.setToolTip(__("Cancels the selected task and the ones depending on it."))
+        self.cancel_all_button = QtGui.QPushButton(__("Cancel all"))
+        self.stop_following_button = QtGui.QPushButton(__("Stop following"))
+        self.stop_following_button.setToolTip(__("Stops exporting the new parts of the simulation as they are written."))
+        self.clear_button = QtGui.QPushButton(__("Clear"))
+        self.clear_button.setToolTip(__("Removes the finished tasks from the list."))
+        self.close_button = QtGui.QPushButton(__("Close"))
+
+        self.button_layout = QtGui.QHBoxLayout()
+        self.button_layout.addWidget(self.details_button)
+        self.button_layout.addWidget(self.cancel_button)
+        self.button_layout.addWidget(self.cancel_all_button)
+        self.button_layout.addWidget(self.stop_following_button)
+        self.button_layout.addStretch(1)
+        self.button_layout.addWidget(self.clear_button)
+        self.button_layout.addWidget(self.close_button)
+
+        self.main_layout.addWidget(self.tasks_table)
+        self.main_layout.addWidget(self.total_progress_bar)
+        self.main_layout.addWidget(self.details_text)
+        self.main_layout.addLayout(self.button_layout)
+        self.setLayout(self.main_layout)
+
+        self.details_button.toggled.connect(self.details_text.setVisible)
+        self.cancel_button.clicked.connect(self.on_cancel)
+        self.cancel_all_button.clicked.connect(PostProcessingScheduler.the().cancel_all)
+        self.stop_following_button.clicked.connect(PostProcessingScheduler.the().stop_followers)
+        self.clear_button.clicked.connect(PostProcessingScheduler.the().clear)
+        self.close_button.clicked.connect(self.hide)
+        self.tasks_table.itemSelectionChanged.connect(self.on_selection_changed)
+        PostProcessingScheduler.the().task_changed.connect(self.refresh)
+
+        self.refresh()
+
+    def get_selected_task_id(self) -> str:
+        """ Returns the id of the task selected on the table, or None if there is no selection. """
+        selected_rows = self.tasks_table.selectionModel().selectedRows()
+        if not selected_rows:
+            return None
+        return self.tasks_table.item(selected_rows[0].row(), 0).data(QtCore.Qt.UserRole)
+
+    def refresh(self) -> None:
+        """ Fills the table with the current tasks, keeping the selection. """
+        selected_task_id = self.get_selected_task_id()
+        tasks = PostProcessingScheduler.the().get_tasks()
+        self.tasks_table.setRowCount(len(tasks))
+        for row, task in enumerate(tasks):
+            tool_item = QtGui.QTableWidgetItem(task.tool)
+            tool_item.setToolTip(task.get_cmd_string())
+            tool_item.setData(QtCore.Qt.UserRole, task.id)
+            self.tasks_table.setItem(row, 0, tool_item)
+            self.tasks_table.setItem(row, 1, QtGui.QTableWidgetItem(get_job_state_label(task.state)))
+            progress_bar = self.tasks_table.cellWidget(row, 2) or QtGui.QProgressBar()
+            progress_bar.setRange(0, 100)
+            progress_bar.setValue(int(task.get_progress() * 100))
+            progress_bar.setFormat("{}/{}".format(task.get_processed_parts(), task.total_parts) if task.total_parts else "%p%")
+            self.tasks_table.setCellWidget(row, 2, progress_bar)
+            if task.id == selected_task_id:
+                self.tasks_table.selectRow(row)
+
+        active_tasks = [task for task in tasks if task.state != JobState.CANCELLED]
+        self.total_progress_bar.setValue(int(100 * sum(task.get_progress() for task in active_tasks) / len(active_tasks)) if active_tasks else 0)
+        if PostProcessingScheduler.the().is_busy():
+            self.setWindowTitle("{} ({})".format(__("Post-processing"), __("Exporting")))
+        elif PostProcessingScheduler.the().followers:
+            self.setWindowTitle("{} ({})".format(__("Post-processing"), __("Following")))
+        else:
+            self.setWindowTitle(__("Post-processing"))
+        self.stop_following_button.setEnabled(bool(PostProcessingScheduler.the().followers))
+        self.on_selection_changed()
+
+    def on_selection_changed(self) -> None:
+        """ Shows the output of the selected task and enables the buttons that apply to it. """
+        task = PostProcessingScheduler.the().get_task(self.get_selected_task_id()) if self.get_selected_task_id() else None
+        self.cancel_button.setEnabled(task is not None and task.is_active())
+        self.cancel_all_button.setEnabled(PostProcessingScheduler.the().is_busy())
+        details = "" if task is None else "{}\n\n{}".format(task.get_cmd_string(), task.output)
+        if self.details_text.toPlainText() != details:
+            self.details_text.setPlainText(details)
+            self.details_text.moveCursor(QtGui.QTextCursor.End)
+
+    def on_cancel(self) -> None:
+        """ Cancels the selected task. """
+        PostProcessingScheduler.the().cancel(self.get_selected_task_id())
@@ -16,6 +16,7 @@ class RunDialog(QtGui.QDialog):
     WINDOW_TITLE_TEMPLATE = __("DualSPHysics Simulation: {}%")
     PARTICLES_OUT_TEMPLATE = __("Total particles out: {}")
     ETA_TEMPLATE = __("Estimated time to complete simulation: {}")
+    THROUGHPUT_TEMPLATE = __("Throughput: {} simulated s/hour, {} steps/s (mean dt: {} s)")
 
     MIN_WIDTH = 600
 
@@ -41,6 +42,7 @@ class RunDialog(QtGui.QDialog):
         self.run_group_label_partsout = QtGui.QLabel(self.PARTICLES_OUT_TEMPLATE.format(0))
         self.run_group_label_eta = QtGui.QLabel(self)
         self.run_group_label_eta.setText(self.ETA_TEMPLATE.format("Calculating..."))
+        self.run_group_label_throughput = QtGui.QLabel(self.THROUGHPUT_TEMPLATE.format("-", "-", "-"))
         self.run_group_label_completed = QtGui.QLabel("<b>{}</b>".format(__("Simulation is complete.")))
         self.run_group_label_completed.setVisible(False)
 
@@ -49,6 +51,7 @@ class RunDialog(QtGui.QDialog):
         self.run_group_layout.addWidget(self.run_group_label_part)
         self.run_group_layout.addWidget(self.run_group_label_partsout)
         self.run_group_layout.addWidget(self.run_group_label_eta)
+        self.run_group_layout.addWidget(self.run_group_label_throughput)
         self.run_group_layout.addWidget(self.run_group_label_completed)
         self.run_group_layout.addStretch(1)
 
@@ -117,6 +120,18 @@ class RunDialog(QtGui.QDialog):
         if estimated_time:
             self.run_group_label_eta.setText(self.ETA_TEMPLATE.format(estimated_time))
 
+    def telemetry_update(self, sim_seconds_per_hour: float, steps_per_second: float, mean_dt: float, remaining_seconds: float) -> None:
+        """ Updates the run dialog with the throughput and time estimation computed from the run telemetry. """
+        self.run_group_label_throughput.setText(self.THROUGHPUT_TEMPLATE.format(
+            "{0:.3f}".format(sim_seconds_per_hour) if sim_seconds_per_hour is not None else "-",
+            "{0:.1f}".format(steps_per_second) if steps_per_second is not None else "-",
+            "{0:.3e}".format(mean_dt) if mean_dt is not None else "-"
+        ))
+        if remaining_seconds is not None:
+            hours, remainder = divmod(int(remaining_seconds), 3600)
+            minutes, seconds = divmod(remainder, 60)
+            self.run_group_label_eta.setText(self.ETA_TEMPLATE.format(__("{}h {:02d}m {:02d}s left").format(hours, minutes, seconds)))
+
     def run_complete(self) -> None:
         """ Modifies the dialog accordingly with a complete simulation. """
         self.setWindowTitle(__("DualSPHysics Simulation: Complete"))
@@ -152,3 +167,9 @@ class RunDialog(QtGui.QDialog):
         self.run_details_text.setPlainText(details.replace("\\n", "\n"))
         self.run_details_text.moveCursor(QtGui.QTextCursor.End)
 
+
+    def append_detail_text(self, details: str) -> None:
+        """ Appends text at the end of the details contents and scrolls it to the bottom. """
+        self.run_details_text.moveCursor(QtGui.QTextCursor.End)
+        self.run_details_text.insertPlainText(details.replace("\\n", "\n"))
+        self.run_details_text.moveCursor(QtGui.QTextCursor.End)
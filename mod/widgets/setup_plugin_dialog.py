@@ -204,7 +204,29 @@ class SetupPluginDialog(QtGui.QDialog):
         self.settings_layout.addRow(self.use_debug_check)
         self.settings_layout.addRow(self.use_verbose_check)
         self.settings_layout.addRow(self.use_version_check)
+        self.gencase_cache_size_input = QtGui.QSpinBox()
+        self.gencase_cache_size_input.setRange(0, 1024 * 1024)
+        self.gencase_cache_size_input.setSuffix(" MB")
+        self.gencase_cache_size_input.setValue(ApplicationSettings.the().gencase_cache_max_size_mb)
+        self.gencase_cache_size_input.setToolTip(__("Maximum disk space used to keep previous GenCase results. Set to 0 to disable the cache."))
         self.settings_layout.addRow(self.force_moordyn_support_check)
+        self.settings_layout.addRow(__("GenCase cache size"), self.gencase_cache_size_input)
+        self.max_running_jobs_input = QtGui.QSpinBox()
+        self.max_running_jobs_input.setRange(1, 256)
+        self.max_running_jobs_input.setValue(ApplicationSettings.the().job_queue_max_running_jobs)
+        self.max_running_jobs_input.setToolTip(__("Maximum number of simulations from the job queue running at the same time."))
+        self.max_gpu_jobs_input = QtGui.QSpinBox()
+        self.max_gpu_jobs_input.setRange(1, 64)
+        self.max_gpu_jobs_input.setValue(ApplicationSettings.the().job_queue_max_gpu_jobs)
+        self.max_gpu_jobs_input.setToolTip(__("Maximum number of GPU simulations from the job queue running at the same time."))
+        self.settings_layout.addRow(__("Simultaneous simulations"), self.max_running_jobs_input)
+        self.settings_layout.addRow(__("Simultaneous GPU simulations"), self.max_gpu_jobs_input)
+        self.post_processing_processes_input = QtGui.QSpinBox()
+        self.post_processing_processes_input.setRange(0, 256)
+        self.post_processing_processes_input.setSpecialValueText(__("All cores"))
+        self.post_processing_processes_input.setValue(ApplicationSettings.the().post_processing_max_processes)
+        self.post_processing_processes_input.setToolTip(__("Maximum number of post-processing tools running at the same time."))
+        self.settings_layout.addRow(__("Simultaneous post-processing tools"), self.post_processing_processes_input)
 
         # Tab widget composition
         self.tab_widget = QtGui.QTabWidget()
@@ -255,6 +277,10 @@ class SetupPluginDialog(QtGui.QDialog):
         ApplicationSettings.the().verbose_enabled = self.use_verbose_check.isChecked()
         ApplicationSettings.the().notify_on_outdated_version_enabled = self.use_version_check.isChecked()
         ApplicationSettings.the().force_moordyn_support_enabled = self.force_moordyn_support_check.isChecked()
+        ApplicationSettings.the().gencase_cache_max_size_mb = self.gencase_cache_size_input.value()
+        ApplicationSettings.the().job_queue_max_running_jobs = self.max_running_jobs_input.value()
+        ApplicationSettings.the().job_queue_max_gpu_jobs = self.max_gpu_jobs_input.value()
+        ApplicationSettings.the().post_processing_max_processes = self.post_processing_processes_input.value()
         ApplicationSettings.the().persist()
         self.accept()
 
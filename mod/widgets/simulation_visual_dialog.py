@@ -1,127 +1,148 @@
-from PySide import QtGui
+#!/usr/bin/env python3.7
+# -*- coding: utf-8 -*-
+"""DesignSPHysics Simulation Visualization Dialog"""
+
+from os import path
+
+from PySide import QtGui, QtCore
 
 from mod.translation_tools import __
-from mod.stdout_tools import log
-import os, sys
-import inspect
-
-# PARAVIEWPATH = "C:/Users/mgkang.DI-SOLUTION/Desktop/KANG/PYcharm_project/" \
-#                "git/FreeCad/DesignSPHysics-master/paraview_build/bin"
-# # PARAVIEWPATH = "../../paraview_build/bin"
-# PARAVIEW_LIB = "C:/Users/mgkang.DI-SOLUTION/Desktop/KANG/PYcharm_project/" \
-#                "git/FreeCad/DesignSPHysics-master/paraview_build/bin/Lib"
-# # PARAVIEW_LIB = "../../paraview_build/bin/Lib"
-# PARAVIEW_SITE_PACKAGES = "C:/Users/mgkang.DI-SOLUTION/Desktop/KANG/PYcharm_project/" \
-#                          "git/FreeCad/DesignSPHysics-master/paraview_build/bin/Lib/site-packages"
-# # PARAVIEW_SITE_PACKAGES = "../../paraview_build/bin/Lib/site-packages"
-#
-# sys.path.append(PARAVIEWPATH)
-# sys.path.append(PARAVIEW_LIB)
-# sys.path.append(PARAVIEW_SITE_PACKAGES)
-#
-# PYTHONPATH = PARAVIEWPATH +";" + PARAVIEW_LIB + ";" + PARAVIEW_SITE_PACKAGES
-
-# os.environ['PYTHONPATH'] = PYTHONPATH
-# from paraview.simple import *
-# from vtkmodules.qt.QVTKRenderWindowInteractor import QVTKRenderWindowInteractor
-#
-# print("pATH1 : ", inspect.getfile(paraview))
-# print("pATH2 : ", inspect.getfile(QVTKRenderWindowInteractor))
-# print("PYTHONPATH : ", os.environ['PYTHONPATH'])
-
-
-import glob
-import subprocess
+from mod.vtk_tools import write_series_manifest, get_series_manifest_path
+from mod.visualization_service import VisualizationService
+
+from mod.constants import PREVIEW_FILE_SUFFIX
+
 
 class SimulationVisualDialog(QtGui.QDialog):
-    MINIMUM_WIDTH = 600
-    MINIMUM_HEIGHT = 600
+    """ Controls the visualization server showing the files of a post-processing export. """
+
+    MINIMUM_WIDTH = 500
+    DEFAULT_FPS = 10
 
     def __init__(self, input_text: str):
         super().__init__()
-        self.input_text = input_text
-        self.simulation_visualization_window = QtGui.QDialog()
-        self.simulation_visualization_window.setWindowTitle(__("Simulation Visualization"))
-
-        self.simulation_visualization_button = QtGui.QPushButton(__("Import"))
-        self.cancel_button = QtGui.QPushButton(__("취소"))
+        case_path, case_name, file_name = input_text.split("!!")
+        self.manifest_path: str = write_series_manifest("{}/{}_out".format(case_path, case_name), file_name, "vtk")
+        self.preview_manifest_path: str = get_series_manifest_path("{}/{}_out".format(case_path, case_name), file_name + PREVIEW_FILE_SUFFIX, "vtu")
+        self.times: list = list()
+        self.playing: bool = False
+        self.service: VisualizationService = VisualizationService.the()
+
+        self.setWindowTitle(__("Simulation Visualization"))
+        self.setMinimumWidth(self.MINIMUM_WIDTH)
+        self.main_layout = QtGui.QVBoxLayout()
+
+        self.status_label = QtGui.QLabel(__("Loading..."))
+
+        self.color_layout = QtGui.QHBoxLayout()
+        self.color_label = QtGui.QLabel(__("Color by"))
+        self.color_combobox = QtGui.QComboBox()
+        self.color_layout.addWidget(self.color_label)
+        self.color_layout.addWidget(self.color_combobox)
+        self.color_layout.addStretch(1)
+
+        self.frame_slider = QtGui.QSlider(QtCore.Qt.Horizontal)
+        self.frame_slider.setTracking(False)
+        self.time_label = QtGui.QLabel()
+
+        self.playback_layout = QtGui.QHBoxLayout()
+        self.first_button = QtGui.QPushButton("|<")
+        self.previous_button = QtGui.QPushButton("<")
+        self.play_button = QtGui.QPushButton(__("Play"))
+        self.next_button = QtGui.QPushButton(">")
+        self.last_button = QtGui.QPushButton(">|")
+        self.fps_input = QtGui.QSpinBox()
+        self.fps_input.setRange(1, 60)
+        self.fps_input.setValue(self.DEFAULT_FPS)
+        self.fps_input.setSuffix(" fps")
+        for widget in (self.first_button, self.previous_button, self.play_button, self.next_button, self.last_button, self.fps_input):
+            self.playback_layout.addWidget(widget)
 
-        self.simulation_visualization_layout = QtGui.QVBoxLayout()
         self.button_layout = QtGui.QHBoxLayout()
+        self.reset_camera_button = QtGui.QPushButton(__("Reset camera"))
+        self.close_button = QtGui.QPushButton(__("Close"))
+        self.button_layout.addWidget(self.reset_camera_button)
         self.button_layout.addStretch(1)
-        self.button_layout.addWidget(self.cancel_button)
-        self.button_layout.addWidget(self.simulation_visualization_button)
-
-        self.cancel_button.clicked.connect(self.cancel_button_pressed)
-        self.simulation_visualization_button.clicked.connect(self.sv_button_pressed)
-        # self.simulation_visualization_button.clicked.connect(self.sv_button_pressed)
-
-        self.simulation_visualization_window_layout = QtGui.QVBoxLayout()
-        self.simulation_visualization_window_layout.addLayout(self.simulation_visualization_layout)
-        self.simulation_visualization_window_layout.addLayout(self.button_layout)
-        self.setLayout(self.simulation_visualization_window_layout)
-
-        self.setMinimumWidth(self.MINIMUM_WIDTH)
-        self.setMinimumHeight(self.MINIMUM_HEIGHT)
-        self.resize(self.MINIMUM_WIDTH, self.MINIMUM_HEIGHT)
+        self.button_layout.addWidget(self.close_button)
+
+        self.main_layout.addWidget(self.status_label)
+        self.main_layout.addLayout(self.color_layout)
+        self.main_layout.addWidget(self.frame_slider)
+        self.main_layout.addWidget(self.time_label)
+        self.main_layout.addLayout(self.playback_layout)
+        self.main_layout.addLayout(self.button_layout)
+        self.setLayout(self.main_layout)
+
+        self.color_combobox.currentIndexChanged.connect(self.on_color_changed)
+        self.frame_slider.valueChanged.connect(lambda frame: self.service.call("set_frame", frame=frame))
+        self.first_button.clicked.connect(lambda: self.service.call("set_frame", frame=0))
+        self.previous_button.clicked.connect(lambda: self.service.call("step", delta=-1))
+        self.play_button.clicked.connect(self.on_play_button)
+        self.next_button.clicked.connect(lambda: self.service.call("step", delta=1))
+        self.last_button.clicked.connect(lambda: self.service.call("set_frame", frame=len(self.times) - 1))
+        self.reset_camera_button.clicked.connect(lambda: self.service.call("reset_camera"))
+        self.close_button.clicked.connect(self.on_close_button)
+        self.service.frame_changed.connect(self.on_frame_changed)
+
+        self.set_controls_enabled(False)
+        if self.manifest_path:
+            self.service.call("load", self.on_series_loaded, file_path=self.manifest_path,
+                              preview_file_path=self.preview_manifest_path if path.isfile(self.preview_manifest_path) else None)
+        else:
+            self.status_label.setText(__("No files were found to visualize"))
 
         self.exec_()
 
-    def cancel_button_pressed(self):
-        self.reject()
-
-    def sv_button_pressed(self):
-        print("Test")
-        # 대실패
-        # import paraview
-        # from vtkmodules.qt.QVTKRenderWindowInteractor import QVTKRenderWindowInteractor
-        # print("pATH1 : ", inspect.getfile(paraview))
-        # print("pATH2 : ", inspect.getfile(QVTKRenderWindowInteractor))
-        #
-        # split_list = self.input_text.split("!!")
-        # case_path = split_list[0]
-        # case_name = split_list[1]
-        # options_file_name = split_list[2]
-        # renderview = simple.GetActiveViewOrCreate('RenderView')
-        # renderWidget = QVTKRenderWindowInteractor(rw=renderview.GetRenderWindow(), iren=renderview.GetInteractor())
-        #
-        # renderWidget.Initialize()
-        #
-        # file_list = glob.glob(case_path +"/" + case_name + "_out/" + options_file_name + "_*.vtk")
-        # reader = simple.OpenDataFile(file_list)
-        # view_display = Show(reader, renderview)
-        # renderWidget.show()
-
-
-        # 빌드된 paraview 폴더를 designsphysics 폴더로 옮겼을때
-        # 시스템 변수에 파라뷰 설치 위치 추가 후 사용
-
-        # os.system("pvpython " + "../../mod/widgets/paraview_visualization.py -i " + self.input_text)
-
-        # input_args = str(self.input_text)
-        sorce_path = "../../mod/widgets/paraview_visualization.py"
-        print("sorce_path : ", sorce_path)
-        command = "pvpython" + " " + sorce_path
-        print("Command : ", command)
-
-        proc = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, stdin=subprocess.PIPE, shell=True)
-        out, err = proc.communicate(input=bytes(self.input_text, encoding='utf-8'))
-        # while True:
-        #
-        #     if out == '' and proc.poll() is not None:
-        #         break
-        #     if out:
-        #         print("out_output : ", out.decode('utf-8'))
-        #         print("err_output : ", err.decode('euc-kr'))  # 왜 한글로 나오지
-
-        print("out_output : ", out.decode('utf-8'))
-        print("err_output : ", err.decode('euc-kr'))  # 왜 한글로 나오지
-
-        # proc.wait()
-        # process = subprocess.Popen(command, shell=True, stdout=subprocess.PIPE, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
-        # while True:
-        #     output = process.stdout.readline()
-        #     if output == '' and process.poll() is not None:
-        #         break
-        #     if output:
-        #         print(output.strip())
+    def set_controls_enabled(self, enabled: bool) -> None:
+        """ Enables or disables the controls that need a series loaded on the server. """
+        for widget in (self.color_combobox, self.frame_slider, self.first_button, self.previous_button, self.play_button,
+                       self.next_button, self.last_button, self.fps_input, self.reset_camera_button):
+            widget.setEnabled(enabled)
+
+    def on_series_loaded(self, result: dict, error: str) -> None:
+        """ Fills the controls with the frames and arrays of the series loaded on the server. """
+        if error:
+            self.status_label.setText(__("The files could not be visualized: {}").format(error))
+            return
+        self.times = result["times"]
+        self.status_label.setText(__("Showing {} frames").format(result["frames"]) + (__(", with previews while playing") if result["preview"] else ""))
+        self.color_combobox.blockSignals(True)
+        self.color_combobox.clear()
+        self.color_combobox.addItem(__("Solid color"), None)
+        for array in result["arrays"]:
+            self.color_combobox.addItem(array, array)
+        self.color_combobox.blockSignals(False)
+        self.frame_slider.setRange(0, max(0, result["frames"] - 1))
+        self.set_controls_enabled(True)
+
+    def on_frame_changed(self, frame: int, time: float) -> None:
+        """ Follows the frame shown by the server, whether it was requested here or advanced by the playback. """
+        self.frame_slider.blockSignals(True)
+        self.frame_slider.setValue(frame)
+        self.frame_slider.blockSignals(False)
+        self.time_label.setText(__("Frame {} of {} - Time: {:.4f} s").format(frame + 1, len(self.times), time))
+
+    def on_color_changed(self, index: int) -> None:
+        """ Colors the series by the array selected. """
+        self.service.call("color_by", array=self.color_combobox.itemData(index))
+
+    def on_play_button(self) -> None:
+        """ Starts or pauses the playback on the server. """
+        self.playing = not self.playing
+        if self.playing:
+            self.service.call("play", fps=self.fps_input.value())
+        else:
+            self.service.call("pause")
+        self.play_button.setText(__("Pause") if self.playing else __("Play"))
+        self.fps_input.setEnabled(not self.playing)
+
+    def on_close_button(self) -> None:
+        """ Pauses the playback and closes the dialog, leaving the visualization open. """
+        if self.playing:
+            self.service.call("pause")
+        self.accept()
+
+    def done(self, result) -> None:
+        """ Stops following the server before the dialog is closed. """
+        self.service.frame_changed.disconnect(self.on_frame_changed)
+        super().done(result)
@@ -6,6 +6,8 @@ The utilities on this module creates
 """
 
 import os
+import json
+import hashlib
 from datetime import datetime
 
 from mod.stdout_tools import debug
@@ -41,8 +43,64 @@ class XMLExporter():
     GENCASE_XML_SUFFIX = "_Def.xml"
     MATERIAL_FILE_NAME = "materials.xml"
 
+    # Sections rendered only from case data, with the case data keys each one depends on.
+    # Definition, objects and damping sections also read FreeCAD geometry so they are always rendered.
+    CACHEABLE_SECTIONS = {
+        "simulationdomain_template": ("domain",),
+        "periodicity_template": ("mode3d", "periodicity"),
+        "initials_template": ("mkbasedproperties",),
+        "floatings_template": ("mkbasedproperties",),
+        "rzones_template": ("relaxation_zone",),
+        "accinput_template": ("acceleration_input",),
+        "mlpistons_template": ("mkbasedproperties",),
+        "motion_template": ("mkbasedproperties",),
+        "wavepaddles_template": ("mkbasedproperties",),
+        "inout_template": ("inlet_outlet",),
+        "chrono_template": ("chrono",),
+        "moorings_template": ("moorings", "execution_parameters"),
+        "properties_template": ("mkbasedproperties", "execution_parameters")
+    }
+
+    # Last rendered fragment for each cacheable section, shared between exporter instances.
+    _fragments_cache: dict = dict()  # {section: (digest, fragment)}
+
+    # Digest of the last content written to each file, to avoid rewriting unchanged files.
+    _written_digests: dict = dict()  # {file_path: digest}
+
     def __init__(self):
         self.mod_folder = "{}/..".format(os.path.dirname(os.path.realpath(__file__)))
+        self.current_date = ""
+
+    @staticmethod
+    def get_digest(value) -> str:
+        """ Returns a digest identifying the content of a value composed of dicts, lists and scalars. """
+        if not isinstance(value, str):
+            value = json.dumps(value, sort_keys=True, default=str)
+        return hashlib.sha1(value.encode("utf-8")).hexdigest()
+
+    def get_section_digests(self, data: dict, case: "Case") -> dict:
+        """ Returns the digest of the case data each cacheable section depends on.
+        Must be computed before rendering, as some renderers modify the data they receive. """
+        to_ret: dict = dict()
+        for section, keys in self.CACHEABLE_SECTIONS.items():
+            section_data = {key: data[key] for key in keys}
+            if section == "rzones_template":
+                section_data["type"] = type(case.relaxation_zone).__name__
+            to_ret[section] = self.get_digest(section_data)
+        return to_ret
+
+    def render_section(self, section: str, digests: dict, renderer) -> str:
+        """ Renders a section with the given callable, reusing the last rendered fragment if its data did not change. """
+        digest = digests.get(section, None)
+        cached = self._fragments_cache.get(section, None)
+        if digest and cached and cached[0] == digest:
+            debug("Reusing cached fragment for {}".format(section))
+            return cached[1]
+
+        fragment = renderer()
+        if digest:
+            self._fragments_cache[section] = (digest, fragment)
+        return fragment
 
     def transform_bools_to_strs(self, value):
         """ Transforms a boolean value to a string representing its state, understandable by GenCase. """
@@ -58,25 +116,27 @@ class XMLExporter():
         """ Adapts the case data to a dictionary used to format the resulting XML """
         data: dict = obj_to_dict(case)
         data = self.transform_bools_to_strs(data)
+        digests: dict = self.get_section_digests(data, case)
 
         data["definition_template"] = DefinitionRenderer.render(data)
         data["objects_template"] = ObjectsRenderer.render(data)
-        data["simulationdomain_template"] = SimulationDomainRenderer.render(data)
-        data["periodicity_template"] = PeriodicityRenderer.render(data)
-        data["initials_template"] = InitialsRenderer.render(data)
-        data["floatings_template"] = FloatingsRenderer.render(data)
-        data["rzones_template"] = RZonesRenderer.render(data, type(case.relaxation_zone).__name__) if case.relaxation_zone else ""
-        data["accinput_template"] = AccinputRenderer.render(data)
+        data["simulationdomain_template"] = self.render_section("simulationdomain_template", digests, lambda: SimulationDomainRenderer.render(data))
+        data["periodicity_template"] = self.render_section("periodicity_template", digests, lambda: PeriodicityRenderer.render(data))
+        data["initials_template"] = self.render_section("initials_template", digests, lambda: InitialsRenderer.render(data))
+        data["floatings_template"] = self.render_section("floatings_template", digests, lambda: FloatingsRenderer.render(data))
+        data["rzones_template"] = self.render_section("rzones_template", digests, lambda: RZonesRenderer.render(data, type(case.relaxation_zone).__name__) if case.relaxation_zone else "")
+        data["accinput_template"] = self.render_section("accinput_template", digests, lambda: AccinputRenderer.render(data))
         data["damping_template"] = DampingRenderer.render(data) if case.damping_zones.keys() else ""
-        data["mlpistons_template"] = MLPistonsRenderer.render(data)
-        data["motion_template"] = MotionRenderer.render(data)
-        data["wavepaddles_template"] = WavePaddlesRenderer.render(data)
-        data["inout_template"] = InoutRenderer.render(data)
-        data["chrono_template"] = ChronoRenderer.render(data)
-        data["moorings_template"] = MooringsRenderer.render(data)
-        data["properties_template"] = PropertiesRenderer.render(data)
+        data["mlpistons_template"] = self.render_section("mlpistons_template", digests, lambda: MLPistonsRenderer.render(data))
+        data["motion_template"] = self.render_section("motion_template", digests, lambda: MotionRenderer.render(data))
+        data["wavepaddles_template"] = self.render_section("wavepaddles_template", digests, lambda: WavePaddlesRenderer.render(data))
+        data["inout_template"] = self.render_section("inout_template", digests, lambda: InoutRenderer.render(data))
+        data["chrono_template"] = self.render_section("chrono_template", digests, lambda: ChronoRenderer.render(data))
+        data["moorings_template"] = self.render_section("moorings_template", digests, lambda: MooringsRenderer.render(data))
+        data["properties_template"] = self.render_section("properties_template", digests, lambda: PropertiesRenderer.render(data))
         data["application"] = APP_NAME
-        data["current_date"] = datetime.now().strftime("%d-%m-%Y %H:%M:%S")
+        self.current_date = datetime.now().strftime("%d-%m-%Y %H:%M:%S")
+        data["current_date"] = self.current_date
         return data
 
     def generate(self, case) -> str:
@@ -104,9 +164,23 @@ class XMLExporter():
 
         return get_template_text(self.BASE_MATERIALS_XML).format(**formatter)
 
+    def write_if_changed(self, file_path: str, content: str, digest: str) -> bool:
+        """ Writes the content to the given file unless the last content written there had the same digest.
+        Returns whether the file was written or not. """
+        if os.path.isfile(file_path) and self._written_digests.get(file_path, None) == digest:
+            debug("Skipping write of unchanged file {}".format(file_path))
+            return False
+
+        with open(file_path, "w", encoding="utf-8") as file:
+            file.write(content)
+        self._written_digests[file_path] = digest
+        return True
+
     def save_to_disk(self, path, case: "Case") -> None:
         """ Creates a file on disk with the contents of the GenCase generated XML. """
-        with open("{}/{}".format(path, self.MATERIAL_FILE_NAME), "w", encoding="utf-8") as file:
-            file.write(self.generate_material(case))
-        with open("{}/{}{}".format(path, case.name, self.GENCASE_XML_SUFFIX), "w", encoding="utf-8") as file:
-            file.write(self.generate(case))
+        material_xml: str = self.generate_material(case)
+        self.write_if_changed("{}/{}".format(path, self.MATERIAL_FILE_NAME), material_xml, self.get_digest(material_xml))
+
+        # The generation date changes on each export, so it is not taken into account to decide if the file changed.
+        gencase_xml: str = self.generate(case)
+        self.write_if_changed("{}/{}{}".format(path, case.name, self.GENCASE_XML_SUFFIX), gencase_xml, self.get_digest(gencase_xml.replace(self.current_date, "")))
@@ -4,7 +4,7 @@ r"""
 """
 from __future__ import absolute_import, division, print_function
 
-import os, math
+import os, sys, time
 
 # import paraview modules.
 from paraview.web.protocols import ParaViewWebProtocol
@@ -49,64 +49,82 @@ USER_SELECTION = "user selection"
 UNSELECTED_INDEX = len(scoreDefinitions)
 
 
+def newColumn(templateArray, name, values):
+  """Return a new VTK array of the type of templateArray holding a copy of values.
+
+  Values are written directly into the memory owned by the VTK array, so the
+  column does not depend on the lifetime of a numpy array.
+  """
+  column = templateArray.NewInstance()
+  column.SetName(name)
+  column.SetNumberOfComponents(1)
+  column.SetNumberOfTuples(len(values))
+  if len(values):
+    vtk_to_numpy(column)[:] = values
+  return column
+
+
+def getPointCoordinates(dataset):
+  """Return the coordinates of the points of dataset as a (nbPoints, 3) numpy array.
+
+  Point sets return a view of their points. The implicit points of axis
+  aligned image data and rectilinear grids are generated with numpy.
+  """
+  if dataset.IsA('vtkPointSet'):
+    return vtk_to_numpy(dataset.GetPoints().GetData())
+  if dataset.IsA('vtkImageData') and (not hasattr(dataset, 'GetDirectionMatrix') or dataset.GetDirectionMatrix().IsIdentity()):
+    dims = dataset.GetDimensions()
+    axes = [dataset.GetOrigin()[i] + dataset.GetSpacing()[i] * np.arange(dims[i]) for i in range(3)]
+  elif dataset.IsA('vtkRectilinearGrid'):
+    axes = [vtk_to_numpy(dataset.GetXCoordinates()), vtk_to_numpy(dataset.GetYCoordinates()), vtk_to_numpy(dataset.GetZCoordinates())]
+  else:
+    return np.array([dataset.GetPoint(pIdx) for pIdx in range(dataset.GetNumberOfPoints())])
+  # x varies fastest on VTK structured point ordering
+  z, y, x = np.meshgrid(axes[2], axes[1], axes[0], indexing='ij')
+  return np.column_stack((x.ravel(), y.ravel(), z.ravel()))
+
+
 def fillTableWithDataSet(table, dataset):
+  """Append the point coordinates and point data of dataset to table as columns.
+
+  Single component arrays are added as they are, sharing their memory with the
+  dataset. The coordinates are copied in one pass per axis and the vector
+  arrays are reduced to their magnitude with numpy, without per point Python
+  work. Multi-block datasets append the columns of each of their leaves.
+  """
   if not dataset:
     return
   nbRows = table.GetNumberOfRows()
-  print('Table size', nbRows)
-  if dataset.IsA('vtkMultiBlockDataSet') :
-    nbBlocks = dataset.GetNumberOfBlocks()
-    if nbBlocks:
-      for bIdx in range(nbBlocks):
-        fillTableWithDataSet(table, dataset.GetBlock(bIdx))
+  if dataset.IsA('vtkMultiBlockDataSet'):
+    for bIdx in range(dataset.GetNumberOfBlocks()):
+      fillTableWithDataSet(table, dataset.GetBlock(bIdx))
   elif dataset.IsA('vtkTable'):
     if nbRows == 0 or nbRows == dataset.GetNumberOfRows():
-      nbColumns = dataset.GetNumberOfColumns()
-      for cIdx in range(nbColumns):
+      for cIdx in range(dataset.GetNumberOfColumns()):
         table.AddColumn(dataset.GetColumn(cIdx))
-  elif dataset:
-    if nbRows == 0 or nbRows == dataset.GetNumberOfPoints():
-      pd = dataset.GetPointData()
-      # Handle mesh xyz
-      nbPoints = dataset.GetNumberOfPoints()
-      coords = [0, 0, 0]
-      xCoord = vtk.vtkFloatArray()
-      xCoord.SetName('x Mesh')
-      xCoord.SetNumberOfTuples(nbPoints)
-      table.AddColumn(xCoord)
-      yCoord = vtk.vtkFloatArray()
-      yCoord.SetName('y Mesh')
-      yCoord.SetNumberOfTuples(nbPoints)
-      table.AddColumn(yCoord)
-      zCoord = vtk.vtkFloatArray()
-      zCoord.SetName('z Mesh')
-      zCoord.SetNumberOfTuples(nbPoints)
-      table.AddColumn(zCoord)
-      for pIdx in range(nbPoints):
-        dataset.GetPoints().GetPoint(pIdx, coords)
-        xCoord.SetTuple1(pIdx, coords[0])
-        yCoord.SetTuple1(pIdx, coords[1])
-        zCoord.SetTuple1(pIdx, coords[2])
-
-      # Handle point data
-      for aIdx in range(pd.GetNumberOfArrays()):
-        array = pd.GetArray(aIdx)
-        if array.GetNumberOfComponents() == 1:
-          table.AddColumn(pd.GetArray(aIdx))
-        else:
-          nbTuples = array.GetNumberOfTuples()
-          magnitudeArray = array.NewInstance()
-          magnitudeArray.SetName('Magnitude of %s' % array.GetName())
-          magnitudeArray.SetNumberOfTuples(nbTuples)
-          tupleHolder = list(range(array.GetNumberOfComponents()))
-          for tIdx in range(nbTuples):
-            array.GetTuple(tIdx, tupleHolder)
-            mag = 0
-            for el in tupleHolder:
-              mag += el * el
-            mag = math.sqrt(mag)
-            magnitudeArray.SetTuple1(tIdx, mag)
-          table.AddColumn(magnitudeArray)
+  elif dataset.IsA('vtkDataSet'):
+    nbPoints = dataset.GetNumberOfPoints()
+    if nbPoints == 0 or (nbRows != 0 and nbRows != nbPoints):
+      return
+    # Handle mesh xyz
+    coords = getPointCoordinates(dataset)
+    template = vtk.vtkFloatArray()
+    for axis, name in enumerate(('x Mesh', 'y Mesh', 'z Mesh')):
+      table.AddColumn(newColumn(template, name, coords[:, axis]))
+
+    # Handle point data
+    pd = dataset.GetPointData()
+    for aIdx in range(pd.GetNumberOfArrays()):
+      array = pd.GetArray(aIdx)
+      if array is None:
+        # Non numeric arrays (strings, variants) can't be binned
+        continue
+      if array.GetNumberOfComponents() == 1:
+        table.AddColumn(array)
+      else:
+        values = vtk_to_numpy(array)
+        magnitude = np.sqrt(np.einsum('ij,ij->i', values, values, dtype=np.float64))
+        table.AddColumn(newColumn(array, 'Magnitude of %s' % array.GetName(), magnitude))
 
 
 # =============================================================================
@@ -122,6 +140,12 @@ class DivvyProtocol(ParaViewWebProtocol):
     # if we calc a full histogram, cache it
     self.hist2DCache = {}
     self.hist1DCache = {}
+    # bin of each row of a column, computed once per column: { name: uint8/uint16 array }
+    self.binIndexCache = {}
+    # 2D histograms of the rows of each score on the last selection, updated with
+    # the rows that changed on the next one: { (score, pair): counts }
+    self.selectionHist2DCache = {}
+    self.lastSelectionLabels = None
     # the active annotation defined which rows are selected.
     self.activeAnnot = None
     self.selectedRows = None
@@ -220,14 +244,43 @@ class DivvyProtocol(ParaViewWebProtocol):
   def getScoreValue(self, index):
     return scoreDefinitions[index]['value']
 
+  def getBinIndices(self, name):
+    """Return the bin of each row of a column, computed once and cached.
+
+    Bins split the range of the column in numBins with the same edges, and
+    the same handling of values on them, as np.histogram2d: the maximum goes
+    into the last bin, and a constant column into the middle one. Rows
+    without a finite value get numBins, which no histogram counts. Indices
+    are uint8 when they fit, uint16 otherwise.
+    """
+    if name not in self.binIndexCache:
+      numBins = self.numBins
+      vtkCol = self.dataTable.GetColumnByName(name)
+      rng = vtkCol.GetRange()
+      values = vtk_to_numpy(vtkCol)
+      edges = np.linspace(rng[0], rng[1], numBins + 1) if rng[1] > rng[0] else np.linspace(rng[0] - 0.5, rng[1] + 0.5, numBins + 1)
+      indices = np.full(len(values), numBins, dtype=np.uint8 if numBins < 256 else np.uint16)
+      valid = np.isfinite(values)
+      indices[valid] = np.clip(np.searchsorted(edges, values[valid], side='right') - 1, 0, numBins - 1)
+      self.binIndexCache[name] = indices
+    return self.binIndexCache[name]
+
+  def countPairBins(self, key, rows=None):
+    """Return the (numBins, numBins) counts of the rows of a pair of columns, or of the given rows only.
+
+    Both bin indices are combined into a single one, counted with np.bincount.
+    """
+    stride = self.numBins + 1
+    ix = self.getBinIndices(key[0])
+    iy = self.getBinIndices(key[1])
+    if rows is not None:
+      ix = ix[rows]
+      iy = iy[rows]
+    combined = ix.astype(np.intp) * stride + iy
+    return np.bincount(combined, minlength=stride * stride).reshape(stride, stride)[:self.numBins, :self.numBins]
+
   def calc1DHistogram(self, vtkX, xrng, numBins):
-    result = np.zeros(numBins)
-    px = vtk_to_numpy(vtkX)
-    # ix = np.clip(np.floor((px - xrng[0]) * numBins / (xrng[1] - xrng[0])).astype(int), 0, numBins - 1)
-    # indices, counts = np.unique(ix, return_counts = True)
-    # for i in range(len(indices)):
-    #   result[indices[i]] = counts[i]
-    result = np.histogram(px, bins=numBins)[0]
+    result = np.bincount(self.getBinIndices(vtkX.GetName()), minlength=numBins + 1)[:numBins]
     # make it json serializable
     return result.tolist()
 
@@ -254,22 +307,8 @@ class DivvyProtocol(ParaViewWebProtocol):
 
 
   def calc2DHistogram(self, key, numBins):
-    result = np.zeros((numBins, numBins))
-    # print(key[0], key[1])
-    vtkX = self.dataTable.GetColumnByName(key[0])
-    vtkY = self.dataTable.GetColumnByName(key[1])
-    xrng = vtkX.GetRange()
-    yrng = vtkY.GetRange()
-
-    px = vtk_to_numpy(vtkX)
-    py = vtk_to_numpy(vtkY)
-    # clip puts maximum values into the last bin
-    # ix = np.clip(np.floor((px - xrng[0]) * numBins / (xrng[1] - xrng[0])).astype(int), 0, numBins - 1)
-    # iy = np.clip(np.floor((py - yrng[0]) * numBins / (yrng[1] - yrng[0])).astype(int), 0, numBins - 1)
-    # for i, j in zip(ix, iy):
-    #     result[i,j] += 1
-    result = np.histogram2d(px, py, bins=numBins, range=[xrng, yrng])[0]
-    return result
+    # bins come from the cached per column indices, so numBins is always self.numBins
+    return self.countPairBins(key)
 
   def format2DHistogramResult(self, pair, hist2D, annot=None, inScore=None, inVtkX=None, inVtkY=None, inXrng=None, inYrng=None):
     numBins = self.numBins
@@ -281,16 +320,16 @@ class DivvyProtocol(ParaViewWebProtocol):
     dx = float(xrng[1] - xrng[0]) / numBins
     dy = float(yrng[1] - yrng[0]) / numBins
 
-    histIter = np.nditer(hist2D, flags=['multi_index'])
+    # only the non-empty bins are sent
+    ix, iy = np.nonzero(hist2D)
+    binX = (xrng[0] + ix * dx).tolist()
+    binY = (yrng[0] + iy * dy).tolist()
+    counts = hist2D[ix, iy].astype(np.int64).tolist()
     result = {
       'x': {'name': pair[0], 'extent':xrng, 'delta':dx, 'mtime': vtkX.GetMTime() },
       'y': {'name': pair[1], 'extent':yrng, 'delta':dy, 'mtime': vtkY.GetMTime() },
       'numberOfBins': numBins,
-      'bins': [ {
-                  'x':xrng[0] + histIter.multi_index[0] * dx,
-                  'y':yrng[0] + histIter.multi_index[1] * dy,
-                  'count':int(bval)
-              } for bval in histIter if bval > 0 ],
+      'bins': [ { 'x': x, 'y': y, 'count': count } for x, y, count in zip(binX, binY, counts) ],
     }
     if annot:
       result['annotationInfo'] = {
@@ -379,9 +418,52 @@ class DivvyProtocol(ParaViewWebProtocol):
           }
         self.publish('divvy.selection.count.push', result)
 
+  def pushSelectionHistograms(self, annot):
+    """Publish the 2D histograms of the selected rows of each score for the pairs on lastHist2DList.
+
+    The histograms of the previous selection are updated with the rows that
+    entered or left each score, unless those are more than the rows selected,
+    in which case counting the selected rows is cheaper.
+    """
+    labels = self.selectedRows['data']
+    previousLabels = self.lastSelectionLabels
+    if previousLabels is not None and len(previousLabels) != len(labels):
+      previousLabels = None
+    selectionCache = {}
+    # for range selections, this happens once. For partitions, several times.
+    for score in self.selectedRows['score']:
+      selected = labels == score
+      numSelected = np.count_nonzero(selected)
+      added = removed = selRows = None
+      if previousLabels is not None:
+        wasSelected = previousLabels == score
+        added = np.flatnonzero(selected & ~wasSelected)
+        removed = np.flatnonzero(wasSelected & ~selected)
+        if len(added) + len(removed) > numSelected:
+          added = removed = None
+      for pair in self.lastHist2DList:
+        swap = pair[1] < pair[0]
+        key = (pair[1], pair[0]) if swap else (pair[0], pair[1])
+        if (score, key) in selectionCache:
+          hist2D = selectionCache[(score, key)]
+        elif added is not None and (score, key) in self.selectionHist2DCache:
+          hist2D = self.selectionHist2DCache[(score, key)]
+          if len(added):
+            hist2D += self.countPairBins(key, added)
+          if len(removed):
+            hist2D -= self.countPairBins(key, removed)
+        else:
+          if selRows is None:
+            selRows = np.flatnonzero(selected)
+          hist2D = self.countPairBins(key, selRows)
+        selectionCache[(score, key)] = hist2D
+        result = self.format2DHistogramResult(pair, hist2D.T if swap else hist2D, annot, score)
+        self.publish('divvy.histogram2D.push', { 'type': 'histogram2d', 'data': result, 'selection': True, })
+    self.selectionHist2DCache = selectionCache
+    self.lastSelectionLabels = labels
+
   @exportRpc('divvy.annotation.update')
   def updateAnnotation(self, annot):
-    numBins = self.numBins
     # print(annot)
     prevAnnot = self.activeAnnot
     self.activeAnnot = annot
@@ -437,7 +519,7 @@ class DivvyProtocol(ParaViewWebProtocol):
       labeledRows = np.all(colResult, axis=0)
 
       # convert true to the annotScore's index. convert false to the unselected index.
-      labeledRows = np.array(list(map(lambda x: annotScore if x else UNSELECTED_INDEX, labeledRows))).astype(np.uint8)
+      labeledRows = np.where(labeledRows, annotScore, UNSELECTED_INDEX).astype(np.uint8)
 
       self.selectedRows = { 'score': [annotScore], 'data': labeledRows.astype(np.uint8) }
       # print('Selected row count:', np.sum(self.selectedRows['data'] == annotScore), 'scoreIndex', annotScore)
@@ -464,9 +546,10 @@ class DivvyProtocol(ParaViewWebProtocol):
         labeledRows = np.ones(len(col)).astype(np.uint8)
       annotScores = annot['score']
       if len(annotScores) == len(divVals) + 1:
-        # convert the region label to a score, via a map.
-        scoreMap = { (i + 1): annotScores[i] for i in range(len(annotScores)) }
-        labeledRows = np.array(list(map(lambda x: scoreMap[x] if x in scoreMap else 0, labeledRows))).astype(np.uint8)
+        # convert the region label to a score, via a lookup table indexed by label.
+        scoreMap = np.zeros(len(annotScores) + 1, dtype=np.uint8)
+        scoreMap[1:] = annotScores
+        labeledRows = scoreMap[labeledRows]
       self.selectedRows = { 'score': np.unique(annotScores).tolist(), 'data': labeledRows }
 
     else:
@@ -481,23 +564,39 @@ class DivvyProtocol(ParaViewWebProtocol):
 
     # if someone is listening to hist2D selections....
     if self.lastHist2DList:
-      # for range selections, this happens once. For partitions, several times.
-      for score in self.selectedRows['score']:
-        # find the indices of the selected rows (flagged with score)
-        selIndices = np.where(np.in1d(self.selectedRows['data'], [score]))
-        for pair in self.lastHist2DList:
-
-          vtkX = self.dataTable.GetColumnByName(pair[0])
-          vtkY = self.dataTable.GetColumnByName(pair[1])
-          xrng = vtkX.GetRange()
-          yrng = vtkY.GetRange()
-          x = vtk_to_numpy(vtkX)
-          y = vtk_to_numpy(vtkY)
-          dx = float(xrng[1] - xrng[0]) / numBins
-          dy = float(yrng[1] - yrng[0]) / numBins
-          # sub-set the columns to the selected rows, then calc histogram.
-          bins = np.histogram2d(x[selIndices], y[selIndices], bins=numBins, range=[xrng, yrng])[0]
-          result = self.format2DHistogramResult(pair, bins, annot, score, vtkX, vtkY, xrng, yrng)
-          self.publish('divvy.histogram2D.push', { 'type': 'histogram2d', 'data': result, 'selection': True, })
+      self.pushSelectionHistograms(annot)
+    else:
+      self.selectionHist2DCache = {}
+      self.lastSelectionLabels = None
 
     return { 'success': True }
+
+
+# =============================================================================
+# Benchmark of the table filling on a synthetic point cloud:
+#   pvpython divvyProtocol.py [numberOfPoints]
+# =============================================================================
+def benchmarkFillTable(nbPoints=1000000, repeat=3):
+  """Time fillTableWithDataSet on a point cloud with a vector and a scalar array, like a PartVTK frame."""
+  rng = np.random.default_rng(0)
+  points = vtk.vtkPoints()
+  points.SetData(numpy_to_vtk(rng.random((nbPoints, 3)).astype(np.float32), deep=True))
+  polyData = vtk.vtkPolyData()
+  polyData.SetPoints(points)
+  for name, components in (('Vel', 3), ('Rhop', 1)):
+    array = numpy_to_vtk(rng.random((nbPoints, components)).astype(np.float32).squeeze(), deep=True)
+    array.SetName(name)
+    polyData.GetPointData().AddArray(array)
+
+  timings = []
+  for _ in range(repeat):
+    table = vtk.vtkTable()
+    start = time.time()
+    fillTableWithDataSet(table, polyData)
+    timings.append(time.time() - start)
+  print('fillTableWithDataSet: %d points, %d columns, best of %d: %.3f s' % (nbPoints, table.GetNumberOfColumns(), repeat, min(timings)))
+  return min(timings)
+
+
+if __name__ == '__main__':
+  benchmarkFillTable(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)